@@ -6,8 +6,53 @@ FUNÇÕES AUX
 """
 
 import requests
+import urllib3
 import pandas as pd
+import numpy as np
 import json
+import base64
+import collections
+import concurrent.futures
+import contextlib
+import contextvars
+import datetime
+import functools
+import gzip
+import hashlib
+import inspect
+import math
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import unicodedata
+import urllib.parse
+
+# Número máximo de novas tentativas para respostas 429 e espera base (segundos) quando não há Retry-After.
+MAX_RETRIES = 3
+RETRY_BACKOFF = 1.0
+
+# Tempo limite (segundos) de conexão e de leitura de cada requisição, como (conexão, leitura) ou um único número.
+TIMEOUT = (10.0, 60.0)
+# Prazo total (segundos) de uma chamada da biblioteca, somando todas as páginas e retentativas. None = sem prazo.
+DEADLINE = None
+
+# Tenant (PipedriveClient) ativo na thread/contexto atual. None = chamadas diretas das funções.
+_tenant_context = contextvars.ContextVar('pypipedrive_tenant', default=None)
+# Registro de fases da página em andamento quando o profiler está ativo.
+_profile_record = contextvars.ContextVar('pypipedrive_profile_record', default=None)
+# Destino das páginas do get_all_ dentro de for_each_page. None = acumular e retornar um DataFrame.
+_page_sink = contextvars.ContextVar('pypipedrive_page_sink', default=None)
+# Normalizações aplicadas a cada página do get_all_ (ver page_options).
+_page_options = contextvars.ContextVar('pypipedrive_page_options', default={})
+# Prazo (time.monotonic) da chamada em andamento, herdado pelas threads dos workers. None = sem prazo.
+_deadline = contextvars.ContextVar('pypipedrive_deadline', default=None)
+# False dentro de single_page_: o get_all_ baixa só a primeira página.
+_paginate = contextvars.ContextVar('pypipedrive_paginate', default=True)
+
 def prepare_url_parameters_(params):
     """
     Transforma um dicionário de parâmetros em uma string formatada para ser usada em requisições da API do Pipedrive.
@@ -23,6 +68,236 @@ def prepare_url_parameters_(params):
         return param_str
     return ""
 
+class DeadlineExceededError(TimeoutError):
+    """
+    O prazo de uma chamada (DEADLINE, PipedriveClient(deadline=...) ou deadline(...)) se esgotou antes de ela
+    terminar, contando todas as páginas e retentativas.
+
+    Não é uma requests.exceptions.RequestException, então não é tratada como falha de um único registro pelos
+    blocos que capturam erros de rede; interrompe a chamada inteira.
+    """
+
+
+@contextlib.contextmanager
+def deadline(seconds):
+    """
+    Define um prazo total para as chamadas feitas dentro do bloco, incluindo todas as páginas, retentativas e
+    as threads de workers iniciadas nele. Prazos aninhados nunca estendem o prazo externo.
+
+    Parâmetros:
+    - seconds (float): Prazo em segundos.
+
+    # Exemplo de uso:
+        with deadline(30):
+            negocios = deals_get_all(api_token='seu_token_aqui', company_domain='sua_empresa')
+    """
+    expires = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(expires if current is None else min(current, expires))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def _call_deadline_():
+    # Abre o prazo padrão (do tenant ou DEADLINE) de uma chamada, se nenhum prazo estiver em andamento.
+    if _deadline.get() is not None:
+        return contextlib.nullcontext()
+
+    tenant = _tenant_context.get()
+    seconds = tenant.deadline if tenant is not None and tenant.deadline is not None else DEADLINE
+
+    return deadline(seconds) if seconds is not None else contextlib.nullcontext()
+
+
+def _request_timeout_(timeout, expires):
+    # Tempo limite (conexão, leitura) da tentativa: o configurado, limitado ao que resta do prazo.
+    if expires is None:
+        return timeout
+
+    remaining = expires - time.monotonic()
+    if remaining <= 0:
+        raise DeadlineExceededError("Prazo da chamada esgotado antes do envio da requisição.")
+
+    connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+
+    return (remaining if connect is None else min(connect, remaining),
+            remaining if read is None else min(read, remaining))
+
+
+def request_(method, url, **kwargs):
+    """
+    Executa uma requisição HTTP para a API do Pipedrive. Todas as funções da biblioteca passam por aqui.
+
+    Quando a chamada acontece dentro de um PipedriveClient, a requisição usa a sessão (pool de conexões)
+    e o limitador de taxa do tenant correspondente. Respostas 429 (limite de taxa) são repetidas até
+    MAX_RETRIES vezes, respeitando o cabeçalho Retry-After. Latência, bytes, 429 e retentativas são
+    registrados em `metrics`, com o nome da função da biblioteca como endpoint.
+
+    Cada tentativa usa o tempo limite de conexão/leitura TIMEOUT (ou o do tenant), reduzido ao que resta do prazo
+    da chamada (ver deadline). Esgotado o prazo, na espera do limitador, entre retentativas ou em um tempo limite
+    da requisição, gera DeadlineExceededError.
+
+    Parâmetros:
+    - method (str): Método HTTP ('GET', 'POST', 'PUT' ou 'DELETE').
+    - url (str): URL do endpoint.
+    - **kwargs: Argumentos repassados ao requests (params, json, headers, files...).
+
+    Retorna:
+    requests.Response: A resposta da requisição.
+    """
+    with _call_deadline_():
+        return _request_(method, url, **kwargs)
+
+
+def _request_(method, url, **kwargs):
+    tenant = _tenant_context.get()
+    record = _profile_record.get()
+
+    if tenant is not None:
+        send = tenant.session.request
+    elif record is not None:
+        send = _profiled_request_
+    else:
+        send = requests.request
+
+    cassette = _cassette
+    if cassette is not None:
+        send = cassette.transport(send)
+    # Respostas servidas do cassete não consomem o limite de taxa do tenant.
+    replaying = cassette is not None and cassette.mode == 'replay'
+
+    endpoint = _endpoint_label() if metrics.enabled else None
+    # Uploads não são repetidos: o arquivo já foi consumido na primeira tentativa.
+    max_retries = 0 if 'files' in kwargs else MAX_RETRIES
+    # Tempo limite explícito do chamador ou o configurado; vale para todas as tentativas.
+    if 'timeout' in kwargs:
+        configured = kwargs.pop('timeout')
+    else:
+        configured = tenant.timeout if tenant is not None and tenant.timeout is not None else TIMEOUT
+    attempt = 0
+
+    while True:
+        expires = _deadline.get()
+
+        if tenant is not None and not replaying:
+            if record is None:
+                tenant.rate_limiter.acquire(deadline=expires)
+            else:
+                started = time.perf_counter()
+                tenant.rate_limiter.acquire(deadline=expires)
+                record['wait'] += time.perf_counter() - started
+
+        timeout = _request_timeout_(configured, expires)
+        connect_before = record['connect'] if record is not None else 0.0
+        started = time.perf_counter()
+        try:
+            response = send(method, url, timeout=timeout, **kwargs)
+        except requests.exceptions.RequestException as e:
+            if endpoint is not None:
+                metrics.inc('pipedrive_request_errors_total', endpoint=endpoint, method=method)
+            if isinstance(e, requests.exceptions.Timeout) and expires is not None and time.monotonic() >= expires:
+                raise DeadlineExceededError(f"Prazo da chamada esgotado em {method} {urllib.parse.urlsplit(url).path}.") from e
+            raise
+        elapsed = time.perf_counter() - started
+
+        if endpoint is not None:
+            metrics.record_request(endpoint, method, response, elapsed, kwargs.get('stream', False))
+
+        if record is not None:
+            # response.elapsed vai do envio até o fim dos cabeçalhos; o restante é a leitura do corpo.
+            headers_at = min(response.elapsed.total_seconds(), elapsed)
+            record['ttfb'] += max(headers_at - (record['connect'] - connect_before), 0.0)
+            record['transfer'] += elapsed - headers_at
+            record['bytes'] += len(response.content or b'') if not kwargs.get('stream') else 0
+
+        if response.status_code != 429 or attempt >= max_retries:
+            return response
+
+        attempt += 1
+        if endpoint is not None:
+            metrics.inc('pipedrive_retries_total', endpoint=endpoint)
+
+        delay = _retry_delay_(response, attempt)
+        if expires is not None and time.monotonic() + delay > expires:
+            raise DeadlineExceededError(f"Prazo da chamada esgotado aguardando nova tentativa (429) em {method} {urllib.parse.urlsplit(url).path}.")
+        if record is not None:
+            record['wait'] += delay
+        time.sleep(delay)
+
+
+def _profiled_request_(method, url, **kwargs):
+    # Igual a requests.request, mas com o adaptador que mede o tempo de conexão.
+    with requests.Session() as session:
+        session.mount('https://', _PipedriveAdapter())
+        return session.request(method, url, **kwargs)
+
+
+def _retry_delay_(response, attempt):
+    retry_after = response.headers.get('Retry-After')
+
+    try:
+        return max(float(retry_after), 0)
+    except (TypeError, ValueError):
+        return RETRY_BACKOFF * 2 ** (attempt - 1)
+
+
+def _with_start_(url, start):
+    # Troca (ou inclui) o parâmetro de paginação start na URL.
+    if re.search(r'([?&])start=\d*', url):
+        return re.sub(r'([?&])start=\d*', rf'\g<1>start={start}', url, count=1)
+
+    return f"{url}{'&' if '?' in url else '?'}start={start}"
+
+
+def _page_records_(data):
+    # Endpoints de item único retornam um dict em 'data'; as listagens retornam uma lista.
+    return [data] if isinstance(data, dict) else data
+
+
+def _build_frame_(data, transform=None):
+    # Monta o DataFrame de uma página, aplicando as normalizações de page_options (transform).
+    frame = pd.DataFrame(_page_records_(data))
+    return transform(frame) if transform is not None else frame
+
+
+def _get_page_(url, record=None, transform=None):
+    # Baixa uma página e monta o DataFrame. Com o profiler ativo, mede decodificação e montagem do frame
+    # (conexão, TTFB e transferência são medidos em request_).
+    if record is None:
+        page = request_('GET', url).json()
+        frame = _build_frame_(page['data'], transform) if 'data' in page else None
+        return page, frame
+
+    token = _profile_record.set(record)
+    try:
+        response = request_('GET', url)
+    finally:
+        _profile_record.reset(token)
+
+    started = time.perf_counter()
+    page = response.json()
+    decoded = time.perf_counter()
+    frame = _build_frame_(page['data'], transform) if 'data' in page else None
+    record['decode'] = decoded - started
+    record['frame'] = time.perf_counter() - decoded
+    record['records'] = len(frame) if frame is not None else 0
+
+    return page, frame
+
+
+def _concat_pages_(pages):
+    result = pd.concat(pages, ignore_index=True)
+
+    # Páginas com categorias diferentes viram object no concat; volta para category.
+    for column, dtype in pages[0].dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype) and not isinstance(result[column].dtype, pd.CategoricalDtype):
+            result[column] = result[column].astype('category')
+
+    return result
+
+
 def get_all_(url):
     """
     Executa uma solicitação GET para a URL do Pipedrive, baixa todas as páginas e retorna um DataFrame com o resultado.
@@ -32,27 +307,56 @@ def get_all_(url):
 
     Retorna:
     pd.DataFrame: Um DataFrame contendo o resultado das páginas.
+
+    O prazo da chamada (DEADLINE, do tenant ou de deadline) vale para todas as páginas juntas.
     """
-    pages = []
-    page = requests.get(url).json()
+    with _call_deadline_():
+        return _get_all_(url)
 
-    if page.get('additional_data', {}).get('pagination', {}).get('more_items_in_collection'):
-        if 'limit=500' in url:
-            pages.append(pd.DataFrame(page['data']))
 
-            while page['additional_data']['pagination']['more_items_in_collection']:
-                next_start = page['additional_data']['pagination']['next_start']
-                next_url = url.replace('start=0', f'start={next_start}')
-                page = requests.get(next_url).json()
+def _get_all_(url):
+    endpoint = _endpoint_label() if metrics.enabled or profiler.enabled else None
+    call = profiler.start_call(endpoint) if profiler.enabled else None
+    sink = _page_sink.get()
+    transform = _page_transform_(url) if _page_options.get() else None
+    started = time.perf_counter()
 
-                if 'data' in page:
-                    pages.append(pd.DataFrame(page['data']))
+    page, frame = _get_page_(url, call.page() if call else None, transform)
+    pages = [frame if frame is not None else pd.DataFrame(_page_records_(page['data']))]
+    page_count, records = 1, len(pages[0])
 
-            return pd.concat(pages, ignore_index=True)
-        else:
-            return pd.DataFrame(page['data'])
+    if sink is not None:
+        sink(pages.pop())
+
+    if 'limit=500' in url and _paginate.get():
+        while page.get('additional_data', {}).get('pagination', {}).get('more_items_in_collection'):
+            next_start = page['additional_data']['pagination']['next_start']
+            page, frame = _get_page_(_with_start_(url, next_start), call.page() if call else None, transform)
+
+            if frame is not None:
+                page_count += 1
+                records += len(frame)
+
+                if sink is not None:
+                    sink(frame)
+                else:
+                    pages.append(frame)
+
+    if sink is not None:
+        result = pd.DataFrame()
+    elif len(pages) == 1:
+        result = pages[0]
+    elif call is None:
+        result = _concat_pages_(pages)
     else:
-        return pd.DataFrame(page['data'])
+        concat_started = time.perf_counter()
+        result = _concat_pages_(pages)
+        call.concat(concat_started, time.perf_counter() - concat_started)
+
+    if metrics.enabled:
+        metrics.record_call(endpoint, time.perf_counter() - started, page_count, records)
+
+    return result
 
 
 def check_api_token(api_token):
@@ -111,6 +415,691 @@ def clear_list(data):
         return data
 
 
+class RateLimiter:
+    """
+    Limitador de taxa (token bucket) seguro para uso entre threads.
+
+    Parâmetros:
+    - rate (float): Requisições liberadas por segundo.
+    - burst (int, opcional): Máximo de requisições acumuladas para rajadas. Padrão é o dobro de rate.
+
+    # Exemplo de uso:
+        limiter = RateLimiter(rate=10)
+        limiter.acquire()  # bloqueia até haver um token disponível
+    """
+
+    def __init__(self, rate, burst=None):
+        if rate <= 0:
+            raise ValueError("O parâmetro 'rate' deve ser maior que zero.")
+
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(2 * rate, 1))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline=None):
+        """
+        Consome um token, aguardando o tempo necessário caso o balde esteja vazio.
+
+        Parâmetros:
+        - deadline (float, opcional): Prazo (time.monotonic). Se a espera passar dele, gera DeadlineExceededError.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                wait = (1 - self._tokens) / self.rate
+
+            if deadline is not None and time.monotonic() + wait > deadline:
+                raise DeadlineExceededError("Prazo da chamada esgotado aguardando o limitador de taxa.")
+
+            time.sleep(wait)
+
+
+class _Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count', 'max')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value):
+        index = 0
+        while index < len(self.buckets) and value > self.buckets[index]:
+            index += 1
+
+        self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        # Estimativa pelo limite superior do bucket que contém o quantil.
+        if self.count == 0:
+            return math.nan
+
+        target = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return min(bound, self.max)
+
+        return self.max
+
+
+class Metrics:
+    """
+    Métricas de execução da biblioteca, agrupadas por endpoint (nome da função, ex: 'deals_get_all').
+
+    Registra, para cada requisição HTTP: contagem por status, erros de conexão, respostas 429, retentativas,
+    bytes recebidos e histograma de latência. Para cada paginação do get_all_: histograma da duração total,
+    das páginas e dos registros por chamada.
+
+    A instância global `metrics` é usada por toda a biblioteca. Para desligar a coleta: metrics.enabled = False.
+
+    # Exemplo de uso:
+        deals_get_all(api_token='seu_token_aqui')
+        print(metrics.summary())
+        metrics.write_prometheus('/var/lib/node_exporter/pipedrive.prom')
+    """
+
+    LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+    PAGE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+    RECORD_BUCKETS = (0, 10, 100, 500, 1000, 5000, 10000, 50000, 100000, 500000)
+
+    HELP = {
+        'pipedrive_requests_total': ('counter', 'Requisições HTTP por endpoint, método e status.'),
+        'pipedrive_request_errors_total': ('counter', 'Requisições que falharam sem resposta (conexão, timeout).'),
+        'pipedrive_rate_limited_total': ('counter', 'Respostas 429 (limite de taxa) recebidas.'),
+        'pipedrive_retries_total': ('counter', 'Novas tentativas feitas após respostas 429.'),
+        'pipedrive_response_bytes_total': ('counter', 'Bytes recebidos nas respostas.'),
+        'pipedrive_request_duration_seconds': ('histogram', 'Latência de cada requisição HTTP.'),
+        'pipedrive_call_duration_seconds': ('histogram', 'Duração total de cada chamada paginada (get_all_).'),
+        'pipedrive_call_pages': ('histogram', 'Páginas baixadas por chamada paginada.'),
+        'pipedrive_call_records': ('histogram', 'Registros retornados por chamada paginada.'),
+    }
+
+    def __init__(self):
+        self.enabled = True
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def inc(self, name, value=1, **labels):
+        """
+        Incrementa um contador.
+        """
+        key = (name, tuple(sorted(labels.items())))
+
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, buckets, **labels):
+        """
+        Registra um valor em um histograma.
+        """
+        key = (name, tuple(sorted(labels.items())))
+
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(buckets)
+            histogram.observe(value)
+
+    def record_request(self, endpoint, method, response, elapsed, stream=False):
+        """
+        Registra uma requisição HTTP concluída.
+        """
+        if stream:
+            size = int(response.headers.get('Content-Length') or 0)
+        else:
+            size = len(response.content or b'')
+
+        self.inc('pipedrive_requests_total', endpoint=endpoint, method=method, status=str(response.status_code))
+        self.inc('pipedrive_response_bytes_total', size, endpoint=endpoint)
+        self.observe('pipedrive_request_duration_seconds', elapsed, self.LATENCY_BUCKETS, endpoint=endpoint)
+
+        if response.status_code == 429:
+            self.inc('pipedrive_rate_limited_total', endpoint=endpoint)
+
+    def record_call(self, endpoint, elapsed, pages, records):
+        """
+        Registra uma chamada paginada concluída.
+        """
+        self.observe('pipedrive_call_duration_seconds', elapsed, self.LATENCY_BUCKETS, endpoint=endpoint)
+        self.observe('pipedrive_call_pages', pages, self.PAGE_BUCKETS, endpoint=endpoint)
+        self.observe('pipedrive_call_records', records, self.RECORD_BUCKETS, endpoint=endpoint)
+
+    def reset(self):
+        """
+        Zera todas as métricas.
+        """
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def summary(self):
+        """
+        Resumo das métricas por endpoint.
+
+        Retorna:
+        pd.DataFrame: Uma linha por endpoint com requisições, erros, 429, retentativas, bytes, latência
+        (média, p50, p95, máxima) e, para chamadas paginadas, chamadas, páginas, registros e duração total.
+        """
+        rows = collections.defaultdict(lambda: collections.defaultdict(float))
+
+        with self._lock:
+            for (name, labels), value in self._counters.items():
+                endpoint = dict(labels)['endpoint']
+                column = {
+                    'pipedrive_requests_total': 'requests',
+                    'pipedrive_request_errors_total': 'errors',
+                    'pipedrive_rate_limited_total': 'rate_limited',
+                    'pipedrive_retries_total': 'retries',
+                    'pipedrive_response_bytes_total': 'response_bytes',
+                }[name]
+                rows[endpoint][column] += value
+
+            for (name, labels), histogram in self._histograms.items():
+                row = rows[dict(labels)['endpoint']]
+
+                if name == 'pipedrive_request_duration_seconds':
+                    row['latency_mean'] = histogram.sum / histogram.count
+                    row['latency_p50'] = histogram.quantile(0.5)
+                    row['latency_p95'] = histogram.quantile(0.95)
+                    row['latency_max'] = histogram.max
+                elif name == 'pipedrive_call_duration_seconds':
+                    row['calls'] = histogram.count
+                    row['call_seconds'] = histogram.sum
+                elif name == 'pipedrive_call_pages':
+                    row['pages'] = histogram.sum
+                elif name == 'pipedrive_call_records':
+                    row['records'] = histogram.sum
+
+        columns = ['requests', 'errors', 'rate_limited', 'retries', 'response_bytes', 'latency_mean', 'latency_p50',
+                   'latency_p95', 'latency_max', 'calls', 'pages', 'records', 'call_seconds']
+        frame = pd.DataFrame.from_dict({k: dict(v) for k, v in rows.items()}, orient='index', columns=columns)
+        frame.index.name = 'endpoint'
+
+        counts = ['requests', 'errors', 'rate_limited', 'retries', 'response_bytes', 'calls', 'pages', 'records']
+        frame[counts] = frame[counts].fillna(0).astype('int64')
+
+        return frame.sort_index()
+
+    def to_prometheus(self):
+        """
+        Exporta as métricas no formato texto do Prometheus.
+
+        Retorna:
+        str: As métricas no formato de exposição do Prometheus.
+        """
+        def format_labels(labels, extra=()):
+            items = list(labels) + list(extra)
+            if not items:
+                return ''
+            pairs = []
+            for k, v in items:
+                v = str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+                pairs.append(f'{k}="{v}"')
+            return '{' + ','.join(pairs) + '}'
+
+        by_name = collections.defaultdict(list)
+
+        with self._lock:
+            for (name, labels), value in self._counters.items():
+                by_name[name].append((labels, value))
+            for (name, labels), histogram in self._histograms.items():
+                by_name[name].append((labels, (histogram.buckets, list(histogram.counts), histogram.sum, histogram.count)))
+
+        lines = []
+        for name in sorted(by_name):
+            kind, help_text = self.HELP[name]
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+
+            for labels, value in sorted(by_name[name]):
+                if kind == 'counter':
+                    lines.append(f'{name}{format_labels(labels)} {value}')
+                    continue
+
+                buckets, counts, total, count = value
+                cumulative = 0
+                for bound, bucket_count in zip(buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f'{name}_bucket{format_labels(labels, [("le", repr(float(bound)))])} {cumulative}')
+                lines.append(f'{name}_bucket{format_labels(labels, [("le", "+Inf")])} {count}')
+                lines.append(f'{name}_sum{format_labels(labels)} {total}')
+                lines.append(f'{name}_count{format_labels(labels)} {count}')
+
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """
+        Grava as métricas no formato do Prometheus em um arquivo (ex: para o textfile collector do node_exporter).
+        A escrita é atômica: o arquivo é gerado ao lado do destino e depois renomeado.
+
+        Parâmetros:
+        - path (str): Caminho do arquivo .prom.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.pipedrive-', suffix='.prom.tmp')
+
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(self.to_prometheus())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+metrics = Metrics()
+
+
+class _TimedHTTPSConnection(urllib3.connection.HTTPSConnection):
+    # Conexão HTTPS que soma o tempo de conexão (TCP + TLS) na página em perfilamento.
+    def connect(self):
+        record = _profile_record.get()
+
+        if record is None:
+            return super().connect()
+
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            record['connect'] += time.perf_counter() - started
+
+
+class _TimedHTTPSConnectionPool(urllib3.HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _PipedriveAdapter(requests.adapters.HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = dict(self.poolmanager.pool_classes_by_scheme, https=_TimedHTTPSConnectionPool)
+
+
+class _ProfiledCall:
+    # Fases de uma chamada do get_all_; cada página vira um registro no profiler.
+    def __init__(self, profiler, endpoint, call_id):
+        self.profiler = profiler
+        self.endpoint = endpoint
+        self.call_id = call_id
+        self.pages = 0
+
+    def page(self):
+        record = dict.fromkeys(Profiler.PAGE_PHASES, 0.0)
+        record.update(endpoint=self.endpoint, call=self.call_id, page=self.pages, thread=threading.get_ident(),
+                      start=time.perf_counter(), bytes=0, records=0)
+        self.pages += 1
+        self.profiler._add(record)
+        return record
+
+    def concat(self, start, duration):
+        self.profiler._add({'endpoint': self.endpoint, 'call': self.call_id, 'page': None, 'thread': threading.get_ident(),
+                            'start': start, 'concat': duration})
+
+
+class Profiler:
+    """
+    Perfilamento por fase das chamadas paginadas (get_all_). Desligado por padrão.
+
+    Para cada página registra: espera no limitador de taxa/retentativas (wait), conexão TCP+TLS (connect),
+    tempo até o primeiro byte (ttfb), leitura do corpo (transfer), decodificação do JSON (decode) e montagem
+    do DataFrame (frame); para cada chamada, o pd.concat final (concat). O custo é de algumas leituras de
+    relógio por página, e os registros ficam em um buffer circular de tamanho max_records.
+
+    A instância global `profiler` é usada por toda a biblioteca.
+
+    # Exemplo de uso:
+        profiler.enable()
+        deals_get_all(api_token='seu_token_aqui')
+        print(profiler.report())
+        profiler.write_trace('deals_get_all.trace.json')  # abrir em chrome://tracing ou ui.perfetto.dev
+    """
+
+    PAGE_PHASES = ('wait', 'connect', 'ttfb', 'transfer', 'decode', 'frame')
+    PHASES = PAGE_PHASES + ('concat',)
+
+    def __init__(self, max_records=100000):
+        self.enabled = False
+        self._records = collections.deque(maxlen=max_records)
+        self._calls = 0
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._origin_epoch = time.time()
+
+    def enable(self):
+        """
+        Liga o perfilamento.
+        """
+        self.enabled = True
+
+    def disable(self):
+        """
+        Desliga o perfilamento (os registros já coletados são mantidos).
+        """
+        self.enabled = False
+
+    def reset(self):
+        """
+        Descarta os registros coletados.
+        """
+        with self._lock:
+            self._records.clear()
+
+    def start_call(self, endpoint):
+        with self._lock:
+            self._calls += 1
+            return _ProfiledCall(self, endpoint, self._calls)
+
+    def _add(self, record):
+        with self._lock:
+            self._records.append(record)
+
+    def records(self):
+        """
+        Registros coletados, um por página (e um por concat).
+
+        Retorna:
+        pd.DataFrame: Colunas endpoint, call, page, thread, start, bytes, records e uma coluna por fase (segundos).
+        """
+        with self._lock:
+            rows = list(self._records)
+
+        columns = ['endpoint', 'call', 'page', 'thread', 'start', 'bytes', 'records', *self.PHASES]
+        frame = pd.DataFrame(rows, columns=columns)
+        frame[list(self.PHASES)] = frame[list(self.PHASES)].fillna(0.0)
+
+        return frame
+
+    def summary(self):
+        """
+        Tempo total de cada fase por endpoint.
+
+        Retorna:
+        pd.DataFrame: Por endpoint, chamadas, páginas, bytes, registros, segundos por fase, total e a fração
+        do total gasta em cada fase (colunas '<fase>_share').
+        """
+        frame = self.records()
+        phases = list(self.PHASES)
+
+        grouped = frame.groupby('endpoint', dropna=False)
+        summary = grouped[phases].sum()
+        summary.insert(0, 'records', grouped['records'].sum())
+        summary.insert(0, 'bytes', grouped['bytes'].sum())
+        summary.insert(0, 'pages', grouped['page'].count())
+        summary.insert(0, 'calls', grouped['call'].nunique())
+        summary['total'] = summary[phases].sum(axis=1)
+
+        for phase in phases:
+            summary[f'{phase}_share'] = summary[phase] / summary['total'].where(summary['total'] > 0)
+
+        return summary.sort_values('total', ascending=False)
+
+    def report(self):
+        """
+        Relatório em texto com o tempo e a fração de cada fase por endpoint.
+
+        Retorna:
+        str: O relatório formatado.
+        """
+        summary = self.summary()
+        lines = []
+
+        for endpoint, row in summary.iterrows():
+            lines.append(f"{endpoint}: {int(row['calls'])} chamadas, {int(row['pages'])} páginas, "
+                         f"{int(row['records'])} registros, {row['total']:.3f}s")
+            for phase in self.PHASES:
+                share = row[f'{phase}_share']
+                share = 0.0 if pd.isna(share) else share
+                lines.append(f"    {phase:<9}{row[phase]:>10.3f}s {share:>7.1%}")
+
+        return '\n'.join(lines)
+
+    def write_trace(self, path):
+        """
+        Grava os registros no formato Trace Event (JSON), visualizável em chrome://tracing ou ui.perfetto.dev.
+
+        Parâmetros:
+        - path (str): Caminho do arquivo de trace.
+        """
+        with self._lock:
+            rows = list(self._records)
+
+        pid = os.getpid()
+        events = []
+
+        for record in rows:
+            ts = (record['start'] - self._origin) * 1e6 + self._origin_epoch * 1e6
+            args = {'call': record['call'], 'page': record['page']}
+
+            if record['page'] is None:
+                events.append({'name': 'concat', 'cat': record['endpoint'], 'ph': 'X', 'ts': ts,
+                               'dur': record['concat'] * 1e6, 'pid': pid, 'tid': record['thread'], 'args': args})
+                continue
+
+            total = sum(record[phase] for phase in self.PAGE_PHASES)
+            events.append({'name': f"{record['endpoint']} página {record['page']}", 'cat': record['endpoint'], 'ph': 'X',
+                           'ts': ts, 'dur': total * 1e6, 'pid': pid, 'tid': record['thread'],
+                           'args': dict(args, bytes=record['bytes'], records=record['records'])})
+
+            for phase in self.PAGE_PHASES:
+                if record[phase] > 0:
+                    events.append({'name': phase, 'cat': record['endpoint'], 'ph': 'X', 'ts': ts,
+                                   'dur': record[phase] * 1e6, 'pid': pid, 'tid': record['thread'], 'args': args})
+                    ts += record[phase] * 1e6
+
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+
+profiler = Profiler()
+
+
+_cassette = None
+_cassette_lock = threading.Lock()
+
+
+class Cassette:
+    """
+    Transporte de gravação/reprodução das requisições da biblioteca, para testes de desempenho offline.
+
+    No modo 'record', as requisições vão para a API normalmente e cada par requisição/resposta é gravado
+    (com o api_token removido) em um arquivo JSON Lines compactado com gzip. No modo 'replay', nenhuma
+    requisição sai para a rede: as respostas são servidas a partir do arquivo, sem passar pelo limitador de taxa
+    do tenant, na velocidade máxima (latency='none') ou com a latência original de cada resposta
+    (latency='original').
+
+    As requisições são identificadas pelo método, caminho, parâmetros (exceto api_token) e corpo; o domínio é
+    ignorado. Respostas repetidas para a mesma requisição são reproduzidas na ordem em que foram gravadas
+    e, esgotadas, a última se repete. O cassete vale para todas as threads enquanto estiver ativo.
+
+    Parâmetros:
+    - path (str): Caminho do arquivo do cassete (ex: 'deals.cassette.jsonl.gz').
+    - mode (str, opcional): 'replay' (padrão) ou 'record'.
+    - latency (str, opcional): No modo 'replay', 'none' (padrão) ou 'original'.
+
+    # Exemplo de uso:
+        with Cassette('deals.cassette.jsonl.gz', mode='record'):
+            deals_get_all(api_token='seu_token_aqui', company_domain='sua_empresa')
+
+        with Cassette('deals.cassette.jsonl.gz'):
+            deals = deals_get_all(api_token='qualquer', company_domain='sua_empresa')  # sem rede
+    """
+
+    SCRUBBED = 'SCRUBBED'
+    HEADERS = ('Content-Type', 'Content-Length', 'Retry-After', 'X-RateLimit-Limit', 'X-RateLimit-Remaining', 'X-RateLimit-Reset')
+
+    def __init__(self, path, mode='replay', latency='none'):
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"Modo inválido: {mode}. Valores permitidos: 'record', 'replay'.")
+        if latency not in ('none', 'original'):
+            raise ValueError(f"Latência inválida: {latency}. Valores permitidos: 'none', 'original'.")
+
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self._lock = threading.Lock()
+        self._entries = []
+        self._replay = {}
+
+    def __enter__(self):
+        global _cassette
+
+        if self.mode == 'replay':
+            self._load()
+
+        with _cassette_lock:
+            if _cassette is not None:
+                raise RuntimeError("Já existe um cassete ativo.")
+            _cassette = self
+
+        return self
+
+    def __exit__(self, *exc):
+        global _cassette
+
+        with _cassette_lock:
+            _cassette = None
+
+        if self.mode == 'record':
+            self.save()
+
+    def transport(self, send):
+        """
+        Envolve a função de envio usada por request_ com a gravação ou a reprodução.
+        """
+        if self.mode == 'replay':
+            return self._replay_request
+
+        def record(method, url, **kwargs):
+            started = time.perf_counter()
+            response = send(method, url, **kwargs)
+            self._record(method, url, kwargs, response, time.perf_counter() - started)
+            return response
+
+        return record
+
+    def save(self):
+        """
+        Grava as requisições registradas no arquivo do cassete (escrita atômica).
+        """
+        with self._lock:
+            entries = list(self._entries)
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.cassette-', suffix='.tmp')
+
+        try:
+            with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb') as f:
+                for entry in entries:
+                    f.write(json.dumps(entry, separators=(',', ':'), ensure_ascii=False).encode('utf-8') + b'\n')
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def _key(cls, method, url, kwargs):
+        parsed = urllib.parse.urlsplit(url)
+        query = urllib.parse.parse_qsl(parsed.query, keep_blank_values=True)
+        params = kwargs.get('params') or {}
+        query += [(k, str(v)) for k, v in (params.items() if isinstance(params, dict) else params) if v is not None]
+        query = sorted((k, v) for k, v in query if k != 'api_token')
+        body = kwargs.get('json', kwargs.get('data'))
+        body = json.dumps(body, sort_keys=True, default=str) if body is not None else ''
+
+        return f"{method.upper()} {parsed.path}?{urllib.parse.urlencode(query)} {hashlib.sha1(body.encode('utf-8')).hexdigest()}"
+
+    @classmethod
+    def _scrub(cls, url):
+        return re.sub(r'([?&]api_token=)[^&]*', rf'\g<1>{cls.SCRUBBED}', url)
+
+    def _record(self, method, url, kwargs, response, elapsed):
+        content = response.content or b''
+
+        try:
+            body, encoding = content.decode('utf-8'), 'utf-8'
+        except UnicodeDecodeError:
+            body, encoding = base64.b64encode(content).decode('ascii'), 'base64'
+
+        entry = {
+            'key': self._key(method, url, kwargs),
+            'method': method.upper(),
+            'url': self._scrub(url),
+            'status': response.status_code,
+            'headers': {k: response.headers[k] for k in self.HEADERS if k in response.headers},
+            'elapsed': round(elapsed, 6),
+            'headers_elapsed': round(response.elapsed.total_seconds(), 6),
+            'encoding': encoding,
+            'body': body,
+        }
+
+        with self._lock:
+            self._entries.append(entry)
+
+    def _load(self):
+        self._replay = {}
+
+        with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._replay.setdefault(entry['key'], collections.deque()).append(entry)
+
+    def _replay_request(self, method, url, **kwargs):
+        key = self._key(method, url, kwargs)
+
+        with self._lock:
+            queue = self._replay.get(key)
+            if not queue:
+                raise LookupError(f"Requisição não encontrada no cassete {self.path}: {key}")
+            entry = queue.popleft() if len(queue) > 1 else queue[0]
+
+        if self.latency == 'original':
+            time.sleep(entry['elapsed'])
+
+        response = requests.Response()
+        response.status_code = entry['status']
+        response.headers = requests.structures.CaseInsensitiveDict(entry['headers'])
+        response._content = entry['body'].encode('utf-8') if entry['encoding'] == 'utf-8' else base64.b64decode(entry['body'])
+        response._content_consumed = True
+        response.encoding = 'utf-8'
+        response.url = url
+        response.elapsed = datetime.timedelta(seconds=entry['headers_elapsed'] if self.latency == 'original' else 0)
+
+        return response
+
+
+def _endpoint_label():
+    # Nome da função pública da biblioteca mais próxima na pilha (ex: 'deals_get_all').
+    module_globals = globals()
+    frame = sys._getframe(2)
+
+    while frame is not None:
+        name = frame.f_code.co_name
+        if (frame.f_globals is module_globals and not name.startswith('_') and not name.endswith('_')
+                and inspect.isfunction(module_globals.get(name))):
+            return name
+        frame = frame.f_back
+
+    return 'unknown'
+
+
 
 # FUNÇÕES API
 def activities_add(subject, type, done=None, due_date=None, due_time=None, duration=None, user_id=None, deal_id=None, 
@@ -175,7 +1164,7 @@ def activities_add(subject, type, done=None, due_date=None, due_time=None, durat
     headers = {'Content-Type': 'application/json'}
     params = {'api_token': api_token}
     
-    response = requests.post(url, json=body, headers=headers, params=params)
+    response = request_('POST', url, json=body, headers=headers, params=params)
     
     if return_type == 'boolean':
         return response.status_code in [200, 201]
@@ -213,7 +1202,7 @@ def activities_delete(id, api_token=None, company_domain='api', return_type='com
     url = f'https://{company_domain}.pipedrive.com/v1/activities/{id}'
     params = {'api_token': api_token}
 
-    response = requests.delete(url, params=params)
+    response = request_('DELETE', url, params=params)
 
     if return_type == 'boolean':
         return response.status_code in [200, 201]
@@ -246,7 +1235,7 @@ def activities_delete_multiple(ids, api_token=None, company_domain='api', return
     params = {'api_token': api_token}
     body = {'ids': ids}
 
-    response = requests.delete(url, params=params, json=body)
+    response = request_('DELETE', url, params=params, json=body)
 
     if return_type == 'boolean':
         return response.status_code in [200, 201]
@@ -302,7 +1291,7 @@ def activities_get_all(user_id=None, filter_id=None, type=None, start=None, limi
     """
     api_token = check_api_token(api_token)
 
-    url = f'https://{company_domain}.pipedrive.com/v1/activities'
+    url = f'https://{company_domain}.pipedrive.com/v1/activities?'
     
     params = {
         'user_id': user_id,
@@ -377,7 +1366,7 @@ def activities_update(id, subject=None, done=None, type=None, due_date=None, due
     headers = {'Content-Type': 'application/json'}
     params = {'api_token': api_token}
 
-    response = requests.put(url, json=body, headers=headers, params=params)
+    response = request_('PUT', url, json=body, headers=headers, params=params)
 
     if return_type == 'boolean':
         return response.status_code in [200, 201]
@@ -444,7 +1433,7 @@ def activitytypes_add(name, icon_key, color=None, api_token=None, company_domain
     headers = {'Content-Type': 'application/json'}
     params = {'api_token': api_token}
 
-    response = requests.post(url, json=body, headers=headers, params=params)
+    response = request_('POST', url, json=body, headers=headers, params=params)
 
     if return_type == 'boolean':
         return response.status_code in [200, 201]
@@ -475,7 +1464,7 @@ def activitytypes_delete(id, api_token=None, company_domain='api', return_type='
     
     params = {'api_token': api_token}
 
-    response = requests.delete(url, params=params)
+    response = request_('DELETE', url, params=params)
 
     if return_type == 'boolean':
         return response.status_code in [200, 201]
@@ -506,7 +1495,7 @@ def activitytypes_delete_multiple(ids, api_token=None, company_domain='api', ret
     body = {'ids': ids}
     params = {'api_token': api_token}
 
-    response = requests.delete(url, params=params, json=body)
+    response = request_('DELETE', url, params=params, json=body)
 
     if return_type == 'boolean':
         return response.status_code in [200, 201]
@@ -570,7 +1559,7 @@ def activitytypes_update(id, name=None, icon_key=None, color=None, order_nr=None
     headers = {'Content-Type': 'application/json'}
     params = {'api_token': api_token}
 
-    response = requests.put(url, json=body, headers=headers, params=params)
+    response = request_('PUT', url, json=body, headers=headers, params=params)
 
     if return_type == 'boolean':
         return response.status_code in [200, 201]
@@ -609,7 +1598,7 @@ def authorizations_add(email, password, api_token=None, company_domain='api', re
     headers = {'Content-Type': 'application/json'}
     params = {'api_token': api_token}
 
-    response = requests.post(url, json=body, headers=headers, params=params)
+    response = request_('POST', url, json=body, headers=headers, params=params)
 
     if return_type == 'boolean':
         return response.status_code in [200, 201]
@@ -690,7 +1679,7 @@ def dealfields_add(name, field_type, options=None, api_token=None, company_domai
     headers = {'Content-Type': 'application/json'}
     params = {'api_token': api_token}
 
-    response = requests.post(url, json=body, headers=headers, params=params)
+    response = request_('POST', url, json=body, headers=headers, params=params)
 
     if return_type == 'boolean':
         return response.status_code in [200, 201]
@@ -720,7 +1709,7 @@ def dealfields_delete(id, api_token=None, company_domain='api', return_type='com
     
     params = {'api_token': api_token}
 
-    response = requests.delete(url, params=params)
+    response = request_('DELETE', url, params=params)
 
     if return_type == 'boolean':
         return response.status_code in [200, 201]
@@ -753,7 +1742,7 @@ def dealfields_delete_multiple(ids, api_token=None, company_domain='api', return
     body = {'ids': ids}
     params = {'api_token': api_token}
 
-    response = requests.delete(url, params=params, json=body)
+    response = request_('DELETE', url, params=params, json=body)
 
     if return_type == 'boolean':
         return response.status_code in [200, 201]
@@ -850,7 +1839,7 @@ def dealfields_update(id, name, options=None, api_token=None, company_domain='ap
     headers = {'Content-Type': 'application/json'}
     params = {'api_token': api_token}
 
-    response = requests.put(url, json=body, headers=headers, params=params)
+    response = request_('PUT', url, json=body, headers=headers, params=params)
 
     if return_type == 'boolean':
         return response.status_code in [200, 201]
@@ -916,7 +1905,7 @@ def deals_add(title, value=None, currency=None, user_id=None, person_id=None, or
     headers = {'Content-Type': 'application/json'}
     params = {'api_token': api_token}
 
-    response = requests.post(url, json=body, headers=headers, params=params)
+    response = request_('POST', url, json=body, headers=headers, params=params)
 
     if return_type == 'boolean':
         return response.status_code in [200, 201]
@@ -955,7 +1944,7 @@ def deals_add_follower(id, user_id, api_token=None, company_domain='api', return
     headers = {'Content-Type': 'application/json'}
     params = {'api_token': api_token}
 
-    response = requests.post(url, json=body, headers=headers, params=params)
+    response = request_('POST', url, json=body, headers=headers, params=params)
 
     if return_type == 'boolean':
         return response.status_code in [200, 201]
@@ -991,7 +1980,7 @@ def deals_add_participant(id, person_id, api_token=None, company_domain='api', r
     headers = {'Content-Type': 'application/json'}
     params = {'api_token': api_token}
 
-    response = requests.post(url, json=body, headers=headers, params=params)
+    response = request_('POST', url, json=body, headers=headers, params=params)
 
     if return_type == 'boolean':
         return response.status_code in [200, 201]
@@ -1046,7 +2035,7 @@ def deals_add_product(id, product_id, item_price, quantity, discount_percentage=
     headers = {'Content-Type': 'application/json'}
     params = {'api_token': api_token}
 
-    response = requests.post(url, json=body, headers=headers, params=params)
+    response = request_('POST', url, json=body, headers=headers, params=params)
 
     if return_type == 'boolean':
         return response.status_code in [200, 201]
@@ -1075,7 +2064,7 @@ def deals_delete(id, api_token=None, company_domain='api', return_type='complete
     url = f'https://{company_domain}.pipedrive.com/v1/deals/{id}'
     params = {'api_token': api_token}
 
-    response = requests.delete(url, params=params)
+    response = request_('DELETE', url, params=params)
 
     if return_type == 'boolean':
         return response.status_code in [200, 201]
@@ -1105,7 +2094,7 @@ def deals_delete_follower(id, follower_id, api_token=None, company_domain='api',
     url = f'https://{company_domain}.pipedrive.com/v1/deals/{id}/followers/{follower_id}'
     params = {'api_token': api_token}
 
-    response = requests.delete(url, params=params)
+    response = request_('DELETE', url, params=params)
 
     if return_type == 'boolean':
         return response.status_code in [200, 201]
@@ -1135,7 +2124,7 @@ def deals_delete_participant(id, deal_participant_id, api_token=None, company_do
     url = f'https://{company_domain}.pipedrive.com/v1/deals/{id}/participants/{deal_participant_id}'
     params = {'api_token': api_token}
 
-    response = requests.delete(url, params=params)
+    response = request_('DELETE', url, params=params)
 
     if return_type == 'boolean':
         return response.status_code in [200, 201]
@@ -1165,7 +2154,7 @@ def deals_delete_product(id, product_attachment_id, api_token=None, company_doma
     url = f'https://{company_domain}.pipedrive.com/v1/deals/{id}/products/{product_attachment_id}'
     params = {'api_token': api_token}
 
-    response = requests.delete(url, params=params)
+    response = request_('DELETE', url, params=params)
 
     if return_type == 'boolean':
         return response.status_code in [200, 201]
@@ -1196,7 +2185,7 @@ def deals_delete_multiple(ids, api_token=None, company_domain='api', return_type
     body = {'ids': ids}
     params = {'api_token': api_token}
 
-    response = requests.delete(url, params=params, json=body)
+    response = request_('DELETE', url, params=params, json=body)
 
     if return_type == 'boolean':
         return response.status_code in [200, 201]
@@ -1225,7 +2214,7 @@ def deals_duplicate(id, api_token=None, company_domain='api', return_type='compl
     url = f'https://{company_domain}.pipedrive.com/v1/deals/{id}/duplicate'
     params = {'api_token': api_token}
 
-    response = requests.post(url, params=params)
+    response = request_('POST', url, params=params)
 
     if return_type == 'boolean':
         return response.status_code in [200, 201]
@@ -1264,7 +2253,7 @@ def deals_find(term, person_id=None, org_id=None, api_token=None, company_domain
 
     params = {k: v for k, v in params.items() if v is not None}
 
-    response = requests.get(url, params=params)
+    response = request_('GET', url, params=params)
 
     return response.json()
 
@@ -1684,7 +2673,7 @@ def deals_timeline(start_date, interval, amount, field_key, user_id=None, pipeli
 
     params = {k: v for k, v in params.items() if v is not None}
 
-    response = requests.get(url, params=params)
+    response = request_('GET', url, params=params)
 
     return response.json()
  
@@ -1743,7 +2732,7 @@ def deals_update(id, title=None, value=None, currency=None, user_id=None, person
 
     params = {'api_token': api_token}
 
-    response = requests.put(url, json=body, params=params)
+    response = request_('PUT', url, json=body, params=params)
 
     if return_type == 'boolean':
         return response.status_code in [200, 201]
@@ -1775,7 +2764,7 @@ def deals_update_merge(id, merge_with_id, api_token=None, company_domain='api',
 
     params = {'api_token': api_token}
 
-    response = requests.put(url, json=body, params=params)
+    response = request_('PUT', url, json=body, params=params)
 
     if return_type == 'boolean':
         return response.status_code in [200, 201]
@@ -1820,7 +2809,7 @@ def deals_update_products(id, deal_product_id, item_price, quantity, discount_pe
     body = {k: v for k, v in body.items() if v is not None}
     params = {'api_token': api_token}
 
-    response = requests.put(url, json=body, params=params)
+    response = request_('PUT', url, json=body, params=params)
 
     if return_type == 'boolean':
         return response.status_code in [200, 201]
@@ -1865,7 +2854,7 @@ def files_add(file, deal_id=None, person_id=None, org_id=None, product_id=None,
     body = {k: v for k, v in body.items() if v is not None}
     params = {'api_token': api_token}
 
-    response = requests.post(url, files=files, data=body, params=params)
+    response = request_('POST', url, files=files, data=body, params=params)
 
     if return_type == 'boolean':
         return response.status_code in [200, 201]
@@ -1892,7 +2881,7 @@ def files_delete(id, api_token=None, company_domain='api', return_type='complete
 
     params = {'api_token': api_token}
 
-    response = requests.delete(url, params=params)
+    response = request_('DELETE', url, params=params)
 
     if return_type == 'boolean':
         return response.status_code in [200, 201]
@@ -1916,7 +2905,7 @@ def files_get(id, api_token=None, company_domain='api'):
     
     params = {'api_token': api_token}
 
-    response = requests.get(url, params=params)
+    response = request_('GET', url, params=params)
     return response.json()
 
 def files_get_download(id, save, api_token=None, company_domain='api'):
@@ -1937,7 +2926,7 @@ def files_get_download(id, save, api_token=None, company_domain='api'):
     
     params = {'api_token': api_token}
 
-    response = requests.get(url, params=params, stream=True)
+    response = request_('GET', url, params=params, stream=True)
     with open(save, 'wb') as f:
         for chunk in response.iter_content(chunk_size=8192):
             f.write(chunk)
@@ -2009,7 +2998,7 @@ def files_remote(file_type, title, item_type, item_id, remote_location, api_toke
     
     params = {'api_token': api_token}
 
-    response = requests.post(url, json=body, params=params)
+    response = request_('POST', url, json=body, params=params)
 
     if return_type == 'boolean':
         return response.status_code in [200, 201]
@@ -2047,7 +3036,7 @@ def files_remotelink(item_type, item_id, remote_id, remote_location, api_token=N
     
     params = {'api_token': api_token}
 
-    response = requests.post(url, json=body, params=params)
+    response = request_('POST', url, json=body, params=params)
 
     if return_type == 'boolean':
         return response.status_code in [200, 201]
@@ -2081,7 +3070,7 @@ def files_update(id, name=None, description=None, api_token=None, company_domain
     
     params = {'api_token': api_token}
 
-    response = requests.put(url, json=body, params=params)
+    response = request_('PUT', url, json=body, params=params)
 
     if return_type == 'boolean':
         return response.status_code in [200, 201]
@@ -2116,7 +3105,7 @@ def filters_add(name, conditions, filter_type, api_token=None, company_domain='a
     
     params = {'api_token': api_token}
 
-    response = requests.post(url, json=body, params=params)
+    response = request_('POST', url, json=body, params=params)
 
     if return_type == 'boolean':
         return response.status_code in [200, 201]
@@ -2141,7 +3130,7 @@ def filters_delete(id, api_token=None, company_domain='api', return_type='comple
     
     params = {'api_token': api_token}
 
-    response = requests.delete(url, params=params)
+    response = request_('DELETE', url, params=params)
 
     if return_type == 'boolean':
         return response.status_code in [200, 201]
@@ -2153,7 +3142,7 @@ def filters_delete_multiple(ids, api_token=None, company_domain='api', return_ty
     Função para deletar múltiplos filtros em massa no Pipedrive.
 
     Parâmetros:
-    - ids (str): IDs de filtros separados por vírgulas para deletar.
+    - ids (str ou list): IDs de filtros separados por vírgulas (ou uma lista de IDs) para deletar.
     - api_token (str, opcional): Token de API para autenticação. Se não fornecido, será tratado.
     - company_domain (str, opcional): Domínio da empresa. Padrão é 'api'.
     - return_type (str, opcional): O retorno padrão é 'complete' com todas as informações do processo,
@@ -2163,13 +3152,16 @@ def filters_delete_multiple(ids, api_token=None, company_domain='api', return_ty
     - Se 'complete', retorna um dicionário com as informações do processo.
     - Se 'boolean', retorna True para sucesso ou False para falha.
     """
-    api_token = check_api_token_(api_token)
+    api_token = check_api_token(api_token)
+
+    if isinstance(ids, (list, tuple, set)):
+        ids = ','.join(str(i) for i in ids)
     
     url = f'https://{company_domain}.pipedrive.com/v1/filters?api_token={api_token}'
     
-    bodyList = {'ids': ids}
+    params = {'ids': ids}
     
-    response = requests.delete(url, json=bodyList)
+    response = request_('DELETE', url, params=params)
     
     if return_type == 'boolean':
         return response.status_code in [200, 201]
@@ -2237,7 +3229,7 @@ def globalmessages_delete(id, api_token=None, company_domain='api', return_type=
     
     url = f'https://{company_domain}.pipedrive.com/v1/globalMessages/{id}?api_token={api_token}'
     
-    r = requests.delete(url)
+    r = request_('DELETE', url)
     
     if return_type == 'boolean':
         return r.status_code in [200, 201]
@@ -2317,7 +3309,7 @@ def mailthreads_delete(id, api_token=None, company_domain='api', return_type='co
     
     url = f'https://{company_domain}.pipedrive.com/v1/mailbox/mailThreads/{id}?api_token={api_token}'
     
-    r = requests.delete(url)
+    r = request_('DELETE', url)
     
     if return_type == 'boolean':
         return r.status_code in [200, 201]
@@ -2430,7 +3422,7 @@ def mailthreads_update(id, deal_id=None, shared_flag=None, read_flag=None, archi
 
     body = clear_list(body)
     
-    r = requests.put(url, json=body)
+    r = request_('PUT', url, json=body)
     
     if return_type == 'boolean':
         return r.status_code in [200, 201]
@@ -2473,7 +3465,7 @@ def mailthreads_update(id, deal_id=None, shared_flag=None, read_flag=None, archi
 
     body = clear_list(body)
     
-    r = requests.put(url, json=body)
+    r = request_('PUT', url, json=body)
     
     if return_type == 'boolean':
         return r.status_code in [200, 201]
@@ -2523,7 +3515,7 @@ def notes_add(content, deal_id=None, person_id=None, org_id=None, add_time=None,
 
     try:
 
-        r = requests.post(url, json=body)
+        r = request_('POST', url, json=body)
 
         if return_type == 'boolean':
             return r.status_code in [200, 201]
@@ -2556,7 +3548,7 @@ def notes_delete(id, api_token=None, company_domain='api', return_type='complete
     url = f'https://{company_domain}.pipedrive.com/v1/notes/{id}?api_token={api_token}'
 
     try:
-        r = requests.delete(url)
+        r = request_('DELETE', url)
 
         if return_type == 'boolean':
             return r.status_code in [200, 201]
@@ -2679,7 +3671,7 @@ def notes_update(id, content, deal_id=None, person_id=None, org_id=None, add_tim
     body = clear_list(body)
 
     try:
-        r = requests.put(url, json=body)
+        r = request_('PUT', url, json=body)
         if return_type == 'boolean':
             return r.status_code in [200, 201]
         else:
@@ -2712,7 +3704,7 @@ def organizationfields_delete(id, api_token=None, company_domain='api', return_t
     url = f'https://{company_domain}.pipedrive.com/v1/organizationFields/{id}?api_token={api_token}'
 
     try:
-        r = requests.delete(url)
+        r = request_('DELETE', url)
 
         if return_type == 'boolean':
             return r.status_code in [200, 201]
@@ -2750,7 +3742,7 @@ def organizationfields_delete_multiple(ids, api_token=None, company_domain='api'
     }
 
     try:
-        r = requests.delete(url, json=body)
+        r = request_('DELETE', url, json=body)
 
         if return_type == 'boolean':
             return r.status_code in [200, 201]
@@ -2834,7 +3826,7 @@ def organizationfields_update(id, name, options=None, api_token=None, company_do
     body = clear_list(body)
 
     try:
-        r = requests.put(url, json=body)
+        r = request_('PUT', url, json=body)
 
         if return_type == 'boolean':
             return r.status_code in [200, 201]
@@ -2876,7 +3868,7 @@ def organizationrelationships_add(type, rel_owner_org_id, rel_linked_org_id, org
     body = clear_list(body)
 
     try:
-        r = requests.post(url, json=body)
+        r = request_('POST', url, json=body)
         if return_type == 'boolean':
             return r.status_code in [200, 201]
         else:
@@ -2908,7 +3900,7 @@ def organizationrelationships_delete(id, api_token=None, company_domain='api', r
     url = f'https://{company_domain}.pipedrive.com/v1/organizationRelationships/{id}?api_token={api_token}'
 
     try:
-        r = requests.delete(url)
+        r = request_('DELETE', url)
         if return_type == 'boolean':
             return r.status_code in [200, 201]
         else:
@@ -3018,7 +4010,7 @@ def organizationrelationships_update(id, org_id=None, type=None, rel_owner_org_i
     body = clear_list(body)
 
     try:
-        r = requests.put(url, json=body)
+        r = request_('PUT', url, json=body)
 
         if return_type == 'boolean':
             return r.status_code in [200, 201]
@@ -3066,7 +4058,7 @@ def organizations_add(name, owner_id=None, visible_to=None, add_time=None, custo
     body = clear_list(body)
 
     try:
-        r = requests.post(url, json=body)
+        r = request_('POST', url, json=body)
 
         if return_type == 'boolean':
             return r.status_code in [200, 201]
@@ -3107,7 +4099,7 @@ def organizations_add_followers(id, user_id, api_token=None, company_domain='api
     body = clear_list(body)
 
     try:
-        r = requests.post(url, json=body)
+        r = request_('POST', url, json=body)
 
         if return_type == 'boolean':
             return r.status_code in [200, 201]
@@ -3141,7 +4133,7 @@ def organizations_delete(id, api_token=None, company_domain='api', return_type='
     url = f'https://{company_domain}.pipedrive.com/v1/organizations/{id}?api_token={api_token}'
 
     try:
-        r = requests.delete(url)
+        r = request_('DELETE', url)
 
         if return_type == 'boolean':
             return r.status_code in [200, 201]
@@ -3177,7 +4169,7 @@ def organizations_delete_followers(id, follower_id, api_token=None, company_doma
     url = f'https://{company_domain}.pipedrive.com/v1/organizations/{id}/followers/{follower_id}?api_token={api_token}'
 
     try:
-        r = requests.delete(url)
+        r = request_('DELETE', url)
         if return_type == 'boolean':
             return r.status_code in [200, 201]
         else:
@@ -3213,7 +4205,7 @@ def organizations_delete_multiple(ids, api_token=None, company_domain='api', ret
     }
 
     try:
-        r = requests.delete(url, json=body)
+        r = request_('DELETE', url, json=body)
         if return_type == 'boolean':
             return r.status_code in [200, 201]
         else:
@@ -3244,7 +4236,7 @@ def organizations_find(term, start=None, limit=None, api_token=None, company_dom
     api_token = check_api_token(api_token)
 
     params = {
-        'term': term,
+        'term': urllib.parse.quote(str(term), safe=''),
         'start': start if start is not None else 0,
         'limit': limit if limit is not None else 500
     }
@@ -3638,7 +4630,7 @@ def organizations_update(id, name=None, owner_id=None, visible_to=None, custom_l
 
     url += f'api_token={api_token}'
 
-    response = requests.put(url, json=bodyList)
+    response = request_('PUT', url, json=bodyList)
 
     if return_type == 'boolean':
         return response.status_code in [200, 201]
@@ -3673,7 +4665,7 @@ def organizations_update_merge(id, merge_with_id, api_token=None, company_domain
 
     url += f'api_token={api_token}'
 
-    response = requests.put(url, json=bodyList)
+    response = request_('PUT', url, json=bodyList)
     if return_type == 'boolean':
         return response.status_code in [200, 201]
     else:
@@ -3707,7 +4699,7 @@ def permissionsets_add(id, user_id, api_token=None, company_domain='api', return
 
     url += f'api_token={api_token}'
 
-    response = requests.post(url, json=bodyList)
+    response = request_('POST', url, json=bodyList)
 
     if return_type == 'boolean':
         return response.status_code in [200, 201]
@@ -3736,7 +4728,7 @@ def permissionsets_delete(id, user_id, api_token=None, company_domain='api', ret
 
     url += f'api_token={api_token}'
 
-    response = requests.delete(url)
+    response = request_('DELETE', url)
 
     if return_type == 'boolean':
         return response.status_code in [200, 201]
@@ -3856,7 +4848,7 @@ def permissionsets_update(id, contents, api_token=None, company_domain='api', re
 
     url += f'api_token={api_token}'
 
-    response = requests.put(url, json=bodyList)
+    response = request_('PUT', url, json=bodyList)
 
     if return_type == 'boolean':
         return response.status_code in [200, 201]
@@ -3894,7 +4886,7 @@ def personfields_add(name, field_type, options=None, api_token=None, company_dom
 
     url += f'api_token={api_token}'
 
-    response = requests.post(url, json=bodyList)
+    response = request_('POST', url, json=bodyList)
 
     if return_type == 'boolean':
         return response.status_code in [200, 201]
@@ -3922,7 +4914,7 @@ def personfields_delete(id, api_token=None, company_domain='api', return_type='c
 
     url += f'api_token={api_token}'
 
-    response = requests.delete(url)
+    response = request_('DELETE', url)
 
     if return_type == 'boolean':
         return response.status_code in [200, 201]
@@ -3954,7 +4946,7 @@ def personfields_delete_multiple(ids, api_token=None, company_domain='api', retu
 
     url += f'api_token={api_token}'
 
-    response = requests.delete(url, json=bodyList)
+    response = request_('DELETE', url, json=bodyList)
 
     if return_type == 'boolean':
         return response.status_code in [200, 201]
@@ -4073,7 +5065,7 @@ def personfields_update(id, name, options=None, api_token=None, company_domain='
 
     bodyList.pop('id', None)
 
-    response = requests.put(url, json=bodyList)
+    response = request_('PUT', url, json=bodyList)
 
     if return_type == 'boolean':
         return response.status_code in [200, 201]
@@ -4134,7 +5126,7 @@ def persons_add(name, owner_id=None, org_id=None, email=None, phone=None, visibl
 
     url += f'api_token={api_token}'
 
-    response = requests.post(url, json=bodyList)
+    response = request_('POST', url, json=bodyList)
 
     if return_type == 'boolean':
         return response.status_code in [200, 201]
@@ -4187,7 +5179,7 @@ def persons_add_follower(id, user_id, api_token=None, company_domain='api', retu
     url += f'api_token={api_token}'
 
     
-    response = requests.post(url, json=bodyList)
+    response = request_('POST', url, json=bodyList)
 
     
     if return_type == 'boolean':
@@ -4254,7 +5246,7 @@ def persons_add_picture(id, file, crop_x=None, crop_y=None, crop_width=None, cro
     url += f'api_token={api_token}'
 
      
-    response = requests.post(url, data=bodyList, files=files)
+    response = request_('POST', url, data=bodyList, files=files)
 
     
     if return_type == 'boolean':
@@ -4299,7 +5291,7 @@ def persons_delete(id, api_token=None, company_domain='api', return_type='comple
     url += f'api_token={api_token}'
 
     
-    response = requests.delete(url)
+    response = request_('DELETE', url)
 
     
     if return_type == 'boolean':
@@ -4347,7 +5339,7 @@ def persons_delete_followers(id, follower_id, api_token=None, company_domain='ap
     url += f'api_token={api_token}'
 
     
-    response = requests.delete(url)
+    response = request_('DELETE', url)
 
     
     if return_type == 'boolean':
@@ -4391,7 +5383,7 @@ def persons_delete_picture(id, api_token=None, company_domain='api', return_type
     url += f'api_token={api_token}'
 
     
-    response = requests.delete(url)
+    response = request_('DELETE', url)
 
     
     if return_type == 'boolean':
@@ -4439,7 +5431,7 @@ def persons_delete_multiple(ids, api_token=None, company_domain='api', return_ty
     
     url += f'api_token={api_token}'
 
-    response = requests.delete(url, json=bodyList)
+    response = request_('DELETE', url, json=bodyList)
 
     
     if return_type == 'boolean':
@@ -4481,7 +5473,7 @@ def persons_find(term, org_id=None, start=None, limit=None, search_by_email=None
     url = url.replace("{company_domain}", company_domain)
 
     bodyList = {
-        'term': term,
+        'term': urllib.parse.quote(str(term), safe=''),
         'org_id': org_id,
         'start': 0 if start is None else start,
         'limit': 500 if limit is None else limit,
@@ -4998,7 +5990,7 @@ def persons_update(id, name=None, owner_id=None, org_id=None, email=None, phone=
         del body_dict['id']
 
     
-    response = requests.put(url, json=body_dict)
+    response = request_('PUT', url, json=body_dict)
 
     
     if return_type == 'boolean':
@@ -5043,7 +6035,7 @@ def persons_update_merge(id, merge_with_id, api_token=None, company_domain='api'
         del body_dict['id']
 
     
-    response = requests.put(url, json=body_dict)
+    response = request_('PUT', url, json=body_dict)
 
     
     if return_type == 'boolean':
@@ -5088,7 +6080,7 @@ def pipelines_add(name=None, deal_probability=None, order_nr=None, active=None,
     url += f"api_token={api_token}"
 
     
-    response = requests.post(url, json=body_dict)
+    response = request_('POST', url, json=body_dict)
 
     
     if return_type == 'boolean':
@@ -5116,7 +6108,7 @@ def pipelines_delete(id, api_token=None, company_domain='api', return_type='comp
     url = f'https://{company_domain}.pipedrive.com/v1/pipelines/{id}?api_token={api_token}'
 
     
-    response = requests.delete(url)
+    response = request_('DELETE', url)
 
     
     if return_type == 'boolean':
@@ -5341,7 +6333,7 @@ def pipelines_update(id, name=None, deal_probability=None, order_nr=None, active
     body_dict = clear_list(body_dict)
 
     
-    response = requests.put(url, json=body_dict)
+    response = request_('PUT', url, json=body_dict)
 
     
     if return_type == 'boolean':
@@ -5382,7 +6374,7 @@ def productfields_add(name, field_type, options=None, api_token=None, company_do
     body_dict = clear_list(body_dict)
 
     
-    response = requests.post(url, json=body_dict)
+    response = request_('POST', url, json=body_dict)
 
     
     if return_type == 'boolean':
@@ -5410,7 +6402,7 @@ def productfields_delete(id, api_token=None, company_domain='api', return_type='
     url = f'https://{company_domain}.pipedrive.com/v1/productFields/{id}?api_token={api_token}'
 
     
-    response = requests.delete(url)
+    response = request_('DELETE', url)
 
     
     if return_type == 'boolean':
@@ -5442,7 +6434,7 @@ def productfields_delete_multiple(ids, api_token=None, company_domain='api', ret
         'ids': ids
     }
 
-    response = requests.delete(url, json=body_dict)
+    response = request_('DELETE', url, json=body_dict)
 
     
     if return_type == 'boolean':
@@ -5524,7 +6516,7 @@ def productfields_update(id, name, options=None, api_token=None, company_domain=
     body_dict = clear_list(body_dict)
 
     
-    response = requests.put(url, json=body_dict)
+    response = request_('PUT', url, json=body_dict)
 
     
     if return_type == 'boolean':
@@ -5578,7 +6570,7 @@ def products_add(name, code=None, unit=None, tax=None, active_flag=None, visible
     body_dict = clear_list(body_dict)
 
     
-    response = requests.post(url, json=body_dict)
+    response = request_('POST', url, json=body_dict)
 
     
     if return_type == 'boolean':
@@ -5616,7 +6608,7 @@ def products_add_followers(id, user_id, api_token=None, company_domain='api', re
     body_dict = clear_list(body_dict)
 
     
-    response = requests.post(url, json=body_dict)
+    response = request_('POST', url, json=body_dict)
 
     
     if return_type == 'boolean':
@@ -5644,7 +6636,7 @@ def products_delete(id, api_token=None, company_domain='api', return_type='compl
     url = f'https://{company_domain}.pipedrive.com/v1/products/{id}?api_token={api_token}'
 
     
-    response = requests.delete(url)
+    response = request_('DELETE', url)
 
     
     if return_type == 'boolean':
@@ -5673,7 +6665,7 @@ def products_delete_followers(id, follower_id, api_token=None, company_domain='a
     url = f'https://{company_domain}.pipedrive.com/v1/products/{id}/followers/{follower_id}?api_token={api_token}'
 
     
-    response = requests.delete(url)
+    response = request_('DELETE', url)
 
     
     if return_type == 'boolean':
@@ -5960,7 +6952,7 @@ def products_update(id, name=None, code=None, unit=None, tax=None, active_flag=N
     body_dict = clear_list(body_dict)
 
     
-    response = requests.put(url, json=body_dict)
+    response = request_('PUT', url, json=body_dict)
 
     
     if return_type == 'boolean':
@@ -6002,7 +6994,7 @@ def recents_get(since_timestamp, items=None, start=None, limit=None, api_token=N
     body_dict = clear_list(body_dict)
 
     
-    url += prepare_url_parameters_(body_dict)
+    url += f"&{prepare_url_parameters_(body_dict)}"
 
     
     return get_all_(url)
@@ -6036,7 +7028,7 @@ def roles_add_assignments(id, user_id, api_token=None, company_domain='api', ret
     body_dict = clear_list(body_dict)
 
     
-    response = requests.post(url, json=body_dict)
+    response = request_('POST', url, json=body_dict)
 
     
     if return_type == 'boolean':
@@ -6074,7 +7066,7 @@ def roles_add_settings(id, value, api_token=None, company_domain='api', return_t
     body_dict = clear_list(body_dict)
 
     
-    response = requests.post(url, json=body_dict)
+    response = request_('POST', url, json=body_dict)
 
     
     if return_type == 'boolean':
@@ -6102,7 +7094,7 @@ def roles_delete(id, api_token=None, company_domain='api', return_type='complete
     url = f'https://{company_domain}.pipedrive.com/v1/roles/{id}?api_token={api_token}'
 
     
-    response = requests.delete(url)
+    response = request_('DELETE', url)
 
     
     if return_type == 'boolean':
@@ -6131,7 +7123,7 @@ def roles_delete_assignments(id, user_id, api_token=None, company_domain='api',
     url = f'https://{company_domain}.pipedrive.com/v1/roles/{id}/assignments?api_token={api_token}&user_id={user_id}'
 
     
-    response = requests.delete(url)
+    response = request_('DELETE', url)
 
     
     if return_type == 'boolean':
@@ -6191,7 +7183,7 @@ def roles_get_assignments(id, start=None, limit=None, api_token=None, company_do
     body_dict = clear_list(body_dict)
 
     
-    url += prepare_url_parameters_(body_dict)
+    url += f"&{prepare_url_parameters_(body_dict)}"
 
     
     return get_all_(url)
@@ -6226,7 +7218,7 @@ def roles_get_roles(id, start=None, limit=None, api_token=None, company_domain='
     body_dict = clear_list(body_dict)
 
     
-    url += prepare_url_parameters_(body_dict)
+    url += f"&{prepare_url_parameters_(body_dict)}"
 
     
     return get_all_(url)
@@ -6281,7 +7273,7 @@ def roles_get_all(start=None, limit=None, api_token=None, company_domain='api'):
     body_dict = clear_list(body_dict)
 
     
-    url += prepare_url_parameters_(body_dict)
+    url += f"&{prepare_url_parameters_(body_dict)}"
 
     
     return get_all_(url)
@@ -6311,7 +7303,7 @@ def roles_update(id, api_token=None, company_domain='api', return_type='complete
     }
 
     
-    response = requests.put(url, json=body_dict)
+    response = request_('PUT', url, json=body_dict)
 
     
     if return_type == 'boolean':
@@ -6354,7 +7346,7 @@ def searchresults_get(term, item_type=None, start=None, limit=None, exact_match=
     body_dict = clear_list(body_dict)
 
     
-    url += prepare_url_parameters_(body_dict)
+    url += f"&{prepare_url_parameters_(body_dict)}"
 
     
     return get_all_(url)
@@ -6442,7 +7434,7 @@ def stages_add(name, pipeline_id, deal_probability=None, rotten_flag=None, rotte
     body_dict = clear_list(body_dict)
 
     
-    response = requests.post(url, json=body_dict)
+    response = request_('POST', url, json=body_dict)
 
     
     if return_type == 'boolean':
@@ -6470,7 +7462,7 @@ def stages_delete(id, api_token=None, company_domain='api', return_type='complet
     url = f'https://{company_domain}.pipedrive.com/v1/stages/{id}?api_token={api_token}'
 
     
-    response = requests.delete(url)
+    response = request_('DELETE', url)
 
     
     if return_type == 'boolean':
@@ -6503,7 +7495,7 @@ def stages_delete_multiple(ids, api_token=None, company_domain='api', return_typ
         'ids': ids
     }
 
-    response = requests.delete(url, json=body_dict)
+    response = request_('DELETE', url, json=body_dict)
 
     
     if return_type == 'boolean':
@@ -6568,7 +7560,7 @@ def stages_get_deals(id, filter_id=None, user_id=None, everyone=None, start=None
     body_dict = clear_list(body_dict)
 
     
-    url += prepare_url_parameters_(body_dict)
+    url += f"&{prepare_url_parameters_(body_dict)}"
 
     
     return get_all_(url)
@@ -6596,8 +7588,10 @@ def stages_get_all(pipeline_id=None, api_token=None, company_domain='api'):
     if pipeline_id is not None:
         params['pipeline_id'] = pipeline_id
 
-    
-    return get_all_(url, params=params)
+    if params:
+        url = f"{url}&{prepare_url_parameters_(params)}"
+
+    return get_all_(url)
 
 
 def stages_update(id, name=None, pipeline_id=None, order_nr=None, deal_probability=None, rotten_flag=None, rotten_days=None, api_token=None, company_domain='api', return_type='complete'):
@@ -6639,7 +7633,7 @@ def stages_update(id, name=None, pipeline_id=None, order_nr=None, deal_probabili
     body_dict = clear_list(body_dict)
 
     
-    response = requests.put(url, json=body_dict)
+    response = request_('PUT', url, json=body_dict)
 
     
     if return_type == 'boolean':
@@ -6698,7 +7692,7 @@ def users_add(name, email, active_flag, api_token=None, company_domain='api', re
     
     body_dict = clear_list(body_dict)
 
-    response = requests.post(url, json=body_dict)
+    response = request_('POST', url, json=body_dict)
 
     
     if return_type == 'boolean':
@@ -6733,7 +7727,7 @@ def users_add_blacklisted_emails(id, address, api_token=None, company_domain='ap
     }
 
      
-    response = requests.post(url, json=body_dict)
+    response = request_('POST', url, json=body_dict)
 
     
     if return_type == 'boolean':
@@ -6766,7 +7760,7 @@ def users_add_role_assignments(id, role_id, api_token=None, company_domain='api'
         'role_id': role_id
     }
 
-    response = requests.post(url, json=body_dict)
+    response = request_('POST', url, json=body_dict)
 
     
     if return_type == 'boolean':
@@ -6794,7 +7788,7 @@ def users_delete_role_assignments(id, role_id, api_token=None, company_domain='a
     
     url = f'https://{company_domain}.pipedrive.com/v1/users/{id}/roleAssignments?api_token={api_token}'
 
-    response = requests.delete(url)
+    response = request_('DELETE', url)
 
     
     if return_type == 'boolean':
@@ -6832,7 +7826,7 @@ def users_find(term, search_by_email=None, api_token=None, company_domain='api')
     body_dict = {k: v for k, v in body_dict.items() if v is not None}
 
     
-    response = requests.get(url, params=body_dict)
+    response = request_('GET', url, params=body_dict)
 
     
     return response
@@ -6857,7 +7851,7 @@ def users_get(id, api_token=None, company_domain='api'):
     url = f'https://{company_domain}.pipedrive.com/v1/users/{id}?api_token={api_token}'
 
     
-    response = requests.get(url)
+    response = request_('GET', url)
 
     
     return response
@@ -6898,7 +7892,7 @@ def users_get_activities(id, due_date=None, activity_type=None, start=None, limi
     params = {k: v for k, v in params.items() if v is not None}
 
     
-    response = requests.get(url, params=params)
+    response = request_('GET', url, params=params)
 
     
     return response
@@ -6925,7 +7919,7 @@ def users_get_blacklisted_emails(id, api_token=None, company_domain='api'):
     url = f'https://{company_domain}.pipedrive.com/v1/users/{id}/blacklistedEmails?api_token={api_token}'
 
     
-    response = requests.get(url)
+    response = request_('GET', url)
 
     
     return response
@@ -6952,7 +7946,7 @@ def users_get_followers(id, api_token=None, company_domain='api'):
     
     url = f'https://{company_domain}.pipedrive.com/v1/users/{id}/followers?api_token={api_token}'
 
-    response = requests.get(url)
+    response = request_('GET', url)
 
     
     return response
@@ -6978,7 +7972,7 @@ def users_get_permissions(user_id, api_token=None, company_domain='api'):
     url = f'https://{company_domain}.pipedrive.com/v1/users/{user_id}/permissions?api_token={api_token}'
 
     
-    response = requests.get(url)
+    response = request_('GET', url)
 
     
     return response
@@ -7012,7 +8006,7 @@ def users_get_role_assignments(user_id, start=None, limit=None, api_token=None,
     if limit is not None:
         params['limit'] = limit or 500  
 
-    response = requests.get(url, params=params)
+    response = request_('GET', url, params=params)
 
     
     return response
@@ -7038,7 +8032,7 @@ def users_get_role_settings(user_id, api_token=None, company_domain='api'):
     
     url = f'https://{company_domain}.pipedrive.com/v1/users/{user_id}/roleSettings?api_token={api_token}'
 
-    response = requests.get(url)
+    response = request_('GET', url)
 
     
     return response
@@ -7062,7 +8056,7 @@ def users_get_all(api_token=None, company_domain='api'):
 
     url = f'https://{company_domain}.pipedrive.com/v1/users?api_token={api_token}'
 
-    response = requests.get(url)
+    response = request_('GET', url)
 
     return response
 
@@ -7085,7 +8079,7 @@ def users_me(api_token=None, company_domain='api'):
 
     url = f'https://{company_domain}.pipedrive.com/v1/users/me?api_token={api_token}'
 
-    response = requests.get(url)
+    response = request_('GET', url)
 
     return response
 
@@ -7112,7 +8106,7 @@ def users_update(id, active_flag, api_token=None, company_domain='api', return_t
 
     body = {'active_flag': active_flag}
 
-    response = requests.put(url, json=body)
+    response = request_('PUT', url, json=body)
 
     if return_type == 'boolean':
         return response.status_code in {200, 201}
@@ -7137,7 +8131,7 @@ def usersettings_get(api_token=None, company_domain='api'):
 
     url = f'https://{company_domain}.pipedrive.com/v1/userSettings?api_token={api_token}'
 
-    response = requests.get(url)
+    response = request_('GET', url)
 
     return response.json()
 
@@ -7178,7 +8172,7 @@ def webhooks_add(subscription_url, event_action, event_object, user_id=None, htt
     
     payload = {k: v for k, v in payload.items() if v is not None}
 
-    response = requests.post(url, json=payload)
+    response = request_('POST', url, json=payload)
 
  
     if return_type == 'boolean':
@@ -7207,7 +8201,7 @@ def webhooks_delete(id, api_token=None, company_domain='api', return_type='compl
     url = f'https://{company_domain}.pipedrive.com/v1/webhooks/{id}?api_token={api_token}'
 
 
-    response = requests.delete(url)
+    response = request_('DELETE', url)
 
 
     if return_type == 'boolean':
@@ -7233,6 +8227,4516 @@ def webhooks_get_all(api_token=None, company_domain='api'):
 
     url = f'https://{company_domain}.pipedrive.com/v1/webhooks?api_token={api_token}'
 
-    response = requests.get(url)
+    response = request_('GET', url)
 
     return response.json()
+
+
+
+# CLIENTE MULTI-TENANT
+class FairScheduler:
+    """
+    Escalonador justo de chamadas entre tenants (PipedriveClient).
+
+    Cada tenant tem duas filas: 'interactive' e 'bulk'. Os workers percorrem os tenants em round-robin,
+    atendendo primeiro as chamadas interativas de todos os tenants, e cada tenant executa no máximo
+    max_per_tenant chamadas ao mesmo tempo. Assim a exportação em massa de um tenant não ocupa todos os
+    workers nem atrasa as chamadas interativas dos demais.
+
+    Parâmetros:
+    - max_workers (int, opcional): Número de threads de trabalho. Padrão é 16.
+    - max_per_tenant (int, opcional): Máximo de chamadas simultâneas por tenant. Padrão é 4.
+
+    # Exemplo de uso:
+        scheduler = FairScheduler(max_workers=32)
+        cliente_a = PipedriveClient('token_a', 'empresa_a', scheduler=scheduler)
+        cliente_b = PipedriveClient('token_b', 'empresa_b', scheduler=scheduler)
+        exportacao = cliente_a.submit('deals_get_all', priority='bulk')
+        pessoa = cliente_b.submit('persons_get', id=1)
+        print(pessoa.result())
+    """
+
+    PRIORITIES = ('interactive', 'bulk')
+
+    def __init__(self, max_workers=16, max_per_tenant=4):
+        self.max_per_tenant = max_per_tenant
+        self._cond = threading.Condition()
+        self._queues = {}
+        self._order = collections.deque()
+        self._running = collections.Counter()
+        self._pending = 0
+        self._closed = False
+        self._threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(max_workers)]
+
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, tenant, func, *args, priority='interactive', **kwargs):
+        """
+        Agenda a execução de uma função da biblioteca no contexto de um tenant. A chamada é executada com as
+        mesmas opções de contexto (ex: page_options) ativas no momento do submit.
+
+        Parâmetros:
+        - tenant (PipedriveClient): Cliente do tenant que fará a chamada.
+        - func (str ou callable): Função da biblioteca (ou o nome dela, ex: 'deals_get_all').
+        - priority (str, opcional): 'interactive' (padrão) ou 'bulk'.
+
+        Retorna:
+        concurrent.futures.Future: Future com o resultado da chamada.
+        """
+        if priority not in self.PRIORITIES:
+            raise ValueError(f"Prioridade inválida: {priority}. Valores permitidos: {self.PRIORITIES}")
+
+        future = concurrent.futures.Future()
+
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("O escalonador já foi encerrado.")
+
+            queues = self._queues.setdefault(tenant, {p: collections.deque() for p in self.PRIORITIES})
+            queues[priority].append((future, contextvars.copy_context(), func, args, kwargs))
+
+            if tenant not in self._order:
+                self._order.append(tenant)
+
+            self._pending += 1
+            self._cond.notify()
+
+        return future
+
+    def shutdown(self, wait=True):
+        """
+        Encerra o escalonador após executar as chamadas já agendadas.
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def _next(self):
+        # Chamado com o lock adquirido. Retorna (tenant, item) ou None.
+        for priority in self.PRIORITIES:
+            for _ in range(len(self._order)):
+                tenant = self._order[0]
+                self._order.rotate(-1)
+
+                if self._running[tenant] >= self.max_per_tenant:
+                    continue
+
+                queue = self._queues[tenant][priority]
+
+                if queue:
+                    item = queue.popleft()
+
+                    if not any(self._queues[tenant].values()):
+                        self._order.remove(tenant)
+
+                    return tenant, item
+
+        return None
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                picked = self._next()
+
+                while picked is None:
+                    if self._closed and self._pending == 0:
+                        return
+                    self._cond.wait()
+                    picked = self._next()
+
+                tenant, (future, context, func, args, kwargs) = picked
+                self._pending -= 1
+                self._running[tenant] += 1
+
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        future.set_result(context.run(tenant.call, func, *args, **kwargs))
+                    except BaseException as e:
+                        future.set_exception(e)
+            finally:
+                with self._cond:
+                    self._running[tenant] -= 1
+                    self._cond.notify_all()
+
+
+_default_scheduler = None
+_default_scheduler_lock = threading.Lock()
+
+def get_default_scheduler():
+    """
+    Retorna o FairScheduler compartilhado pelos clientes criados sem um escalonador próprio.
+    """
+    global _default_scheduler
+
+    with _default_scheduler_lock:
+        if _default_scheduler is None:
+            _default_scheduler = FairScheduler()
+        return _default_scheduler
+
+
+class PipedriveClient:
+    """
+    Cliente de um tenant (par api_token, company_domain) do Pipedrive.
+
+    Todas as funções da biblioteca ficam disponíveis como métodos, sem precisar repassar api_token e
+    company_domain. Cada cliente mantém seu próprio pool de conexões (requests.Session), seu próprio
+    limitador de taxa e seu próprio cache de metadados, então o volume de um tenant não consome o limite
+    dos outros.
+
+    Parâmetros:
+    - api_token (str): Token da API do tenant.
+    - company_domain (str, opcional): Domínio da empresa no Pipedrive. Padrão é 'api'.
+    - rate (float, opcional): Requisições por segundo permitidas para o tenant. Padrão é 10.
+    - burst (int, opcional): Rajada máxima do limitador de taxa. Padrão é o dobro de rate.
+    - pool_size (int, opcional): Conexões mantidas no pool HTTP do tenant. Padrão é 10.
+    - cache_ttl (float, opcional): Validade, em segundos, do cache de metadados. Padrão é 300.
+    - scheduler (FairScheduler, opcional): Escalonador usado por submit. Padrão é o escalonador compartilhado.
+    - timeout (float ou tuple, opcional): Tempo limite (conexão, leitura) de cada requisição. Padrão é TIMEOUT.
+    - deadline (float, opcional): Prazo total, em segundos, de cada chamada (todas as páginas e retentativas).
+      Padrão é DEADLINE.
+
+    # Exemplo de uso:
+        cliente = PipedriveClient(api_token='seu_token_aqui', company_domain='sua_empresa')
+        negocios = cliente.deals_get_all(status='open')
+        campos = cliente.cached('dealfields_get_all')
+    """
+
+    def __init__(self, api_token, company_domain='api', rate=10, burst=None, pool_size=10, cache_ttl=300, scheduler=None,
+                 timeout=None, deadline=None):
+        self.api_token = check_api_token(api_token)
+        self.company_domain = company_domain
+        self.timeout = timeout
+        self.deadline = deadline
+        self.rate_limiter = RateLimiter(rate, burst)
+        self.cache_ttl = cache_ttl
+        self.scheduler = scheduler
+
+        self.session = requests.Session()
+        adapter = _PipedriveAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+
+        self._cache = {}
+        self._cache_lock = threading.Lock()
+
+    def __repr__(self):
+        return f"PipedriveClient(company_domain='{self.company_domain}')"
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        return functools.partial(self.call, _resolve_function(name))
+
+    def call(self, func, *args, **kwargs):
+        """
+        Executa uma função da biblioteca no contexto deste tenant.
+
+        Parâmetros:
+        - func (str ou callable): Função da biblioteca (ou o nome dela, ex: 'deals_get_all').
+
+        Retorna:
+        O retorno da função chamada.
+        """
+        if isinstance(func, str):
+            func = _resolve_function(func)
+
+        kwargs.setdefault('api_token', self.api_token)
+        kwargs.setdefault('company_domain', self.company_domain)
+
+        token = _tenant_context.set(self)
+        try:
+            with _call_deadline_():
+                return func(*args, **kwargs)
+        finally:
+            _tenant_context.reset(token)
+
+    def submit(self, func, *args, priority='interactive', **kwargs):
+        """
+        Agenda a chamada no escalonador justo e retorna um Future.
+
+        Parâmetros:
+        - func (str ou callable): Função da biblioteca (ou o nome dela).
+        - priority (str, opcional): 'interactive' (padrão) para chamadas de tela, 'bulk' para exportações.
+
+        Retorna:
+        concurrent.futures.Future: Future com o resultado da chamada.
+        """
+        scheduler = self.scheduler if self.scheduler is not None else get_default_scheduler()
+        return scheduler.submit(self, func, *args, priority=priority, **kwargs)
+
+    def cached(self, func, *args, **kwargs):
+        """
+        Executa uma chamada de metadados (ex: 'dealfields_get_all', 'pipelines_get_all') usando o cache do tenant.
+
+        O resultado fica guardado por cache_ttl segundos, por combinação de função e argumentos.
+        O objeto retornado é compartilhado entre as chamadas; não o altere.
+
+        Retorna:
+        O retorno da função chamada (ou o valor em cache).
+        """
+        name = func if isinstance(func, str) else func.__name__
+        key = (name, args, tuple(sorted(kwargs.items())))
+        now = time.monotonic()
+
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is not None and now - entry[0] < self.cache_ttl:
+                return entry[1]
+
+        value = self.call(func, *args, **kwargs)
+
+        with self._cache_lock:
+            self._cache[key] = (time.monotonic(), value)
+
+        return value
+
+    def invalidate(self, func=None):
+        """
+        Limpa o cache de metadados do tenant, inteiro ou apenas de uma função.
+        """
+        name = func if func is None or isinstance(func, str) else func.__name__
+
+        with self._cache_lock:
+            if name is None:
+                self._cache.clear()
+            else:
+                for key in [k for k in self._cache if k[0] == name]:
+                    del self._cache[key]
+
+    def close(self):
+        """
+        Fecha o pool de conexões do tenant.
+        """
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _resolve_function(name):
+    func = globals().get(name)
+
+    if name.startswith('_') or not inspect.isfunction(func) or 'api_token' not in inspect.signature(func).parameters:
+        raise AttributeError(f"A função '{name}' não existe na biblioteca.")
+
+    return func
+
+
+@contextlib.contextmanager
+def _tenant_scope_(api_token, company_domain):
+    # Garante um tenant ativo (pool de conexões e limitador de taxa compartilhados) durante um fan-out.
+    tenant = _tenant_context.get()
+
+    if tenant is not None:
+        yield tenant
+        return
+
+    with PipedriveClient(api_token, company_domain) as tenant:
+        token = _tenant_context.set(tenant)
+        try:
+            yield tenant
+        finally:
+            _tenant_context.reset(token)
+
+
+def _map_concurrent_(func, items, max_workers=8):
+    # Aplica func a cada item em threads, preservando a ordem. As threads herdam o contexto (tenant, page_options, prazo).
+    items = list(items)
+
+    if max_workers <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        futures = [executor.submit(contextvars.copy_context().run, func, item) for item in items]
+        return [future.result() for future in futures]
+
+
+
+# EXPORTAÇÃO EM STREAMING
+_FIELDS_FUNCTIONS = {
+    'deals': 'dealfields_get_all',
+    'persons': 'personfields_get_all',
+    'organizations': 'organizationfields_get_all',
+    'products': 'productfields_get_all',
+    'activities': 'activityfields_get_all',
+}
+
+
+def _entity_of_(func_name):
+    # 'deals_get_all' -> 'deals'; 'pipelines_get_deals' -> 'deals'.
+    for entity in _FIELDS_FUNCTIONS:
+        if func_name.startswith(f'{entity}_') or func_name.endswith(f'_get_{entity}'):
+            return entity
+    return None
+
+
+def _cached_call_(func_name, *args, **kwargs):
+    # Dentro de um PipedriveClient usa o cache de metadados do tenant; fora dele, chama a função direto.
+    tenant = _tenant_context.get()
+
+    if tenant is not None:
+        return tenant.cached(func_name, *args, **kwargs)
+
+    return _resolve_function(func_name)(*args, **kwargs)
+
+
+def _fields_(entity, api_token, company_domain):
+    # Metadados dos campos (key, name, field_type, options...) de uma entidade.
+    return _cached_call_(_FIELDS_FUNCTIONS[entity], api_token=api_token, company_domain=company_domain)
+
+
+def for_each_page(func, callback, *args, api_token=None, company_domain='api', **kwargs):
+    """
+    Executa uma função paginada da biblioteca entregando cada página ao callback, sem acumular o resultado.
+
+    Parâmetros:
+    - func (str ou callable): Função da biblioteca que usa paginação (ex: 'deals_get_all').
+    - callback (callable): Função chamada com o DataFrame de cada página, na ordem.
+    - api_token (str): Token da API necessário para validar as solicitações.
+    - company_domain (str): Domínio da empresa no Pipedrive.
+    - *args, **kwargs: Demais argumentos repassados para func.
+
+    # Exemplo de uso:
+        for_each_page('deals_get_all', lambda page: print(len(page)), status='open', api_token='seu_token_aqui')
+    """
+    if isinstance(func, str):
+        func = _resolve_function(func)
+
+    token = _page_sink.set(callback)
+    try:
+        func(*args, api_token=api_token, company_domain=company_domain, **kwargs)
+    finally:
+        _page_sink.reset(token)
+
+
+def _import_pyarrow_():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("A exportação para Parquet requer o pacote pyarrow: pip install pyarrow") from e
+
+    return pyarrow
+
+
+def _json_or_str_(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+def _reference_value_(value):
+    # Campos de referência (user, org, people) chegam como dict; o id está em 'value'.
+    return value.get('value') if isinstance(value, dict) else value
+
+
+class ParquetSink:
+    """
+    Grava DataFrames (páginas) em um arquivo Parquet, um row group a cada row_group_rows linhas.
+
+    O esquema é fixado na primeira escrita: os tipos vêm dos metadados de campos (`*fields_get_all`) quando
+    informados e, para as colunas sem metadados, do tipo da primeira página. Colunas que aparecem só em páginas
+    posteriores são descartadas e colunas ausentes são gravadas como nulas, então todos os row groups têm o
+    mesmo esquema. O arquivo é escrito ao lado do destino e renomeado só em close(); se ocorrer um erro dentro
+    do bloco with, o arquivo temporário é removido e o destino não é alterado.
+
+    Parâmetros:
+    - path (str): Caminho do arquivo Parquet.
+    - fields (pd.DataFrame, opcional): Resultado de um `*fields_get_all` (colunas 'key' e 'field_type').
+    - row_group_rows (int, opcional): Linhas por row group. Padrão é 50000.
+    - compression (str, opcional): Compressão do Parquet. Padrão é 'snappy'.
+
+    # Exemplo de uso:
+        with ParquetSink('deals.parquet', fields=dealfields_get_all(api_token='seu_token_aqui')) as sink:
+            for_each_page('deals_get_all', sink.write, api_token='seu_token_aqui')
+    """
+
+    # Tipos de campo do Pipedrive -> tipos do Arrow. Os demais são gravados como texto (JSON para dict/list).
+    FIELD_TYPES = {
+        'int': 'int64',
+        'double': 'float64',
+        'monetary': 'float64',
+        'date': 'timestamp',
+        'user': 'int64',
+        'org': 'int64',
+        'people': 'int64',
+        'stage': 'int64',
+    }
+
+    def __init__(self, path, fields=None, row_group_rows=50000, compression='snappy'):
+        self.pa = _import_pyarrow_()
+        self.path = path
+        self.fields = fields
+        self.row_group_rows = row_group_rows
+        self.compression = compression
+        self.schema = None
+        self.rows = 0
+        self.row_groups = 0
+        self._buffer = []
+        self._buffered = 0
+        self._writer = None
+        self._tmp_path = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def __call__(self, frame):
+        self.write(frame)
+
+    def write(self, frame):
+        """
+        Acrescenta um DataFrame ao arquivo. As linhas são gravadas quando o buffer atinge row_group_rows.
+        """
+        if self.schema is None:
+            self.schema = self._build_schema(frame)
+
+        if len(frame) == 0:
+            return
+
+        self._buffer.append(frame)
+        self._buffered += len(frame)
+
+        if self._buffered >= self.row_group_rows:
+            self._flush()
+
+    def close(self):
+        """
+        Grava o que restou no buffer e move o arquivo para o destino.
+        """
+        if self.schema is None:
+            self.schema = self._build_schema(pd.DataFrame())
+
+        self._flush()
+
+        if self._writer is None:
+            self._open()
+
+        self._writer.close()
+        os.replace(self._tmp_path, self.path)
+        self._writer = None
+
+    def abort(self):
+        """
+        Descarta o arquivo temporário sem alterar o destino.
+        """
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+        if self._tmp_path is not None and os.path.exists(self._tmp_path):
+            os.unlink(self._tmp_path)
+
+        self._buffer = []
+        self._buffered = 0
+
+    def _open(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, self._tmp_path = tempfile.mkstemp(dir=directory, prefix='.parquet-', suffix='.tmp')
+        os.close(fd)
+        self._writer = self.pa.parquet.ParquetWriter(self._tmp_path, self.schema, compression=self.compression)
+
+    def _build_schema(self, frame):
+        pa = self.pa
+        types = {}
+
+        if self.fields is not None and len(self.fields):
+            for key, field_type in zip(self.fields['key'], self.fields['field_type']):
+                types[key] = self.FIELD_TYPES.get(field_type, 'string')
+
+        columns = list(frame.columns) + [key for key in types if key not in frame.columns]
+        schema = []
+
+        for column in columns:
+            kind = types.get(column)
+
+            if kind is None:
+                dtype = frame[column].dtype
+                if pd.api.types.is_bool_dtype(dtype):
+                    kind = 'bool'
+                elif pd.api.types.is_integer_dtype(dtype):
+                    kind = 'int64'
+                elif pd.api.types.is_float_dtype(dtype):
+                    kind = 'float64'
+                elif pd.api.types.is_datetime64_any_dtype(dtype):
+                    kind = 'timestamp'
+                else:
+                    kind = 'string'
+
+            arrow_type = pa.timestamp('us') if kind == 'timestamp' else pa.type_for_alias(kind)
+            schema.append(pa.field(str(column), arrow_type))
+
+        return pa.schema(schema)
+
+    def _column(self, series, arrow_type):
+        pa = self.pa
+
+        if series is None:
+            return None
+
+        if pa.types.is_timestamp(arrow_type):
+            values = pd.to_datetime(series, errors='coerce')
+            if getattr(values.dt, 'tz', None) is not None:
+                values = values.dt.tz_convert(None)
+            return pa.array(values, type=arrow_type, from_pandas=True)
+
+        if pa.types.is_integer(arrow_type) or pa.types.is_floating(arrow_type):
+            if series.dtype == object:
+                series = series.map(_reference_value_)
+            values = pd.to_numeric(series, errors='coerce')
+            values = values.astype('Int64') if pa.types.is_integer(arrow_type) else values.astype('float64')
+            return pa.array(values, type=arrow_type, from_pandas=True)
+
+        if pa.types.is_boolean(arrow_type):
+            return pa.array(series.astype('boolean'), type=arrow_type, from_pandas=True)
+
+        if series.dtype == object:
+            return pa.array(series.map(_json_or_str_), type=arrow_type, from_pandas=True)
+
+        return pa.array(series.astype('string'), type=arrow_type, from_pandas=True)
+
+    def _flush(self):
+        if not self._buffer:
+            return
+
+        frame = self._buffer[0] if len(self._buffer) == 1 else pd.concat(self._buffer, ignore_index=True)
+        self._buffer = []
+        self._buffered = 0
+
+        arrays = []
+        for field in self.schema:
+            column = self._column(frame[field.name], field.type) if field.name in frame.columns else None
+            arrays.append(column if column is not None else self.pa.nulls(len(frame), type=field.type))
+
+        if self._writer is None:
+            self._open()
+
+        self._writer.write_table(self.pa.Table.from_arrays(arrays, schema=self.schema))
+        self.rows += len(frame)
+        self.row_groups += 1
+
+
+def parquet_export(func, path, fields='auto', row_group_rows=50000, compression='snappy', api_token=None, company_domain='api', **kwargs):
+    """
+    Exporta o resultado de uma função paginada direto para Parquet, página a página, com memória constante.
+
+    Parâmetros:
+    - func (str ou callable): Função paginada da biblioteca (ex: 'deals_get_all', 'persons_get_all').
+    - path (str): Caminho do arquivo Parquet. O arquivo só aparece no destino quando a exportação termina.
+    - fields (str ou pd.DataFrame, opcional): 'auto' (padrão) busca os metadados de campos da entidade
+      (ex: dealfields_get_all para deals_get_all) para fixar o esquema; None usa só os tipos da primeira página.
+    - row_group_rows (int, opcional): Linhas por row group. Padrão é 50000.
+    - compression (str, opcional): Compressão do Parquet. Padrão é 'snappy'.
+    - api_token (str): Token da API necessário para validar as solicitações.
+    - company_domain (str): Domínio da empresa no Pipedrive.
+    - **kwargs: Demais argumentos repassados para func (ex: status='open').
+
+    Retorna:
+    dict: {'path': caminho, 'rows': linhas gravadas, 'row_groups': row groups gravados}.
+
+    Exemplo de uso:
+    parquet_export('deals_get_all', 'deals.parquet', status='all_not_deleted', api_token='seu_token_aqui', company_domain='sua_empresa')
+    """
+    api_token = check_api_token(api_token)
+
+    if isinstance(func, str):
+        func = _resolve_function(func)
+
+    if isinstance(fields, str) and fields == 'auto':
+        entity = _entity_of_(func.__name__)
+        fields = _fields_(entity, api_token, company_domain) if entity else None
+
+    with ParquetSink(path, fields=fields, row_group_rows=row_group_rows, compression=compression) as sink:
+        for_each_page(func, sink.write, api_token=api_token, company_domain=company_domain, **kwargs)
+
+    return {'path': path, 'rows': sink.rows, 'row_groups': sink.row_groups}
+
+
+
+# NORMALIZAÇÃO DE DATAFRAMES
+@contextlib.contextmanager
+def page_options(**options):
+    """
+    Ativa normalizações aplicadas a cada página no momento da montagem (get_all_), inclusive nas chamadas
+    agendadas com PipedriveClient.submit dentro do bloco.
+
+    Opções:
+    - flatten (bool): Achata referências aninhadas e listas de contato (ver flatten_references).
+    - dtypes (str, pd.DataFrame ou dict): Converte os tipos das colunas a partir dos metadados de campos
+      (ver coerce_dtypes). Com 'auto', os metadados da entidade (ex: dealfields_get_all para deals_get_all)
+      são buscados uma vez por chamada, ou uma vez por tenant dentro de um PipedriveClient.
+
+    # Exemplo de uso:
+        with page_options(flatten=True, dtypes='auto'):
+            deals = deals_get_all(api_token='seu_token_aqui')
+        deals[['org_id.value', 'org_id.name']]
+    """
+    token = _page_options.set({**_page_options.get(), **options})
+    try:
+        yield
+    finally:
+        _page_options.reset(token)
+
+
+def _page_transform_(url):
+    # Normalização das páginas de uma chamada do get_all_, conforme page_options; None se não houver nenhuma.
+    options = _page_options.get()
+    flatten = options.get('flatten', False)
+    dtypes = options.get('dtypes')
+
+    if isinstance(dtypes, str) and dtypes == 'auto':
+        dtypes = _auto_fields_(url)
+
+    if dtypes is not None:
+        dtypes = compile_dtypes(dtypes)
+
+    if not flatten and not dtypes:
+        return None
+
+    def transform(frame):
+        if flatten:
+            frame = flatten_references(frame)
+        if dtypes:
+            frame = coerce_dtypes(frame, dtypes)
+        return frame
+
+    return transform
+
+
+def _auto_fields_(url):
+    # Metadados de campos da entidade da chamada em andamento, com o token e o domínio da própria URL.
+    entity = _entity_of_(_endpoint_label())
+
+    if entity is None:
+        return None
+
+    parsed = urllib.parse.urlsplit(url)
+    api_token = urllib.parse.parse_qs(parsed.query).get('api_token', [None])[0]
+    company_domain = parsed.hostname.split('.')[0]
+
+    sink_token = _page_sink.set(None)
+    options_token = _page_options.set({})
+    try:
+        return _fields_(entity, api_token, company_domain)
+    finally:
+        _page_options.reset(options_token)
+        _page_sink.reset(sink_token)
+
+
+def _dict_frame_(series):
+    # DataFrame com as chaves dos dicts de uma coluna (construção em bloco, sem apply por linha).
+    values = series[series.notna()]
+
+    try:
+        return pd.DataFrame(values.tolist(), index=values.index)
+    except (TypeError, ValueError, AttributeError):
+        values = values[[isinstance(v, dict) for v in values]]
+        return pd.DataFrame(values.tolist(), index=values.index)
+
+
+def _primary_contact_(series):
+    # Valor do item marcado como primary em listas como [{'value': ..., 'primary': True}], ou do primeiro item.
+    items = series[series.notna()].explode()
+    items = items[items.notna()]
+
+    if items.empty:
+        return pd.Series(pd.NA, index=series.index, dtype='string')
+
+    items = _dict_frame_(items)
+
+    if 'value' not in items.columns:
+        return pd.Series(pd.NA, index=series.index, dtype='string')
+
+    if 'primary' in items.columns:
+        items = items.assign(_rank=items['primary'].ne(True)).sort_values('_rank', kind='stable')
+
+    values = items['value'].groupby(level=0, sort=False).first()
+    values = values.reindex(series.index).astype('string')
+
+    return values.mask(values == '')
+
+
+def _is_dict_column_(series):
+    index = series.first_valid_index()
+    return series.dtype == object and index is not None and isinstance(series[index], dict)
+
+
+def _is_contact_list_column_(series):
+    index = series.first_valid_index()
+    if series.dtype != object or index is None:
+        return False
+
+    value = series[index]
+    return isinstance(value, list) and (not value or isinstance(value[0], dict))
+
+
+def flatten_references(frame, reference_keys=('value', 'name'), contact_lists=('email', 'phone')):
+    """
+    Achata colunas de referências aninhadas em colunas escalares tipadas.
+
+    Colunas cujos valores são dicts (ex: person_id, org_id, user_id, creator_user_id nos negócios) viram
+    '<coluna>.value' (Int64) e '<coluna>.name' (categoria), conforme reference_keys. Listas de contato
+    (ex: email e phone nas pessoas) viram 'primary_email' e 'primary_phone' com o valor marcado como
+    principal. As colunas originais são removidas. A conversão é feita em bloco por coluna, sem apply por linha.
+
+    Parâmetros:
+    - frame (pd.DataFrame): DataFrame retornado por uma função da biblioteca.
+    - reference_keys (tuple, opcional): Chaves extraídas de cada referência. Padrão é ('value', 'name').
+    - contact_lists (tuple, opcional): Colunas de listas de contato a achatar. Padrão é ('email', 'phone').
+
+    Retorna:
+    pd.DataFrame: O DataFrame com as referências achatadas.
+
+    Exemplo de uso:
+    deals = flatten_references(deals_get_all(api_token='seu_token_aqui'))
+    """
+    if frame.empty:
+        return frame
+
+    flattened = {}
+
+    for column in frame.columns:
+        series = frame[column]
+
+        if column in contact_lists and _is_contact_list_column_(series):
+            flattened[column] = {f'primary_{column}': _primary_contact_(series)}
+
+        elif _is_dict_column_(series):
+            nested = _dict_frame_(series).reindex(frame.index)
+            flattened[column] = {}
+
+            for key in reference_keys:
+                values = nested[key] if key in nested.columns else pd.Series(pd.NA, index=frame.index, dtype=object)
+
+                if key == 'value':
+                    values = pd.to_numeric(values, errors='coerce').astype('Int64')
+                elif key == 'name':
+                    values = values.astype('category')
+
+                flattened[column][f'{column}.{key}'] = values
+
+    if not flattened:
+        return frame
+
+    # As colunas achatadas entram na posição da coluna de origem.
+    result = {}
+    for column in frame.columns:
+        if column in flattened:
+            result.update(flattened[column])
+        else:
+            result[column] = frame[column]
+
+    return pd.DataFrame(result, index=frame.index)
+
+
+def _reference_ids_(frame, column):
+    # ids de uma coluna de referência, esteja ela achatada ('<coluna>.value'), como dict ou como número.
+    if f'{column}.value' in frame.columns:
+        return frame[f'{column}.value'].astype('Int64')
+
+    if column not in frame.columns:
+        return pd.Series(pd.NA, index=frame.index, dtype='Int64')
+
+    series = frame[column]
+
+    if _is_dict_column_(series):
+        nested = _dict_frame_(series).reindex(frame.index)
+        key = 'value' if 'value' in nested.columns else 'id'
+        series = nested[key] if key in nested.columns else pd.Series(pd.NA, index=frame.index)
+
+    return pd.to_numeric(series, errors='coerce').astype('Int64')
+
+
+# Tipos de campo do Pipedrive -> tipo da coluna no DataFrame.
+_DTYPE_KINDS = {
+    'int': 'int',
+    'stage': 'int',
+    'user': 'int',
+    'org': 'int',
+    'people': 'int',
+    'double': 'float',
+    'monetary': 'float',
+    'date': 'datetime',
+    'time': 'timedelta',
+    'enum': 'category',
+    'status': 'category',
+    'visible_to': 'category',
+    'varchar_options': 'category',
+}
+
+# Colunas de baixa cardinalidade tratadas como categoria mesmo quando o metadado diz texto.
+_CATEGORY_KEYS = ('currency', 'status', 'visible_to', 'type', 'label')
+
+
+def compile_dtypes(fields):
+    """
+    Compila os metadados de campos em um mapeamento coluna -> tipo usado por coerce_dtypes.
+
+    Parâmetros:
+    - fields (pd.DataFrame ou dict): Resultado de um `*fields_get_all` (colunas 'key' e 'field_type'), um dict
+      {key: field_type} ou um mapeamento já compilado.
+
+    Retorna:
+    dict: {coluna: 'int' | 'float' | 'datetime' | 'timedelta' | 'category'}.
+    """
+    if isinstance(fields, pd.DataFrame):
+        if fields.empty or 'key' not in fields.columns:
+            return {}
+        fields = dict(zip(fields['key'], fields['field_type']))
+
+    kinds = set(_DTYPE_KINDS.values())
+    compiled = {}
+
+    for key, field_type in fields.items():
+        kind = field_type if field_type in kinds else _DTYPE_KINDS.get(field_type)
+        if key in _CATEGORY_KEYS and kind is None:
+            kind = 'category'
+        if kind is not None:
+            compiled[key] = kind
+
+    return compiled
+
+
+def _infer_kind_(column, series):
+    # Colunas sem metadados: ids e datas pelo nome.
+    if series.dtype == object or pd.api.types.is_string_dtype(series.dtype):
+        if column == 'id' or column.endswith('_id'):
+            return 'int'
+        if column.endswith('_time') or column.endswith('_date'):
+            return 'datetime'
+        if column in _CATEGORY_KEYS:
+            return 'category'
+    elif pd.api.types.is_float_dtype(series.dtype) and (column == 'id' or column.endswith('_id')):
+        return 'int'
+
+    return None
+
+
+def _coerce_column_(series, kind):
+    if kind == 'int' or kind == 'float':
+        values = pd.to_numeric(series, errors='coerce')
+
+        if kind == 'float':
+            return values.astype('float64')
+
+        present = values.dropna()
+        if (present % 1 == 0).all():
+            return values.astype('Int64')
+        return values.astype('float64')
+
+    if kind == 'datetime':
+        return pd.to_datetime(series, errors='coerce', format='ISO8601')
+
+    if kind == 'timedelta':
+        return pd.to_timedelta(series, errors='coerce')
+
+    if kind == 'category':
+        return series.astype('category')
+
+    return series
+
+
+def coerce_dtypes(frame, fields, infer=True):
+    """
+    Converte as colunas de um DataFrame para tipos compactos a partir dos metadados de campos.
+
+    ids viram inteiros anuláveis (Int64), valores monetários e numéricos viram float64, datas e horários viram
+    datetime64, tempos viram timedelta64 e enums, status, visibilidade e moeda viram categorias. Colunas de
+    referência já achatadas ('<campo>.value') são mantidas. Colunas com dicts ou listas não são alteradas.
+
+    Parâmetros:
+    - frame (pd.DataFrame): DataFrame retornado por uma função da biblioteca.
+    - fields (pd.DataFrame ou dict): Metadados de campos (ver compile_dtypes).
+    - infer (bool, opcional): Trata também colunas sem metadados pelo nome (id, *_id, *_time, *_date). Padrão é True.
+
+    Retorna:
+    pd.DataFrame: O DataFrame com os tipos convertidos.
+
+    Exemplo de uso:
+    deals = coerce_dtypes(deals_get_all(api_token='seu_token_aqui'), dealfields_get_all(api_token='seu_token_aqui'))
+    """
+    kinds = compile_dtypes(fields)
+
+    if frame.empty:
+        return frame
+
+    converted = {}
+
+    for column in frame.columns:
+        series = frame[column]
+        kind = kinds.get(column)
+
+        if kind is None and infer:
+            kind = _infer_kind_(str(column), series)
+
+        if kind is None or _is_dict_column_(series) or _is_contact_list_column_(series):
+            continue
+
+        if kind == 'category' and isinstance(series.dtype, pd.CategoricalDtype):
+            continue
+
+        converted[column] = _coerce_column_(series, kind)
+
+    if not converted:
+        return frame
+
+    frame = frame.copy(deep=False)
+    for column, values in converted.items():
+        frame[column] = values
+
+    return frame
+
+
+
+# ANÁLISES LOCAIS
+_TIMELINE_INTERVALS = {
+    'day': pd.DateOffset(days=1),
+    'week': pd.DateOffset(weeks=1),
+    'month': pd.DateOffset(months=1),
+    'quarter': pd.DateOffset(months=3),
+}
+
+
+def _records_(frame):
+    # Linhas de um DataFrame como lista de dicts, com None no lugar de NaN/NaT.
+    return frame.astype(object).where(frame.notna(), None).to_dict('records')
+
+
+class DealsTimeline:
+    """
+    Cálculo local da linha do tempo de negócios (deals_timeline) a partir de um DataFrame de negócios em cache.
+
+    Os intervalos, contagens e totais por moeda são calculados com operações vetorizadas, no mesmo formato de
+    resposta do endpoint, então um painel pode trocar deals_timeline(...) por timeline.deals_timeline(...)
+    sem outras mudanças. As datas de cada field_key são convertidas uma única vez e reaproveitadas.
+
+    O endpoint currencies_get_all não informa cotações; para totals_convert_currency, informe em rates quanto
+    vale uma unidade de cada moeda na moeda de destino. Os metadados de currencies_get_all (se informados)
+    definem as casas decimais dos totais convertidos.
+
+    Parâmetros:
+    - deals (pd.DataFrame): Negócios, como retornados por deals_get_all (achatados ou não).
+    - currencies (pd.DataFrame, opcional): Resultado de currencies_get_all.
+    - rates (dict, opcional): Cotações por moeda de destino, ex: {'BRL': {'USD': 0.2, 'BRL': 1.0}}.
+
+    # Exemplo de uso:
+        timeline = DealsTimeline(deals_get_all(status='all_not_deleted', api_token='seu_token_aqui'),
+                                 currencies=currencies_get_all(api_token='seu_token_aqui'),
+                                 rates={'BRL': {'USD': 5.0, 'EUR': 5.4, 'BRL': 1.0}})
+        timeline.deals_timeline('2024-01-01', 'month', 12, 'expected_close_date', totals_convert_currency='BRL')
+    """
+
+    def __init__(self, deals, currencies=None, rates=None):
+        self.deals = deals.reset_index(drop=True)
+        self.rates = rates or {}
+        self.decimals = {}
+
+        if currencies is not None and not currencies.empty and 'code' in currencies.columns:
+            self.decimals = dict(zip(currencies['code'], currencies.get('decimal_points', pd.Series(2, index=currencies.index))))
+
+        frame = self.deals
+        self._values = pd.to_numeric(frame.get('value', pd.Series(0.0, index=frame.index)), errors='coerce').fillna(0.0).to_numpy()
+
+        if 'weighted_value' in frame.columns:
+            weighted = pd.to_numeric(frame['weighted_value'], errors='coerce')
+        elif 'probability' in frame.columns:
+            weighted = self._values * pd.to_numeric(frame['probability'], errors='coerce').fillna(100) / 100
+        else:
+            weighted = pd.Series(self._values, index=frame.index)
+
+        self._weighted = pd.Series(weighted, index=frame.index).fillna(0.0).to_numpy()
+        self._currency = frame.get('currency', pd.Series('', index=frame.index)).astype(str).to_numpy()
+        self._status = frame.get('status', pd.Series('', index=frame.index)).astype(str).to_numpy()
+        self._user = _reference_ids_(frame, 'user_id')
+        self._pipeline = _reference_ids_(frame, 'pipeline_id')
+        self._dates = {}
+
+    @classmethod
+    def from_api(cls, rates=None, status='all_not_deleted', api_token=None, company_domain='api'):
+        """
+        Monta o cálculo local baixando os negócios (deals_get_all) e as moedas (currencies_get_all) uma vez.
+        """
+        deals = _cached_call_('deals_get_all', status=status, api_token=api_token, company_domain=company_domain)
+        currencies = _cached_call_('currencies_get_all', api_token=api_token, company_domain=company_domain)
+        return cls(deals, currencies=currencies, rates=rates)
+
+    def _field_dates(self, field_key):
+        if field_key not in self._dates:
+            if field_key not in self.deals.columns:
+                raise ValueError(f"O campo '{field_key}' não existe no DataFrame de negócios.")
+            self._dates[field_key] = pd.to_datetime(self.deals[field_key], errors='coerce', format='ISO8601')
+        return self._dates[field_key]
+
+    def _factors(self, currencies, target):
+        # Fator de conversão de cada linha para a moeda de destino.
+        rates = dict(self.rates.get(target, {}))
+        rates.setdefault(target, 1.0)
+        factors = pd.Series(currencies).map(rates)
+        missing = sorted(set(pd.Series(currencies)[factors.isna()]))
+
+        if missing:
+            raise ValueError(f"Sem cotação para converter {missing} em {target}. Informe-as em rates.")
+
+        return factors.to_numpy(dtype=float)
+
+    def deals_timeline(self, start_date, interval, amount, field_key, user_id=None, pipeline_id=None, filter_id=None,
+                       exclude_deals=None, totals_convert_currency=None):
+        """
+        Mesmos parâmetros e formato de retorno de deals_timeline, calculados localmente.
+
+        Parâmetros:
+        - start_date (str): Data em que o primeiro intervalo começa. Formato: YYYY-MM-DD.
+        - interval (str): Tipo de intervalo. Opções: day, week, month, quarter.
+        - amount (int): Número de intervalos, começando a partir de start_date.
+        - field_key (str): Nome do campo de data pelo qual agrupar os negócios.
+        - user_id (int, opcional): Apenas negócios do usuário informado.
+        - pipeline_id (int, opcional): Apenas negócios do pipeline informado.
+        - filter_id (int, opcional): Não suportado localmente; filtre o DataFrame antes de criar o DealsTimeline.
+        - exclude_deals (int, opcional): Se 1, não inclui a lista de negócios de cada intervalo.
+        - totals_convert_currency (str, opcional): Código da moeda para os totais convertidos (totals_converted).
+
+        Retorna:
+        dict: {'success': True, 'data': [{'period_start', 'period_end', 'deals', 'totals', ...}, ...]}.
+        """
+        if interval not in _TIMELINE_INTERVALS:
+            raise ValueError(f"Intervalo inválido: {interval}. Opções: {list(_TIMELINE_INTERVALS)}")
+        if filter_id is not None:
+            raise ValueError("filter_id não é suportado no cálculo local; filtre o DataFrame de negócios antes.")
+
+        offset = _TIMELINE_INTERVALS[interval]
+        start = pd.Timestamp(start_date).normalize()
+        bounds = pd.DatetimeIndex([start + offset * k for k in range(int(amount) + 1)])
+        dates = self._field_dates(field_key)
+
+        mask = (dates >= bounds[0]) & (dates < bounds[-1])
+        if user_id is not None:
+            mask &= self._user.eq(int(user_id)).fillna(False)
+        if pipeline_id is not None:
+            mask &= self._pipeline.eq(int(pipeline_id)).fillna(False)
+
+        rows = mask.to_numpy(dtype=bool)
+        period = bounds.searchsorted(dates[rows].to_numpy(), side='right') - 1
+        status = self._status[rows]
+        values = self._values[rows]
+        weighted = self._weighted[rows]
+        currency = self._currency[rows]
+        is_open = status == 'open'
+        is_won = status == 'won'
+
+        groups = pd.DataFrame({
+            'period': period,
+            'currency': currency,
+            'values': values,
+            'weighted_values': weighted,
+            'open_values': values * is_open,
+            'weighted_open_values': weighted * is_open,
+            'won_values': values * is_won,
+        })
+        by_currency = groups.groupby(['period', 'currency'], sort=True).sum()
+        counts = pd.DataFrame({'period': period, 'count': 1, 'open_count': is_open, 'won_count': is_won}).groupby('period').sum()
+        value_columns = ['values', 'weighted_values', 'open_values', 'weighted_open_values', 'won_values']
+
+        converted = None
+        if totals_convert_currency is not None:
+            target = totals_convert_currency
+            converted_groups = groups[value_columns].mul(self._factors(currency, target), axis=0)
+            converted_groups['period'] = period
+            converted = converted_groups.groupby('period').sum()
+
+        deal_rows = None
+        if not exclude_deals:
+            selected = self.deals[rows].assign(_period=period, _date=dates[rows].to_numpy())
+            deal_rows = {k: _records_(g.sort_values('_date').drop(columns=['_period', '_date']))
+                         for k, g in selected.groupby('_period')}
+
+        data = []
+        for k in range(int(amount)):
+            totals = {'count': 0, 'open_count': 0, 'won_count': 0}
+            totals.update({column: {} for column in value_columns})
+
+            if k in counts.index:
+                totals.update({column: int(counts.at[k, column]) for column in ('count', 'open_count', 'won_count')})
+                for (_, code), row in by_currency.loc[[k]].iterrows():
+                    for column in value_columns:
+                        totals[column][code] = float(row[column])
+
+            item = {
+                'period_start': bounds[k].strftime('%Y-%m-%d %H:%M:%S'),
+                'period_end': (bounds[k + 1] - pd.Timedelta(seconds=1)).strftime('%Y-%m-%d %H:%M:%S'),
+                'deals': [] if deal_rows is None else deal_rows.get(k, []),
+                'totals': totals,
+            }
+
+            if exclude_deals:
+                del item['deals']
+
+            if converted is not None:
+                decimals = int(self.decimals.get(totals_convert_currency, 2))
+                item['totals_converted'] = {
+                    column: round(float(converted.at[k, column]) if k in converted.index else 0.0, decimals)
+                    for column in value_columns
+                }
+                item['totals_converted']['currency'] = totals_convert_currency
+
+            data.append(item)
+
+        return {'success': True, 'data': data}
+
+
+def _utc_timestamp_():
+    # Formato aceito pelo since_timestamp do recents_get (UTC).
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime())
+
+
+def _flow_changes_(flow):
+    # Itens de alteração de campo (dealChange, personChange...) de um *_get_flow, em colunas.
+    columns = ['item_id', 'user_id', 'field_key', 'old_value', 'new_value', 'log_time']
+
+    if flow is None or flow.empty or 'object' not in flow.columns:
+        return pd.DataFrame(columns=columns)
+
+    changes = flow[flow['object'].astype(str).str.endswith('Change')]
+    if changes.empty:
+        return pd.DataFrame(columns=columns)
+
+    data = _dict_frame_(changes['data']).reset_index(drop=True)
+    if 'log_time' not in data.columns and 'timestamp' in changes.columns:
+        data['log_time'] = changes['timestamp'].to_numpy()
+
+    return data.reindex(columns=columns)
+
+
+def _currency_totals_(values, currencies):
+    # {moeda: soma} a partir de arrays de valores e moedas.
+    if len(values) == 0:
+        return {}
+    totals = pd.Series(values).groupby(pd.Series(currencies)).sum()
+    return {str(code): float(total) for code, total in totals.items()}
+
+
+class DealFlowStats:
+    """
+    Estatísticas de conversão e de movimentação dos pipelines calculadas localmente a partir do histórico
+    de etapas dos negócios (deals_get_flow).
+
+    O histórico é baixado uma vez (em paralelo, com o limitador de taxa do tenant) e refresh() o mantém
+    atualizado buscando apenas os negócios alterados desde a última sincronização (recents_get). As consultas
+    usam operações vetorizadas sobre as passagens dos negócios pelas etapas e ficam em cache até o próximo
+    refresh que traga alterações, então períodos passados voltam em milissegundos.
+
+    Parâmetros:
+    - api_token (str, opcional): Token da API. Necessário para refresh().
+    - company_domain (str, opcional): Domínio da empresa no Pipedrive.
+    - deals (pd.DataFrame, opcional): Negócios já baixados (deals_get_all).
+    - stages (pd.DataFrame, opcional): Etapas já baixadas (stages_get_all).
+    - changes (pd.DataFrame, opcional): Alterações de etapa já decodificadas (colunas deal_id, time, user_id,
+      old_stage, new_stage), para uso offline.
+    - max_workers (int, opcional): Chamadas simultâneas de deals_get_flow. Padrão é 8.
+
+    # Exemplo de uso:
+        stats = DealFlowStats(api_token='seu_token_aqui', company_domain='sua_empresa')
+        stats.refresh()
+        stats.conversion_statistics(1, '2024-01-01', '2024-03-31')
+        stats.movement_statistics(1, '2024-01-01', '2024-03-31', user_id=10)
+    """
+
+    CHANGE_COLUMNS = ['deal_id', 'time', 'user_id', 'old_stage', 'new_stage']
+
+    def __init__(self, api_token=None, company_domain='api', deals=None, stages=None, changes=None, max_workers=8):
+        self.api_token = api_token
+        self.company_domain = company_domain
+        self.max_workers = max_workers
+        self.deals = deals if deals is not None else pd.DataFrame(columns=['id'])
+        self.stages = stages if stages is not None else pd.DataFrame(columns=['id', 'pipeline_id', 'order_nr'])
+        self.changes = changes if changes is not None else pd.DataFrame(columns=self.CHANGE_COLUMNS)
+        self.synced_at = None
+        self._results = {}
+        self._rebuild()
+
+    @classmethod
+    def stage_changes(cls, flow):
+        """
+        Decodifica o retorno de deals_get_flow nas alterações de etapa (deal_id, time, user_id, old_stage, new_stage).
+        """
+        changes = _flow_changes_(flow)
+        changes = changes[changes['field_key'] == 'stage_id']
+
+        return pd.DataFrame({
+            'deal_id': pd.to_numeric(changes['item_id'], errors='coerce').astype('Int64'),
+            'time': pd.to_datetime(changes['log_time'], errors='coerce', format='ISO8601'),
+            'user_id': pd.to_numeric(changes['user_id'], errors='coerce').astype('Int64'),
+            'old_stage': pd.to_numeric(changes['old_value'], errors='coerce').astype('Int64'),
+            'new_stage': pd.to_numeric(changes['new_value'], errors='coerce').astype('Int64'),
+        }).reset_index(drop=True)
+
+    def refresh(self):
+        """
+        Sincroniza negócios, etapas e histórico. Na primeira chamada baixa tudo; nas seguintes, apenas os
+        negócios alterados desde a última sincronização.
+
+        Retorna:
+        int: Quantidade de negócios cujo histórico foi (re)carregado.
+        """
+        api_token = check_api_token(self.api_token)
+        started = _utc_timestamp_()
+
+        with _tenant_scope_(api_token, self.company_domain):
+            self.stages = stages_get_all(api_token=api_token, company_domain=self.company_domain)
+
+            if self.synced_at is None:
+                deals = deals_get_all(status='all_not_deleted', api_token=api_token, company_domain=self.company_domain)
+            else:
+                recents = recents_get(self.synced_at, items='deal', api_token=api_token, company_domain=self.company_domain)
+                deals = _dict_frame_(recents['data']).reset_index(drop=True) if 'data' in recents.columns else pd.DataFrame()
+
+            ids = [int(i) for i in deals['id']] if 'id' in deals.columns else []
+            flows = _map_concurrent_(
+                lambda deal_id: deals_get_flow(deal_id, api_token=api_token, company_domain=self.company_domain),
+                ids, self.max_workers)
+
+        if ids:
+            changes = [self.stage_changes(flow) for flow in flows]
+            changes = pd.concat(changes, ignore_index=True) if changes else pd.DataFrame(columns=self.CHANGE_COLUMNS)
+
+            if self.synced_at is None:
+                self.deals, self.changes = deals, changes
+            else:
+                keep = ~self.deals['id'].isin(ids)
+                self.deals = pd.concat([self.deals[keep], deals], ignore_index=True)
+                keep = ~self.changes['deal_id'].isin(ids)
+                self.changes = pd.concat([self.changes[keep], changes], ignore_index=True)
+
+            self._results.clear()
+
+        self.synced_at = started
+        self._rebuild()
+
+        return len(ids)
+
+    def _rebuild(self):
+        # Tabela de passagens: cada entrada de um negócio em uma etapa, com hora de entrada e de saída.
+        deals = self.deals
+        stages = self.stages
+        changes = self.changes.sort_values(['deal_id', 'time'], kind='stable')
+
+        deal_ids = pd.to_numeric(deals['id'], errors='coerce').astype('Int64') if 'id' in deals.columns else pd.Series(dtype='Int64')
+        add_time = pd.to_datetime(deals['add_time'], errors='coerce', format='ISO8601') if 'add_time' in deals.columns else pd.Series(pd.NaT, index=deals.index)
+        current = _reference_ids_(deals, 'stage_id')
+
+        first_old = changes.groupby('deal_id')['old_stage'].first()
+        initial_stage = deal_ids.map(first_old).astype('Int64').fillna(current)
+
+        visits = pd.concat([
+            pd.DataFrame({'deal_id': deal_ids.to_numpy(), 'time': add_time.to_numpy(), 'stage': initial_stage.to_numpy(),
+                          'moved': False}),
+            pd.DataFrame({'deal_id': changes['deal_id'].to_numpy(), 'time': changes['time'].to_numpy(),
+                          'stage': changes['new_stage'].to_numpy(), 'moved': True}),
+        ], ignore_index=True)
+        visits = visits.dropna(subset=['deal_id', 'stage']).sort_values(['deal_id', 'time'], kind='stable').reset_index(drop=True)
+        visits['exit'] = visits.groupby('deal_id')['time'].shift(-1)
+
+        # Negócios ganhos/perdidos deixam a última etapa quando fecham (won_time/lost_time, ou close_time).
+        status = deals['status'].astype(str).to_numpy() if 'status' in deals.columns else np.full(len(deals), '')
+        closed_at = pd.Series(np.where(status == 'won', self._deal_times('won_time'),
+                                       np.where(status == 'lost', self._deal_times('lost_time'), np.datetime64('NaT'))))
+        closed_at = closed_at.fillna(pd.Series(self._deal_times('close_time')).where(np.isin(status, ('won', 'lost'))))
+        closed_at = closed_at.set_axis(deal_ids.to_numpy())
+        closed_at = closed_at[closed_at.index.notna() & ~closed_at.index.duplicated()]
+        visits['exit'] = visits['exit'].fillna(pd.Series(closed_at.reindex(visits['deal_id']).to_numpy(), index=visits.index))
+
+        stage_ids = pd.to_numeric(stages['id'], errors='coerce')
+        visits['pipeline'] = visits['stage'].map(pd.Series(pd.to_numeric(stages['pipeline_id'], errors='coerce').to_numpy(), index=stage_ids))
+        visits['order'] = visits['stage'].map(pd.Series(pd.to_numeric(stages['order_nr'], errors='coerce').to_numpy(), index=stage_ids))
+
+        owners = pd.Series(_reference_ids_(deals, 'user_id').to_numpy(), index=deal_ids.to_numpy())
+        visits['owner'] = visits['deal_id'].map(owners)
+
+        self.visits = visits
+        self._deal_info = pd.DataFrame({
+            'deal_id': deal_ids.to_numpy(),
+            'owner': owners.to_numpy(),
+            'pipeline': _reference_ids_(deals, 'pipeline_id').to_numpy(),
+            'add_time': add_time.to_numpy(),
+            'won_time': self._deal_times('won_time'),
+            'lost_time': self._deal_times('lost_time'),
+            'status': deals['status'].astype(str).to_numpy() if 'status' in deals.columns else '',
+            'value': pd.to_numeric(deals.get('value', pd.Series(0.0, index=deals.index)), errors='coerce').fillna(0.0).to_numpy(),
+            'currency': deals.get('currency', pd.Series('', index=deals.index)).astype(str).to_numpy(),
+        })
+
+    def _deal_times(self, column):
+        if column not in self.deals.columns:
+            return pd.Series(pd.NaT, index=self.deals.index).to_numpy()
+        return pd.to_datetime(self.deals[column], errors='coerce', format='ISO8601').to_numpy()
+
+    @staticmethod
+    def _range(start_date, end_date):
+        # end_date inclusivo, como nos endpoints.
+        return pd.Timestamp(start_date), pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1)
+
+    def _pipeline_stages(self, pipeline_id):
+        stages = self.stages[pd.to_numeric(self.stages['pipeline_id'], errors='coerce') == int(pipeline_id)]
+        return stages.sort_values('order_nr')['id'].astype(int).tolist()
+
+    def conversion_statistics(self, id, start_date, end_date, user_id=None):
+        """
+        Mesmo formato de pipelines_get_conversion_statistics, calculado localmente.
+
+        A conversão de uma etapa é a porcentagem dos negócios que estiveram nela no período e chegaram a uma
+        etapa posterior do pipeline no mesmo período. won_conversion e lost_conversion são as porcentagens dos
+        negócios que passaram pelo pipeline no período e foram ganhos ou perdidos nele.
+
+        Parâmetros:
+        - id (int): ID do pipeline.
+        - start_date (str): Data inicial do período. Formato: YYYY-MM-DD.
+        - end_date (str): Data final do período (inclusive). Formato: YYYY-MM-DD.
+        - user_id (int, opcional): Apenas negócios deste proprietário.
+
+        Retorna:
+        dict: {'success': True, 'data': {'stage_conversions': [...], 'won_conversion': ..., 'lost_conversion': ...}}.
+        """
+        key = ('conversion', int(id), str(start_date), str(end_date), user_id)
+        if key in self._results:
+            return self._results[key]
+
+        start, end = self._range(start_date, end_date)
+        visits = self.visits
+        mask = (visits['pipeline'] == int(id)) & (visits['time'] >= start) & (visits['time'] < end)
+        if user_id is not None:
+            mask &= visits['owner'] == int(user_id)
+        visits = visits[mask.fillna(False).astype(bool)]
+
+        reach = visits.groupby('deal_id')['order'].transform('max')
+        converted = (reach > visits['order']).groupby([visits['stage'], visits['deal_id']]).max()
+        rates = converted.groupby(level=0).mean() * 100
+
+        stages = self._pipeline_stages(id)
+        stage_conversions = [
+            {'from_stage_id': a, 'to_stage_id': b, 'conversion_rate': round(float(rates.get(a, 0.0)), 2)}
+            for a, b in zip(stages, stages[1:])
+        ]
+
+        info = self._deal_info[self._deal_info['deal_id'].isin(visits['deal_id'].unique())]
+        total = len(info)
+        won = ((info['won_time'] >= start) & (info['won_time'] < end) & (info['status'] == 'won')).sum()
+        lost = ((info['lost_time'] >= start) & (info['lost_time'] < end) & (info['status'] == 'lost')).sum()
+
+        result = {'success': True, 'data': {
+            'stage_conversions': stage_conversions,
+            'won_conversion': round(100.0 * won / total, 2) if total else 0.0,
+            'lost_conversion': round(100.0 * lost / total, 2) if total else 0.0,
+        }}
+        self._results[key] = result
+        return result
+
+    def movement_statistics(self, id, start_date, end_date, user_id=None):
+        """
+        Mesmo formato de pipelines_get_movement_statistics, calculado localmente.
+
+        Parâmetros:
+        - id (int): ID do pipeline.
+        - start_date (str): Data inicial do período. Formato: YYYY-MM-DD.
+        - end_date (str): Data final do período (inclusive). Formato: YYYY-MM-DD.
+        - user_id (int, opcional): Apenas negócios deste proprietário.
+
+        Retorna:
+        dict: {'success': True, 'data': {'movements_between_stages', 'new_deals', 'deals_left_open', 'won_deals',
+        'lost_deals', 'average_age_in_days'}}.
+        """
+        key = ('movement', int(id), str(start_date), str(end_date), user_id)
+        if key in self._results:
+            return self._results[key]
+
+        start, end = self._range(start_date, end_date)
+        info = self._deal_info
+        in_pipeline = (info['pipeline'] == int(id)).fillna(False).astype(bool)
+        if user_id is not None:
+            in_pipeline &= (info['owner'] == int(user_id)).fillna(False).astype(bool)
+        info = info[in_pipeline]
+
+        def summary(mask):
+            selected = info[mask]
+            return {
+                'count': int(len(selected)),
+                'deals_ids': [int(i) for i in selected['deal_id']],
+                'values': _currency_totals_(selected['value'].to_numpy(), selected['currency'].to_numpy()),
+            }
+
+        closed_at = info['won_time'].fillna(info['lost_time'])
+        new_deals = (info['add_time'] >= start) & (info['add_time'] < end)
+        won = (info['status'] == 'won') & (info['won_time'] >= start) & (info['won_time'] < end)
+        lost = (info['status'] == 'lost') & (info['lost_time'] >= start) & (info['lost_time'] < end)
+        left_open = (info['add_time'] < end) & (closed_at.isna() | (closed_at >= end)) & (info['status'] != 'deleted')
+
+        visits = self.visits[self.visits['deal_id'].isin(info['deal_id'])]
+        visits = visits[(visits['pipeline'] == int(id)).fillna(False).astype(bool)]
+        moves = visits['moved'] & (visits['time'] >= start) & (visits['time'] < end)
+
+        # Tempo em cada etapa dentro do período, limitado ao fim do período.
+        entered = visits['time'].clip(lower=start)
+        left = visits['exit'].fillna(end).clip(upper=end)
+        days = (left - entered).dt.total_seconds() / 86400
+        days = days[days > 0]
+        by_stage = days.groupby(visits.loc[days.index, 'stage']).mean()
+
+        result = {'success': True, 'data': {
+            'movements_between_stages': {'count': int(moves.sum())},
+            'new_deals': summary(new_deals),
+            'deals_left_open': summary(left_open),
+            'won_deals': summary(won),
+            'lost_deals': summary(lost),
+            'average_age_in_days': {
+                'across_all_stages': round(float(days.groupby(visits.loc[days.index, 'deal_id']).sum().mean()), 2) if len(days) else 0.0,
+                'by_stages': [{'stage_id': int(stage), 'value': round(float(value), 2)} for stage, value in by_stage.items()],
+            },
+        }}
+        self._results[key] = result
+        return result
+
+
+
+# BUSCA LOCAL
+def _normalize_text_(value):
+    # Minúsculas, sem acentos e com espaços simples.
+    text = unicodedata.normalize('NFKD', str(value).casefold())
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return ' '.join(text.split())
+
+
+def _trigrams_(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _contact_values_(frame, column):
+    # Todos os valores das listas de contato (email, phone) de cada linha, como lista de strings.
+    empty = pd.Series([[] for _ in range(len(frame))], index=frame.index, dtype=object)
+
+    if f'primary_{column}' in frame.columns:
+        values = frame[f'primary_{column}']
+        return values.map(lambda v: [v] if isinstance(v, str) and v else [])
+
+    if column not in frame.columns or not _is_contact_list_column_(frame[column]):
+        return empty
+
+    items = frame[column][frame[column].notna()].explode()
+    items = items[items.notna()]
+    if items.empty:
+        return empty
+
+    values = _dict_frame_(items).get('value')
+    if values is None:
+        return empty
+
+    values = values[values.notna() & (values.astype(str) != '')].astype(str)
+    grouped = values.groupby(level=0).agg(list)
+
+    return grouped.reindex(frame.index).map(lambda v: v if isinstance(v, list) else [])
+
+
+class SearchIndex:
+    """
+    Índice de busca local (invertido, por trigramas) sobre negócios, pessoas, organizações e produtos,
+    para substituir searchresults_get e os *_find no autocomplete.
+
+    Os termos são comparados sem diferenciar maiúsculas e acentos. Termos com 3 ou mais caracteres usam a
+    interseção das listas de trigramas; termos menores usam o índice de prefixos das palavras. Os resultados
+    são ordenados por relevância: igualdade com o campo, início do campo, início de palavra e, por fim,
+    ocorrência no meio do texto, ponderados pela fração do campo coberta pelo termo. O título (nome) pesa
+    mais que os demais campos (e-mails, telefones, código, endereço).
+
+    O índice é atualizado incrementalmente com add()/remove() ou, quando montado pela API, com refresh(),
+    que usa recents_get para buscar apenas o que mudou.
+
+    # Exemplo de uso:
+        index = SearchIndex.from_api(api_token='seu_token_aqui', company_domain='sua_empresa')
+        index.searchresults_get('acme', item_type='organization')
+        index.refresh()
+    """
+
+    # Tipo do item -> (função de listagem, campo de título, campos de texto adicionais, campos de detalhes).
+    ITEM_TYPES = {
+        'deal': ('deals_get_all', 'title', (), ('value', 'currency', 'status', 'person_id', 'org_id')),
+        'person': ('persons_get_all', 'name', ('email', 'phone'), ('org_id',)),
+        'organization': ('organizations_get_all', 'name', ('address',), ()),
+        'product': ('products_get_all', 'name', ('code',), ()),
+    }
+
+    def __init__(self, api_token=None, company_domain='api'):
+        self.api_token = api_token
+        self.company_domain = company_domain
+        self.synced_at = None
+        self._docs = []
+        self._free = []
+        self._by_key = {}
+        self._trigrams = collections.defaultdict(set)
+        self._prefixes = collections.defaultdict(set)
+        self._exact = collections.defaultdict(set)
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._by_key)
+
+    @classmethod
+    def from_api(cls, item_types=None, max_workers=4, api_token=None, company_domain='api'):
+        """
+        Monta o índice baixando as coleções (em paralelo) pela API.
+
+        Parâmetros:
+        - item_types (list, opcional): Tipos a indexar. Padrão: deal, person, organization e product.
+        - max_workers (int, opcional): Listagens simultâneas. Padrão é 4.
+        - api_token (str): Token da API necessário para validar as solicitações.
+        - company_domain (str): Domínio da empresa no Pipedrive.
+
+        Retorna:
+        SearchIndex: O índice montado.
+        """
+        api_token = check_api_token(api_token)
+        index = cls(api_token, company_domain)
+        item_types = list(item_types or cls.ITEM_TYPES)
+        started = _utc_timestamp_()
+
+        def load(item_type):
+            return _resolve_function(cls.ITEM_TYPES[item_type][0])(api_token=api_token, company_domain=company_domain)
+
+        with _tenant_scope_(api_token, company_domain):
+            frames = _map_concurrent_(load, item_types, max_workers)
+
+        for item_type, frame in zip(item_types, frames):
+            index.add(item_type, frame)
+
+        index.synced_at = started
+        return index
+
+    def refresh(self):
+        """
+        Atualiza o índice com os itens alterados desde a última sincronização (recents_get).
+
+        Retorna:
+        int: Quantidade de itens atualizados ou removidos.
+        """
+        api_token = check_api_token(self.api_token)
+        started = _utc_timestamp_()
+
+        if self.synced_at is None:
+            raise ValueError("O índice não foi montado pela API; use SearchIndex.from_api ou add().")
+
+        recents = recents_get(self.synced_at, items=','.join(self.ITEM_TYPES), api_token=api_token,
+                              company_domain=self.company_domain)
+        count = 0
+
+        if not recents.empty and {'item', 'data'} <= set(recents.columns):
+            for item_type, group in recents.groupby('item'):
+                if item_type not in self.ITEM_TYPES:
+                    continue
+
+                items = _dict_frame_(group['data']).reset_index(drop=True)
+                deleted = items['deleted'].fillna(False).astype(bool) if 'deleted' in items.columns else False
+                if 'active_flag' in items.columns:
+                    deleted = deleted | items['active_flag'].eq(False)
+                deleted = pd.Series(deleted, index=items.index)
+
+                self.remove(item_type, items.loc[deleted, 'id'])
+                self.add(item_type, items[~deleted])
+                count += len(items)
+
+        self.synced_at = started
+        return count
+
+    def add(self, item_type, frame):
+        """
+        Indexa (ou reindexa) os itens de um DataFrame retornado pela listagem do tipo informado.
+
+        Parâmetros:
+        - item_type (str): 'deal', 'person', 'organization' ou 'product'.
+        - frame (pd.DataFrame): Itens a indexar (ex: resultado de persons_get_all).
+        """
+        if item_type not in self.ITEM_TYPES:
+            raise ValueError(f"Tipo de item inválido: {item_type}. Opções: {list(self.ITEM_TYPES)}")
+
+        if frame is None or frame.empty or 'id' not in frame.columns:
+            return
+
+        _, title_key, text_keys, detail_keys = self.ITEM_TYPES[item_type]
+        frame = frame.reset_index(drop=True)
+        titles = frame[title_key].fillna('').astype(str) if title_key in frame.columns else pd.Series('', index=frame.index)
+        texts = [titles.map(lambda v: [v])]
+
+        for key in text_keys:
+            if key in ('email', 'phone'):
+                texts.append(_contact_values_(frame, key))
+            elif key in frame.columns:
+                texts.append(frame[key].map(lambda v: [v] if isinstance(v, str) and v else []))
+
+        details = self._details(frame, detail_keys)
+        ids = pd.to_numeric(frame['id'], errors='coerce')
+
+        with self._lock:
+            for row, item_id in enumerate(ids):
+                if pd.isna(item_id):
+                    continue
+
+                fields = []
+                for column in texts:
+                    fields.extend(_normalize_text_(v) for v in column.iat[row])
+                self._index((item_type, int(item_id)), titles.iat[row], tuple(f for f in fields if f), details[row])
+
+    def remove(self, item_type, ids):
+        """
+        Remove itens do índice.
+
+        Parâmetros:
+        - item_type (str): Tipo dos itens.
+        - ids (list): IDs dos itens.
+        """
+        with self._lock:
+            for item_id in ids:
+                self._unindex((item_type, int(item_id)))
+
+    def _details(self, frame, keys):
+        columns = {}
+        for key in keys:
+            if key in frame.columns and _is_dict_column_(frame[key]):
+                nested = _dict_frame_(frame[key]).reindex(frame.index)
+                columns[key.replace('_id', '_name')] = nested['name'] if 'name' in nested.columns else None
+                columns[key] = _reference_ids_(frame, key)
+            elif f'{key}.value' in frame.columns:
+                columns[key.replace('_id', '_name')] = frame.get(f'{key}.name')
+                columns[key] = _reference_ids_(frame, key)
+            elif key in frame.columns:
+                columns[key] = frame[key]
+
+        columns = {k: v for k, v in columns.items() if v is not None}
+        if not columns:
+            return [{} for _ in range(len(frame))]
+
+        return _records_(pd.DataFrame(columns, index=frame.index))
+
+    def _index(self, key, title, fields, details):
+        self._unindex(key)
+
+        doc = self._free.pop() if self._free else len(self._docs)
+        if doc == len(self._docs):
+            self._docs.append(None)
+
+        self._docs[doc] = (key[0], key[1], title, fields, details)
+        self._by_key[key] = doc
+
+        for field in fields:
+            self._exact[field].add(doc)
+            for gram in _trigrams_(field):
+                self._trigrams[gram].add(doc)
+            for word in field.split():
+                self._prefixes[word[:1]].add(doc)
+                self._prefixes[word[:2]].add(doc)
+
+    def _unindex(self, key):
+        doc = self._by_key.pop(key, None)
+        if doc is None:
+            return
+
+        for field in self._docs[doc][3]:
+            self._exact[field].discard(doc)
+            for gram in _trigrams_(field):
+                self._trigrams[gram].discard(doc)
+            for word in field.split():
+                self._prefixes[word[:1]].discard(doc)
+                self._prefixes[word[:2]].discard(doc)
+
+        self._docs[doc] = None
+        self._free.append(doc)
+
+    @staticmethod
+    def _score(term, fields):
+        best = 0.0
+        for position, field in enumerate(fields):
+            if field == term:
+                score = 1.0
+            elif field.startswith(term):
+                score = 0.75 + 0.2 * len(term) / len(field)
+            elif f' {term}' in field:
+                score = 0.5 + 0.2 * len(term) / len(field)
+            elif term in field:
+                score = 0.25 + 0.2 * len(term) / len(field)
+            else:
+                continue
+
+            best = max(best, score if position == 0 else score * 0.9)
+
+        return best
+
+    def search(self, term, item_type=None, start=0, limit=100, exact_match=False):
+        """
+        Busca no índice.
+
+        Parâmetros:
+        - term (str): Termo de pesquisa.
+        - item_type (str ou list, opcional): Tipo(s) de item, ex: 'person' ou 'deal,organization'.
+        - start (int, opcional): Início da paginação. Padrão é 0.
+        - limit (int, opcional): Quantidade de resultados. Padrão é 100.
+        - exact_match (bool, opcional): Apenas itens com um campo igual ao termo (sem diferenciar maiúsculas).
+
+        Retorna:
+        list: Resultados ordenados por relevância, cada um com result_score, id, type, title e details.
+        """
+        term = _normalize_text_(term)
+        if not term:
+            return []
+
+        if isinstance(item_type, str):
+            item_type = item_type.split(',')
+        types = set(item_type) if item_type else None
+
+        with self._lock:
+            if exact_match:
+                candidates = set(self._exact.get(term, ()))
+            elif len(term) < 3:
+                candidates = set(self._prefixes.get(term, ()))
+            else:
+                postings = sorted((self._trigrams.get(gram, set()) for gram in _trigrams_(term)), key=len)
+                candidates = set(postings[0]).intersection(*postings[1:]) if postings else set()
+
+            results = []
+            for doc in candidates:
+                kind, item_id, title, fields, details = self._docs[doc]
+                if types is not None and kind not in types:
+                    continue
+
+                score = 1.0 if exact_match else self._score(term, fields)
+                if score > 0:
+                    results.append((-score, kind, item_id, title, details))
+
+        results.sort(key=lambda r: r[:3])
+        page = results[start:start + limit] if limit is not None else results[start:]
+
+        return [{'result_score': round(-score, 4), 'id': item_id, 'type': kind, 'title': title, 'details': details}
+                for score, kind, item_id, title, details in page]
+
+    def searchresults_get(self, term, item_type=None, start=None, limit=None, exact_match=None):
+        """
+        Mesmos parâmetros e formato de retorno (DataFrame) de searchresults_get, respondidos pelo índice local.
+        """
+        results = self.search(term, item_type=item_type, start=start or 0, limit=limit if limit is not None else 500,
+                              exact_match=bool(exact_match))
+        return pd.DataFrame(results, columns=['result_score', 'id', 'type', 'title', 'details'])
+
+
+def _find_many_(func_name, terms, max_workers, api_token, company_domain, **kwargs):
+    # Uma busca por termo distinto (sem diferenciar maiúsculas/espaços), em paralelo sob o limitador do tenant.
+    api_token = check_api_token(api_token)
+    terms = list(terms)
+    keys = [' '.join(str(term).split()).casefold() if pd.notna(term) else '' for term in terms]
+    unique = list(dict.fromkeys(key for key in keys if key))
+
+    def find(key):
+        found = _cached_call_(func_name, key, api_token=api_token, company_domain=company_domain, **kwargs)
+        if found is None or found.empty or 'id' not in found.columns:
+            return []
+        return pd.to_numeric(found['id'], errors='coerce').dropna().astype(int).drop_duplicates().tolist()
+
+    with _tenant_scope_(api_token, company_domain):
+        matches = dict(zip(unique, _map_concurrent_(find, unique, max_workers)))
+
+    ids = [list(matches.get(key, [])) for key in keys]
+    return pd.DataFrame({'term': terms, 'ids': ids, 'match_count': [len(i) for i in ids]})
+
+
+def persons_find_many(terms, org_id=None, search_by_email=None, max_workers=8, api_token=None, company_domain='api'):
+    """
+    Busca em lote de pessoas (persons_find) para vários termos, ex: os e-mails de uma planilha de importação.
+
+    Os termos repetidos (sem diferenciar maiúsculas e espaços) são buscados uma única vez e as buscas restantes
+    rodam em paralelo, respeitando o limitador de taxa do tenant. Dentro de um PipedriveClient, os resultados
+    ficam no cache do cliente por cache_ttl segundos, então lotes seguintes reaproveitam os termos já buscados.
+
+    Parâmetros:
+    - terms (list): Termos de busca (nomes, e-mails ou telefones).
+    - org_id (int, opcional): ID da organização associada às pessoas.
+    - search_by_email (int, opcional): 1 para comparar os termos apenas com os e-mails.
+    - max_workers (int, opcional): Buscas simultâneas. Padrão é 8.
+    - api_token (str): Token da API para autenticação. Necessário.
+    - company_domain (str): Domínio da empresa no Pipedrive. Padrão é 'api'.
+
+    Retorna:
+    - pd.DataFrame: Uma linha por termo de entrada (na mesma ordem) com as colunas term, ids e match_count.
+
+    Exemplo de uso:
+    --------------
+    emails = planilha['email']
+    matches = persons_find_many(emails, search_by_email=1, api_token=api_token, company_domain=company_domain)
+    novos = planilha[matches['match_count'].eq(0).to_numpy()]
+    """
+    return _find_many_('persons_find', terms, max_workers, api_token, company_domain, org_id=org_id,
+                       search_by_email=search_by_email)
+
+
+def organizations_find_many(terms, max_workers=8, api_token=None, company_domain='api'):
+    """
+    Busca em lote de organizações (organizations_find) para vários nomes, nos mesmos moldes de persons_find_many.
+
+    Parâmetros:
+    - terms (list): Nomes das organizações.
+    - max_workers (int, opcional): Buscas simultâneas. Padrão é 8.
+    - api_token (str): Token de API para validar as requisições.
+    - company_domain (str): Domínio da empresa no Pipedrive.
+
+    Retorna:
+    - pd.DataFrame: Uma linha por termo de entrada (na mesma ordem) com as colunas term, ids e match_count.
+    """
+    return _find_many_('organizations_find', terms, max_workers, api_token, company_domain)
+
+
+# UPSERT POR CHAVE
+def _response_data_(result):
+    # 'data' da resposta de uma função de escrita, aceitando os retornos dict, str ou Response das funções.
+    if hasattr(result, 'status_code'):
+        try:
+            result = result.json()
+        except ValueError:
+            result = result.text
+
+    if not isinstance(result, dict) or not result.get('success'):
+        raise ValueError(f"Falha na requisição ao Pipedrive: {result}")
+
+    return result.get('data')
+
+
+def _call_with_fields_(func, fields, **kwargs):
+    # Passa os campos conhecidos como parâmetros da função e o restante no dict de campos personalizados.
+    parameters = inspect.signature(func).parameters
+    custom = next((name for name in parameters if name.lower().startswith('custom')), None)
+    known = {k: v for k, v in fields.items() if k in parameters and k != custom}
+    extra = {k: v for k, v in fields.items() if k not in known}
+
+    if extra:
+        if custom is None:
+            raise ValueError(f"Campos não suportados por {func.__name__}: {list(extra)}")
+        known[custom] = extra
+
+    return func(**known, **kwargs)
+
+
+def _merge_contacts_(field, existing, new):
+    # Acrescenta os novos e-mails/telefones à lista atual da pessoa, sem remover os que já existem.
+    def key(value):
+        value = value.get('value') if isinstance(value, dict) else value
+        if value is None or (not isinstance(value, str) and pd.isna(value)):
+            return None
+        return re.sub(r'\D', '', str(value)) if field == 'phone' else _normalize_text_(value)
+
+    merged = [dict(c) for c in existing if isinstance(c, dict) and key(c)] if isinstance(existing, list) else []
+    seen = {key(c) for c in merged}
+
+    for value in new if isinstance(new, (list, tuple)) else [new]:
+        if key(value) and key(value) not in seen:
+            seen.add(key(value))
+            merged.append(dict(value) if isinstance(value, dict) else {'value': value, 'primary': not merged})
+
+    return merged
+
+
+class Upserter:
+    """
+    Upsert de pessoas ou organizações por uma chave (email, phone, name ou a chave de um campo personalizado),
+    sem a busca prévia (*_find) a cada registro.
+
+    Nas atualizações a chave não é reenviada, e e-mails/telefones informados são acrescentados aos da pessoa
+    (persons_get), sem substituir os existentes.
+
+    As chaves ficam em um índice local montado a partir de persons_get_all/organizations_get_all e mantido
+    atualizado pelas próprias escritas e por refresh() (recents_get). Cada upsert consulta o índice e faz só a
+    chamada necessária: *_add quando a chave não existe e *_update quando existe. Upserts simultâneos da
+    mesma chave são serializados, então a mesma pessoa não é criada duas vezes.
+
+    As chaves são comparadas normalizadas: e-mails e textos sem diferenciar maiúsculas, espaços e acentos;
+    telefones apenas pelos dígitos.
+
+    # Exemplo de uso:
+        upserter = Upserter.from_api('person', key='email', api_token='seu_token_aqui', company_domain='sua_empresa')
+        upserter.upsert({'name': 'Maria', 'email': 'maria@acme.com', 'phone': '+55 11 99999-0000'})
+        upserter.upsert_many(leads.to_dict('records'))
+    """
+
+    # Entidade -> (listagem, inclusão, atualização).
+    ENTITIES = {
+        'person': ('persons_get_all', 'persons_add', 'persons_update'),
+        'organization': ('organizations_get_all', 'organizations_add', 'organizations_update'),
+    }
+
+    def __init__(self, entity='person', key='email', api_token=None, company_domain='api'):
+        if entity not in self.ENTITIES:
+            raise ValueError(f"Entidade inválida: {entity}. Opções: {list(self.ENTITIES)}")
+
+        self.entity = entity
+        self.key = key
+        self.api_token = api_token
+        self.company_domain = company_domain
+        self.synced_at = None
+        self._ids = {}
+        self._keys_by_id = collections.defaultdict(set)
+        self._lock = threading.Lock()
+        self._key_locks = collections.defaultdict(threading.Lock)
+
+    def __len__(self):
+        return len(self._ids)
+
+    @classmethod
+    def from_api(cls, entity='person', key='email', api_token=None, company_domain='api'):
+        """
+        Cria o upserter com o índice de chaves montado a partir da listagem completa da entidade.
+
+        Parâmetros:
+        - entity (str): 'person' ou 'organization'.
+        - key (str): 'email', 'phone', 'name' ou a chave de um campo personalizado.
+        - api_token (str): Token da API necessário para validar as solicitações.
+        - company_domain (str): Domínio da empresa no Pipedrive.
+
+        Retorna:
+        Upserter: O upserter pronto para uso.
+        """
+        api_token = check_api_token(api_token)
+        upserter = cls(entity, key, api_token, company_domain)
+        started = _utc_timestamp_()
+
+        frame = _resolve_function(cls.ENTITIES[entity][0])(api_token=api_token, company_domain=company_domain)
+        upserter.add(frame)
+        upserter.synced_at = started
+
+        return upserter
+
+    def normalize(self, value):
+        """
+        Forma normalizada de um valor de chave (None quando vazio).
+        """
+        if isinstance(value, dict):
+            value = value.get('value')
+        if value is None or (not isinstance(value, (list, tuple)) and pd.isna(value)):
+            return None
+
+        if self.key == 'phone':
+            value = re.sub(r'\D', '', str(value))
+        else:
+            value = _normalize_text_(value)
+
+        return value or None
+
+    def _values(self, value):
+        # Valores de chave de um campo, que pode ser escalar ou uma lista de contatos [{'value': ...}, ...].
+        values = value if isinstance(value, (list, tuple)) else [value]
+        return {key for key in map(self.normalize, values) if key}
+
+    def add(self, frame):
+        """
+        Indexa as chaves de um DataFrame da entidade (ex: resultado de persons_get_all).
+        """
+        if frame is None or frame.empty or 'id' not in frame.columns:
+            return
+
+        frame = frame.reset_index(drop=True)
+        if self.key in ('email', 'phone'):
+            values = _contact_values_(frame, self.key)
+        elif self.key in frame.columns:
+            values = frame[self.key]
+        else:
+            return
+
+        ids = pd.to_numeric(frame['id'], errors='coerce')
+
+        with self._lock:
+            # Com chaves repetidas no Pipedrive, vale o registro mais antigo (menor id).
+            for item_id, value in sorted(zip(ids, values), key=lambda pair: pair[0], reverse=True):
+                if pd.isna(item_id):
+                    continue
+                self._index(int(item_id), self._values(value))
+
+    def remove(self, ids):
+        """
+        Remove ids do índice (ex: registros excluídos ou mesclados).
+        """
+        with self._lock:
+            for item_id in ids:
+                for key in self._keys_by_id.pop(int(item_id), ()):
+                    if self._ids.get(key) == int(item_id):
+                        del self._ids[key]
+
+    def _index(self, item_id, keys):
+        for key in self._keys_by_id.pop(item_id, ()):
+            if self._ids.get(key) == item_id:
+                del self._ids[key]
+
+        for key in keys:
+            self._ids[key] = item_id
+        if keys:
+            self._keys_by_id[item_id] = set(keys)
+
+    def lookup(self, value):
+        """
+        ID do registro com o valor de chave informado, ou None.
+        """
+        key = self.normalize(value)
+        return self._ids.get(key) if key else None
+
+    def refresh(self):
+        """
+        Atualiza o índice com os registros alterados desde a última sincronização (recents_get).
+
+        Retorna:
+        int: Quantidade de registros atualizados ou removidos.
+        """
+        api_token = check_api_token(self.api_token)
+        started = _utc_timestamp_()
+
+        if self.synced_at is None:
+            raise ValueError("O índice não foi montado pela API; use Upserter.from_api ou add().")
+
+        recents = recents_get(self.synced_at, items=self.entity, api_token=api_token, company_domain=self.company_domain)
+        count = 0
+
+        if not recents.empty and {'item', 'data'} <= set(recents.columns):
+            items = _dict_frame_(recents.loc[recents['item'] == self.entity, 'data']).reset_index(drop=True)
+
+            if not items.empty:
+                deleted = pd.Series(False, index=items.index)
+                if 'deleted' in items.columns:
+                    deleted |= items['deleted'].fillna(False).astype(bool)
+                if 'active_flag' in items.columns:
+                    deleted |= items['active_flag'].eq(False)
+
+                self.remove(items.loc[deleted, 'id'])
+                self.add(items[~deleted])
+                count = len(items)
+
+        self.synced_at = started
+        return count
+
+    def upsert(self, fields):
+        """
+        Inclui ou atualiza um registro pela chave.
+
+        Parâmetros:
+        - fields (dict): Campos do registro, incluindo a chave (ex: {'name': ..., 'email': ...}). Campos que não são
+          parâmetros de *_add/*_update (como campos personalizados) vão no dict de campos personalizados. Campos
+          vazios (None/NaN) são ignorados.
+
+        Retorna:
+        dict: {'id': ..., 'action': 'added' | 'updated' | 'unchanged', 'data': dados retornados pela API}.
+        """
+        api_token = check_api_token(self.api_token)
+        fields = {k: v.item() if isinstance(v, np.generic) else v for k, v in fields.items()
+                  if isinstance(v, (list, dict)) or not pd.isna(v)}
+        key = self.normalize(fields.get(self.key))
+
+        if key is None:
+            raise ValueError(f"O registro não tem valor para a chave '{self.key}'.")
+
+        _, add_name, update_name = self.ENTITIES[self.entity]
+
+        with self._lock:
+            key_lock = self._key_locks[key]
+
+        with key_lock:
+            item_id = self._ids.get(key)
+            changes = {k: v for k, v in fields.items() if k != 'id'}
+
+            if item_id is None:
+                data = _response_data_(_call_with_fields_(
+                    _resolve_function(add_name), changes, api_token=api_token, company_domain=self.company_domain))
+                action = 'added'
+            else:
+                # A chave já está no registro; reenviá-la substituiria a lista de e-mails/telefones inteira.
+                changes.pop(self.key, None)
+                if not changes:
+                    return {'id': item_id, 'action': 'unchanged', 'data': None}
+
+                contacts = [f for f in ('email', 'phone') if f in changes] if self.entity == 'person' else []
+                if contacts:
+                    current = persons_get(item_id, api_token=api_token, company_domain=self.company_domain)
+                    current = current.iloc[0] if not current.empty else pd.Series(dtype=object)
+                    for field in contacts:
+                        existing = current.get(field)
+                        merged = _merge_contacts_(field, existing, changes.pop(field))
+                        if merged != _merge_contacts_(field, existing, []):
+                            changes[field] = merged
+                    if not changes:
+                        return {'id': item_id, 'action': 'unchanged', 'data': None}
+
+                data = _response_data_(_call_with_fields_(
+                    _resolve_function(update_name), changes, id=item_id, api_token=api_token,
+                    company_domain=self.company_domain))
+                action = 'updated'
+
+            if isinstance(data, dict) and data.get('id') is not None:
+                item_id = int(data['id'])
+                self.add(pd.DataFrame([data]))
+
+            with self._lock:
+                self._ids.setdefault(key, item_id)
+                self._keys_by_id[item_id].add(key)
+
+        return {'id': item_id, 'action': action, 'data': data}
+
+    def upsert_many(self, records, max_workers=8):
+        """
+        Upsert de vários registros em paralelo, sob o limitador de taxa do tenant.
+
+        Parâmetros:
+        - records (list): Lista de dicts de campos (ex: frame.to_dict('records')).
+        - max_workers (int, opcional): Upserts simultâneos. Padrão é 8.
+
+        Retorna:
+        pd.DataFrame: Uma linha por registro, na mesma ordem, com as colunas id, action, success e error. Um
+        registro recusado pela API não interrompe os demais.
+        """
+        api_token = check_api_token(self.api_token)
+
+        def run(fields):
+            try:
+                result = self.upsert(fields)
+                return {'id': result['id'], 'action': result['action'], 'success': True, 'error': None}
+            except (ValueError, TypeError, requests.exceptions.RequestException) as e:
+                return {'id': None, 'action': None, 'success': False, 'error': str(e)}
+
+        with _tenant_scope_(api_token, self.company_domain):
+            results = _map_concurrent_(run, records, max_workers)
+
+        frame = pd.DataFrame(results, columns=['id', 'action', 'success', 'error'])
+        frame['id'] = frame['id'].astype('Int64')
+        return frame
+
+
+# DETECÇÃO DE DUPLICADOS
+# Palavras ignoradas na comparação de nomes de organizações.
+_ORG_NAME_STOPWORDS = {'ltda', 'sa', 'me', 'epp', 'eireli', 'cia', 'inc', 'llc', 'ltd', 'corp', 'co', 'gmbh', 'limited'}
+
+# Peso de cada sinal na pontuação; sinais ausentes em um dos registros não entram na média.
+_DUPLICATE_WEIGHTS = {
+    'person': {'name': 0.5, 'email': 0.3, 'phone': 0.2},
+    'organization': {'name': 0.8, 'address': 0.2},
+}
+
+
+def _long_table_(ids, values):
+    # Tabela (id, value) a partir de uma série de listas, sem valores vazios ou repetidos.
+    table = pd.DataFrame({'id': ids, 'value': values}).explode('value')
+    table = table[table['value'].notna() & (table['value'].astype(str) != '')]
+    return table.drop_duplicates().reset_index(drop=True)
+
+
+def _name_tokens_(series, entity):
+    names = series.fillna('').astype(str).map(_normalize_text_).str.replace(r'[^\w ]+', ' ', regex=True)
+    tokens = names.str.split()
+
+    if entity == 'organization':
+        tokens = tokens.map(lambda words: [w for w in words if w not in _ORG_NAME_STOPWORDS])
+
+    return tokens
+
+
+def _gram_lists_(tokens):
+    return tokens.map(lambda words: list(_trigrams_(f" {' '.join(words)} ")) if words else [])
+
+
+def _duplicate_signals_(frame, entity):
+    # Tabelas longas (id, value) de cada sinal e as chaves de bloqueio de cada registro.
+    frame = frame.reset_index(drop=True)
+    ids = pd.to_numeric(frame['id'], errors='coerce')
+    frame, ids = frame[ids.notna()].reset_index(drop=True), ids[ids.notna()].astype('int64').reset_index(drop=True)
+
+    tokens = _name_tokens_(frame['name'] if 'name' in frame.columns else pd.Series('', index=frame.index), entity)
+    signals = {'name': _long_table_(ids, _gram_lists_(tokens))}
+    blocks = [
+        _long_table_(ids, tokens.map(lambda words: ['n:' + ' '.join(sorted(words))] if words else [])),
+        _long_table_(ids, tokens.map(lambda words: ['t:' + w for w in words if len(w) >= 3])),
+    ]
+
+    if entity == 'person':
+        emails = _contact_values_(frame, 'email').map(lambda values: [v.strip().casefold() for v in values])
+        phones = _contact_values_(frame, 'phone').map(
+            lambda values: [d[-8:] for d in (re.sub(r'\D', '', v) for v in values) if len(d) >= 6])
+        domains = [[f'd:{e.rsplit("@", 1)[-1]}|{words[0]}' for e in values if '@' in e] if words else []
+                   for values, words in zip(emails, tokens)]
+
+        signals['email'] = _long_table_(ids, emails)
+        signals['phone'] = _long_table_(ids, phones)
+        blocks += [
+            _long_table_(ids, emails.map(lambda values: ['e:' + v for v in values])),
+            _long_table_(ids, phones.map(lambda values: ['p:' + v for v in values])),
+            _long_table_(ids, domains),
+        ]
+    else:
+        address = frame['address'] if 'address' in frame.columns else pd.Series('', index=frame.index)
+        signals['address'] = _long_table_(ids, _gram_lists_(_name_tokens_(address, entity)))
+
+    return signals, pd.concat(blocks, ignore_index=True).drop_duplicates()
+
+
+def _shared_counts_(pairs, table):
+    # Quantidade de valores em comum de cada par (interseção) e quantidade de valores de cada lado.
+    left = table.rename(columns={'id': 'id_a'})
+    right = table.rename(columns={'id': 'id_b'})
+    shared = pairs[['id_a', 'id_b']].merge(left, on='id_a').merge(right, on=['id_b', 'value'])
+    shared = shared.groupby(['id_a', 'id_b']).size()
+
+    index = pd.MultiIndex.from_frame(pairs[['id_a', 'id_b']])
+    sizes = table.groupby('id').size()
+
+    return (shared.reindex(index, fill_value=0).to_numpy(),
+            sizes.reindex(pairs['id_a'], fill_value=0).to_numpy(),
+            sizes.reindex(pairs['id_b'], fill_value=0).to_numpy())
+
+
+def find_duplicates(frame, entity='person', threshold=0.8, max_block_size=1000):
+    """
+    Encontra pares de pessoas ou organizações provavelmente duplicadas, sem comparar todos contra todos.
+
+    Os registros são agrupados por chaves de bloqueio (e-mail, telefone, domínio do e-mail + primeiro nome,
+    nome completo e cada palavra do nome) e só são comparados os pares que dividem um bloco. Blocos maiores
+    que max_block_size (palavras muito comuns) são ignorados. A pontuação é calculada em bloco para todos os
+    pares: similaridade de trigramas do nome (e do endereço, para organizações) e coincidência de e-mail e
+    telefone, ponderadas por _DUPLICATE_WEIGHTS.
+
+    Parâmetros:
+    - frame (pd.DataFrame): Resultado de persons_get_all ou organizations_get_all (achatado ou não).
+    - entity (str, opcional): 'person' ou 'organization'. Padrão é 'person'.
+    - threshold (float, opcional): Pontuação mínima de 0 a 1. Padrão é 0.8.
+    - max_block_size (int, opcional): Tamanho máximo de um bloco. Padrão é 1000.
+
+    Retorna:
+    - pd.DataFrame: Pares (id_a < id_b) com a pontuação total e a de cada sinal, do mais para o menos provável.
+
+    Exemplo de uso:
+    --------------
+    pairs = find_duplicates(persons_get_all(api_token=api_token, company_domain=company_domain))
+    """
+    if entity not in _DUPLICATE_WEIGHTS:
+        raise ValueError(f"Entidade inválida: {entity}. Opções: {list(_DUPLICATE_WEIGHTS)}")
+
+    weights = _DUPLICATE_WEIGHTS[entity]
+    columns = ['id_a', 'id_b', 'score'] + [f'{signal}_score' for signal in weights]
+
+    if frame is None or frame.empty or 'id' not in frame.columns:
+        return pd.DataFrame(columns=columns)
+
+    signals, blocks = _duplicate_signals_(frame, entity)
+
+    sizes = blocks.groupby('value')['id'].transform('size')
+    blocks = blocks[(sizes > 1) & (sizes <= max_block_size)]
+    pairs = blocks.merge(blocks, on='value', suffixes=('_a', '_b'))
+    pairs = pairs.loc[pairs['id_a'] < pairs['id_b'], ['id_a', 'id_b']].drop_duplicates().reset_index(drop=True)
+
+    if pairs.empty:
+        return pd.DataFrame(columns=columns)
+
+    total = np.zeros(len(pairs))
+    weight = np.zeros(len(pairs))
+
+    for signal, signal_weight in weights.items():
+        shared, size_a, size_b = _shared_counts_(pairs, signals[signal])
+        present = (size_a > 0) & (size_b > 0)
+
+        if signal in ('name', 'address'):
+            union = np.maximum(size_a + size_b - shared, 1)
+            score = shared / union
+        else:
+            score = (shared > 0).astype(float)
+
+        pairs[f'{signal}_score'] = np.where(present, score, np.nan)
+        total += np.where(present, score * signal_weight, 0.0)
+        weight += np.where(present, signal_weight, 0.0)
+
+    pairs['score'] = np.divide(total, weight, out=np.zeros(len(pairs)), where=weight > 0)
+    pairs = pairs[pairs['score'] >= threshold]
+
+    return pairs[columns].sort_values(['score', 'id_a', 'id_b'], ascending=[False, True, True]).reset_index(drop=True)
+
+
+def merge_plan(pairs, threshold=None):
+    """
+    Monta o plano de mesclagem (id -> merge_with_id) a partir de pares duplicados, agrupando-os em clusters.
+
+    Com pares de find_duplicates (id_a, id_b), cada cluster é mesclado no registro mais antigo (menor id). Como
+    uma mesclagem não pode ser desfeita, o cluster é de ligação completa: um membro só entra no plano se tiver um
+    par direto com o sobrevivente (com score >= threshold, quando informado). Membros ligados apenas por outros
+    (1-3 e 3-5, sem 1-5) ficam de fora, marcados com excluded=True e o motivo em reason.
+    Com um plano próprio (id, merge_with_id), as cadeias são resolvidas (a -> b e b -> c viram a -> c e b -> c),
+    então nenhum registro é mesclado em um id que também será mesclado.
+
+    Parâmetros:
+    - pairs (pd.DataFrame): Pares (id_a, id_b) ou plano (id, merge_with_id).
+    - threshold (float, opcional): Pontuação mínima, quando pairs tem a coluna score.
+
+    Retorna:
+    - pd.DataFrame: Colunas id, merge_with_id, excluded e reason, ordenado por merge_with_id.
+    """
+    if threshold is not None and 'score' in pairs.columns:
+        pairs = pairs[pairs['score'] >= threshold]
+
+    explicit = {'id', 'merge_with_id'} <= set(pairs.columns)
+    if explicit:
+        edges = [(int(a), int(b)) for a, b in zip(pairs['id'], pairs['merge_with_id'])]
+    else:
+        edges = [(max(int(a), int(b)), min(int(a), int(b))) for a, b in zip(pairs['id_a'], pairs['id_b'])]
+
+    parent = {}
+
+    def find(item):
+        root = item
+        while parent.get(root, root) != root:
+            root = parent[root]
+        while item != root:
+            parent[item], item = root, parent[item]
+        return root
+
+    for source, target in edges:
+        source, target = find(source), find(target)
+        if source != target:
+            # Plano próprio: respeita o destino informado. Pares: a raiz é sempre o menor id do cluster.
+            if explicit:
+                parent[source] = target
+            else:
+                parent[max(source, target)] = min(source, target)
+
+    plan = pd.DataFrame([(item, find(item)) for item in parent], columns=['id', 'merge_with_id'])
+    plan = plan[plan['id'] != plan['merge_with_id']]
+    plan['excluded'] = False
+    plan['reason'] = None
+
+    if not explicit and not plan.empty:
+        direct = {(a, b) for a, b in edges}
+        linked = [(item, target) in direct for item, target in zip(plan['id'], plan['merge_with_id'])]
+        plan['excluded'] = ~np.array(linked, dtype=bool)
+        plan.loc[plan['excluded'], 'reason'] = 'sem par direto com o sobrevivente acima do threshold'
+
+    return plan.sort_values(['merge_with_id', 'id']).reset_index(drop=True)
+
+
+def merge_duplicates(pairs, entity='person', threshold=None, max_workers=8, api_token=None, company_domain='api'):
+    """
+    Executa a mesclagem de duplicados (persons_update_merge / organizations_update_merge) em paralelo.
+
+    O plano vem de merge_plan, então cada registro é mesclado diretamente no sobrevivente do seu cluster e
+    nunca em um id já mesclado. As mesclagens no mesmo sobrevivente rodam em sequência (uma depende do resultado
+    da anterior) e clusters diferentes rodam em paralelo, sob o limitador de taxa do tenant.
+
+    Parâmetros:
+    - pairs (pd.DataFrame): Resultado de find_duplicates ou um plano (id, merge_with_id).
+    - entity (str, opcional): 'person' ou 'organization'. Padrão é 'person'.
+    - threshold (float, opcional): Pontuação mínima dos pares a mesclar.
+    - max_workers (int, opcional): Clusters mesclados simultaneamente. Padrão é 8.
+    - api_token (str): Token da API para validação.
+    - company_domain (str): Domínio da empresa no Pipedrive.
+
+    Retorna:
+    - pd.DataFrame: O plano com as colunas success e error de cada mesclagem.
+    """
+    if entity not in _DUPLICATE_WEIGHTS:
+        raise ValueError(f"Entidade inválida: {entity}. Opções: {list(_DUPLICATE_WEIGHTS)}")
+
+    api_token = check_api_token(api_token)
+    merge = _resolve_function('persons_update_merge' if entity == 'person' else 'organizations_update_merge')
+    plan = merge_plan(pairs, threshold)
+
+    def merge_cluster(cluster):
+        target, ids = cluster
+        results = []
+        for item_id in ids:
+            try:
+                _response_data_(merge(item_id, target, api_token=api_token, company_domain=company_domain))
+                results.append((True, None))
+            except (ValueError, requests.exceptions.RequestException) as e:
+                results.append((False, str(e)))
+        return results
+
+    included = plan[~plan['excluded']]
+    clusters = [(int(target), group['id'].tolist()) for target, group in included.groupby('merge_with_id', sort=False)]
+
+    with _tenant_scope_(api_token, company_domain):
+        results = _map_concurrent_(merge_cluster, clusters, max_workers)
+
+    # Membros fora do plano (sem ligação direta com o sobrevivente) não são mesclados.
+    outcome = [result for cluster in results for result in cluster]
+    plan['success'] = False
+    plan['error'] = plan['reason']
+    plan.loc[included.index, 'success'] = [success for success, _ in outcome]
+    plan.loc[included.index, 'error'] = [error for _, error in outcome]
+
+    return plan
+
+
+# HISTÓRICO DE ALTERAÇÕES
+class FlowChangeLog:
+    """
+    Log colunar das alterações de campo de negócios, pessoas e organizações (deals_get_flow, persons_get_flow e
+    organizations_get_flow), com colunas tipadas: entity, id, field, old_value, new_value, timestamp e user_id.
+
+    Os históricos são baixados em paralelo (com o limitador de taxa do tenant) e decodificados de uma vez só; os
+    demais itens do flow (atividades, notas, e-mails...) são descartados. refresh() baixa tudo na primeira vez e,
+    nas seguintes, apenas o histórico dos registros alterados desde a última sincronização (recents_get).
+    O log pode ser salvo e recarregado em Parquet (requer pyarrow) ou SQLite, incluindo o ponto de sincronização.
+
+    Parâmetros:
+    - entities (tuple, opcional): Entidades do log: 'deal', 'person' e/ou 'organization'. Padrão é ('deal',).
+    - api_token (str, opcional): Token da API. Necessário para refresh() e ingest().
+    - company_domain (str, opcional): Domínio da empresa no Pipedrive.
+    - changes (pd.DataFrame, opcional): Log já carregado.
+    - max_workers (int, opcional): Chamadas simultâneas de *_get_flow. Padrão é 8.
+
+    # Exemplo de uso:
+        log = FlowChangeLog(('deal', 'person'), api_token='seu_token_aqui', company_domain='sua_empresa')
+        log.refresh()
+        log.to_parquet('flow.parquet')
+
+        log = FlowChangeLog.from_parquet('flow.parquet', api_token='seu_token_aqui', company_domain='sua_empresa')
+        log.refresh()
+        stats = DealFlowStats(changes=log.stage_changes(), ...)
+    """
+
+    COLUMNS = ['entity', 'id', 'field', 'old_value', 'new_value', 'timestamp', 'user_id']
+
+    # Entidade -> (listagem, histórico).
+    ENTITIES = {
+        'deal': ('deals_get_all', 'deals_get_flow'),
+        'person': ('persons_get_all', 'persons_get_flow'),
+        'organization': ('organizations_get_all', 'organizations_get_flow'),
+    }
+
+    def __init__(self, entities=('deal',), api_token=None, company_domain='api', changes=None, max_workers=8):
+        entities = (entities,) if isinstance(entities, str) else tuple(entities)
+        invalid = [e for e in entities if e not in self.ENTITIES]
+        if invalid:
+            raise ValueError(f"Entidades inválidas: {invalid}. Opções: {list(self.ENTITIES)}")
+
+        self.entities = entities
+        self.api_token = api_token
+        self.company_domain = company_domain
+        self.max_workers = max_workers
+        self.changes = self.typed(changes if changes is not None else pd.DataFrame(columns=self.COLUMNS))
+        self.synced_at = {}
+
+    def __len__(self):
+        return len(self.changes)
+
+    @classmethod
+    def typed(cls, frame):
+        """
+        Converte um DataFrame com as colunas do log para os tipos do log.
+        """
+        frame = frame.reindex(columns=cls.COLUMNS)
+
+        return pd.DataFrame({
+            'entity': frame['entity'].astype('category'),
+            'id': pd.to_numeric(frame['id'], errors='coerce').astype('Int64'),
+            'field': frame['field'].astype('category'),
+            'old_value': frame['old_value'].map(_json_or_str_).astype('string'),
+            'new_value': frame['new_value'].map(_json_or_str_).astype('string'),
+            'timestamp': pd.to_datetime(frame['timestamp'], errors='coerce', format='ISO8601'),
+            'user_id': pd.to_numeric(frame['user_id'], errors='coerce').astype('Int64'),
+        }).reset_index(drop=True)
+
+    @classmethod
+    def decode(cls, entity, flow):
+        """
+        Decodifica o retorno (ou a concatenação dos retornos) de um *_get_flow nas linhas do log.
+        """
+        changes = _flow_changes_(flow)
+
+        return cls.typed(pd.DataFrame({
+            'entity': entity,
+            'id': changes['item_id'],
+            'field': changes['field_key'],
+            'old_value': changes['old_value'],
+            'new_value': changes['new_value'],
+            'timestamp': changes['log_time'],
+            'user_id': changes['user_id'],
+        }))
+
+    def ingest(self, entity, ids):
+        """
+        Baixa (em paralelo) o histórico dos ids informados e substitui as linhas desses registros no log.
+
+        Parâmetros:
+        - entity (str): 'deal', 'person' ou 'organization'.
+        - ids (list): IDs dos registros.
+
+        Retorna:
+        int: Quantidade de alterações carregadas.
+        """
+        api_token = check_api_token(self.api_token)
+        ids = list(dict.fromkeys(int(i) for i in ids))
+        get_flow = _resolve_function(self.ENTITIES[entity][1])
+
+        with _tenant_scope_(api_token, self.company_domain):
+            flows = _map_concurrent_(
+                lambda item_id: get_flow(item_id, api_token=api_token, company_domain=self.company_domain),
+                ids, self.max_workers)
+
+        flows = [flow for flow in flows if flow is not None and not flow.empty]
+        changes = self.decode(entity, pd.concat(flows, ignore_index=True) if flows else None)
+
+        keep = ~((self.changes['entity'] == entity) & self.changes['id'].isin(ids)).to_numpy()
+        merged = pd.concat([self.changes[keep].astype(object), changes.astype(object)], ignore_index=True)
+        self.changes = self.typed(merged).sort_values(['entity', 'id', 'timestamp'], kind='stable').reset_index(drop=True)
+
+        return len(changes)
+
+    def refresh(self):
+        """
+        Sincroniza o log. Na primeira chamada de cada entidade baixa o histórico de todos os registros; nas
+        seguintes, apenas dos registros alterados desde a última sincronização.
+
+        Retorna:
+        int: Quantidade de registros cujo histórico foi (re)carregado.
+        """
+        api_token = check_api_token(self.api_token)
+        count = 0
+
+        for entity in self.entities:
+            started = _utc_timestamp_()
+            since = self.synced_at.get(entity)
+
+            if since is None:
+                kwargs = {'status': 'all_not_deleted'} if entity == 'deal' else {}
+                items = _resolve_function(self.ENTITIES[entity][0])(
+                    api_token=api_token, company_domain=self.company_domain, **kwargs)
+            else:
+                recents = recents_get(since, items=entity, api_token=api_token, company_domain=self.company_domain)
+                if {'item', 'data'} <= set(recents.columns):
+                    items = _dict_frame_(recents.loc[recents['item'] == entity, 'data']).reset_index(drop=True)
+                else:
+                    items = pd.DataFrame()
+
+            ids = pd.to_numeric(items['id'], errors='coerce').dropna().astype(int) if 'id' in items.columns else []
+            if len(ids):
+                self.ingest(entity, ids)
+
+            self.synced_at[entity] = started
+            count += len(ids)
+
+        return count
+
+    def stage_changes(self):
+        """
+        Alterações de etapa dos negócios no formato de DealFlowStats.changes (deal_id, time, user_id, old_stage,
+        new_stage), para calcular as estatísticas de pipeline sem baixar o histórico de novo.
+        """
+        changes = self.changes[(self.changes['entity'] == 'deal') & (self.changes['field'] == 'stage_id')]
+
+        return pd.DataFrame({
+            'deal_id': changes['id'],
+            'time': changes['timestamp'],
+            'user_id': changes['user_id'],
+            'old_stage': pd.to_numeric(changes['old_value'], errors='coerce').astype('Int64'),
+            'new_stage': pd.to_numeric(changes['new_value'], errors='coerce').astype('Int64'),
+        }).reset_index(drop=True)
+
+    def to_parquet(self, path, compression='snappy'):
+        """
+        Salva o log (e o ponto de sincronização de cada entidade) em um arquivo Parquet. Requer pyarrow.
+        """
+        pa = _import_pyarrow_()
+        table = pa.Table.from_pandas(self.changes, preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata[b'pypipedrive.synced_at'] = json.dumps(self.synced_at).encode()
+        table = table.replace_schema_metadata(metadata)
+
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.flow-', suffix='.parquet.tmp')
+        os.close(fd)
+
+        try:
+            pa.parquet.write_table(table, tmp_path, compression=compression)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def from_parquet(cls, path, entities=None, api_token=None, company_domain='api', max_workers=8):
+        """
+        Carrega um log salvo com to_parquet, pronto para refresh() incremental. Requer pyarrow.
+        """
+        pa = _import_pyarrow_()
+        table = pa.parquet.read_table(path)
+        synced_at = json.loads((table.schema.metadata or {}).get(b'pypipedrive.synced_at', b'{}'))
+
+        log = cls(entities or tuple(synced_at) or ('deal',), api_token, company_domain, table.to_pandas(), max_workers)
+        log.synced_at = synced_at
+        return log
+
+    def to_sqlite(self, path, table='flow_changes'):
+        """
+        Salva o log em um banco SQLite (tabela <table> e o ponto de sincronização em <table>_sync).
+        """
+        changes = self.changes.astype({'entity': 'string', 'field': 'string'})
+        changes['timestamp'] = changes['timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S')
+        sync = pd.DataFrame(list(self.synced_at.items()), columns=['entity', 'synced_at'])
+
+        with contextlib.closing(sqlite3.connect(path)) as connection, connection:
+            changes.to_sql(table, connection, if_exists='replace', index=False)
+            sync.to_sql(f'{table}_sync', connection, if_exists='replace', index=False)
+
+    @classmethod
+    def from_sqlite(cls, path, table='flow_changes', entities=None, api_token=None, company_domain='api', max_workers=8):
+        """
+        Carrega um log salvo com to_sqlite, pronto para refresh() incremental.
+        """
+        with contextlib.closing(sqlite3.connect(path)) as connection:
+            changes = pd.read_sql(f'SELECT * FROM "{table}"', connection)
+            sync = pd.read_sql(f'SELECT * FROM "{table}_sync"', connection)
+
+        synced_at = dict(zip(sync['entity'], sync['synced_at']))
+        log = cls(entities or tuple(synced_at) or ('deal',), api_token, company_domain, changes, max_workers)
+        log.synced_at = synced_at
+        return log
+
+
+# SINCRONIZAÇÃO DE E-MAILS
+def _signatures_(frame, columns=None, key='id'):
+    # Assinatura (texto) de cada linha de um DataFrame, para detectar registros alterados entre sincronizações.
+    if frame is None or frame.empty or key not in frame.columns:
+        return {}
+
+    values = frame[columns] if columns else frame
+    values = values.map(_json_or_str_).fillna('').astype(str).agg('|'.join, axis=1)
+    return dict(zip(frame[key], values))
+
+
+class MailboxSync:
+    """
+    Sincronização incremental da caixa de e-mails (mailthreads_get_all, mailthreads_get_mailmessages e
+    mailmessages_get).
+
+    As pastas são paginadas em paralelo e cada thread guarda uma assinatura (hora de atualização, contagem de
+    mensagens e flags). Como a API devolve as threads da mais recente para a mais antiga, a paginação de uma pasta
+    para na primeira página sem nenhuma thread alterada; só as threads novas ou alteradas têm as mensagens
+    (metadados, sem corpo) buscadas de novo, também em paralelo. Os corpos são carregados sob demanda por body()
+    e ficam em um cache LRU limitado.
+
+    Parâmetros:
+    - api_token (str): Token da API necessário para validar as solicitações.
+    - company_domain (str): Domínio da empresa no Pipedrive.
+    - folders (tuple, opcional): Pastas sincronizadas. Padrão: inbox, drafts, sent e archive.
+    - max_workers (int, opcional): Chamadas simultâneas. Padrão é 8.
+    - page_size (int, opcional): Threads por página. Padrão é 50 (o máximo da API).
+    - body_cache_size (int, opcional): Quantidade de corpos de mensagem mantidos em memória. Padrão é 256.
+
+    # Exemplo de uso:
+        mailbox = MailboxSync(api_token='seu_token_aqui', company_domain='sua_empresa')
+        changed = mailbox.sync()
+        mailbox.messages[mailbox.messages['mail_thread_id'].isin(changed['id'])]
+        mailbox.body(message_id)
+    """
+
+    FOLDERS = ('inbox', 'drafts', 'sent', 'archive')
+
+    # Colunas da thread que mudam quando ela recebe mensagens ou é alterada.
+    SIGNATURE_COLUMNS = ('update_time', 'last_message_timestamp', 'message_count', 'read_flag', 'archived_flag',
+                         'deleted_flag', 'deal_id', 'shared_flag')
+
+    def __init__(self, api_token=None, company_domain='api', folders=FOLDERS, max_workers=8, page_size=50,
+                 body_cache_size=256):
+        self.api_token = api_token
+        self.company_domain = company_domain
+        self.folders = tuple(folders)
+        self.max_workers = max_workers
+        self.page_size = page_size
+        self.body_cache_size = body_cache_size
+        self.threads = pd.DataFrame(columns=['id', 'folder'])
+        self.messages = pd.DataFrame(columns=['id', 'mail_thread_id'])
+        self.synced_at = None
+        self._signatures = {}
+        self._bodies = collections.OrderedDict()
+        self._bodies_lock = threading.Lock()
+
+    def _signature(self, threads):
+        return _signatures_(threads, [c for c in self.SIGNATURE_COLUMNS if c in threads.columns])
+
+    def _sync_folder(self, folder, full):
+        # Pagina a pasta até o fim (full) ou até uma página sem threads alteradas.
+        api_token = check_api_token(self.api_token)
+        pages = []
+        start = 0
+
+        while True:
+            page = mailthreads_get_all(folder, start=start, limit=self.page_size, api_token=api_token,
+                                       company_domain=self.company_domain)
+            if page is None or page.empty or 'id' not in page.columns:
+                break
+
+            pages.append(page)
+            signatures = self._signature(page)
+            unchanged = all(self._signatures.get(i) == s for i, s in signatures.items())
+
+            if len(page) < self.page_size or (unchanged and not full):
+                break
+            start += len(page)
+
+        threads = pd.concat(pages, ignore_index=True) if pages else pd.DataFrame(columns=['id'])
+        threads['folder'] = folder
+        return threads
+
+    def sync(self, full=False):
+        """
+        Sincroniza as pastas e as mensagens das threads novas ou alteradas.
+
+        Parâmetros:
+        - full (bool, opcional): Pagina as pastas inteiras, o que também remove as threads que saíram da pasta
+          (excluídas). A primeira sincronização é sempre completa.
+
+        Retorna:
+        pd.DataFrame: As threads novas ou alteradas (id e folder).
+        """
+        api_token = check_api_token(self.api_token)
+        full = full or self.synced_at is None
+        started = _utc_timestamp_()
+
+        with _tenant_scope_(api_token, self.company_domain):
+            folders = _map_concurrent_(lambda folder: self._sync_folder(folder, full), self.folders, self.max_workers)
+            seen = pd.concat(folders, ignore_index=True)
+            seen = seen[seen['id'].notna()].drop_duplicates('id', keep='first')
+            seen['id'] = pd.to_numeric(seen['id']).astype(int)
+
+            signatures = self._signature(seen) if not seen.empty else {}
+            changed = [i for i, s in signatures.items() if self._signatures.get(i) != s]
+
+            messages = _map_concurrent_(
+                lambda thread_id: mailthreads_get_mailmessages(thread_id, api_token=api_token,
+                                                               company_domain=self.company_domain),
+                changed, self.max_workers)
+
+        if full:
+            threads = seen
+            removed = set(self._signatures) - set(signatures)
+        else:
+            keep = ~pd.to_numeric(self.threads['id']).isin(seen['id'])
+            threads = pd.concat([self.threads[keep], seen], ignore_index=True)
+            removed = set()
+
+        messages = [m.assign(mail_thread_id=thread_id) for thread_id, m in zip(changed, messages)
+                    if m is not None and not m.empty]
+        replaced = set(changed) | removed
+        keep = ~pd.to_numeric(self.messages['mail_thread_id']).isin(replaced)
+        self.messages = pd.concat([self.messages[keep]] + messages, ignore_index=True)
+
+        self.threads = threads.reset_index(drop=True)
+        for thread_id in removed:
+            self._signatures.pop(thread_id, None)
+        self._signatures.update(signatures)
+        self.synced_at = started
+
+        return seen.loc[seen['id'].isin(changed), ['id', 'folder']].reset_index(drop=True)
+
+    def body(self, message_id):
+        """
+        Corpo de uma mensagem, buscado com mailmessages_get(include_body=1) na primeira vez e depois servido do
+        cache (LRU, com até body_cache_size mensagens).
+
+        Retorna:
+        str: O corpo da mensagem (ou None, quando a API não devolve corpo).
+        """
+        message_id = int(message_id)
+
+        with self._bodies_lock:
+            if message_id in self._bodies:
+                self._bodies.move_to_end(message_id)
+                return self._bodies[message_id]
+
+        message = mailmessages_get(message_id, include_body=1, api_token=check_api_token(self.api_token),
+                                   company_domain=self.company_domain)
+        body = message['body'].iat[0] if 'body' in message.columns and not message.empty else None
+
+        with self._bodies_lock:
+            self._bodies[message_id] = body
+            self._bodies.move_to_end(message_id)
+            while len(self._bodies) > self.body_cache_size:
+                self._bodies.popitem(last=False)
+
+        return body
+
+
+# BUSCA POR JANELAS DE DATA
+# Tamanho da página de sondagem (o máximo da API); a sondagem baixa só a primeira página (single_page_).
+_WINDOW_PROBE_LIMIT = 500
+
+
+@contextlib.contextmanager
+def single_page_():
+    """
+    Dentro do bloco, as funções de listagem baixam apenas a primeira página (uma requisição), sem paginar.
+
+    # Exemplo de uso:
+        with single_page_():
+            primeira_pagina = activities_get_all(limit=500, api_token='seu_token_aqui')
+    """
+    token = _paginate.set(False)
+    try:
+        yield
+    finally:
+        _paginate.reset(token)
+
+
+def _split_window_(window, parts):
+    # Divide [início, fim] (datas inclusivas) em até parts janelas contíguas, sem sobreposição.
+    start, end = window
+    days = (end - start).days + 1
+    parts = max(1, min(parts, days))
+    bounds = [start + datetime.timedelta(days=days * k // parts) for k in range(parts + 1)]
+    return [(bounds[k], bounds[k + 1] - datetime.timedelta(days=1)) for k in range(parts)]
+
+
+def fetch_windowed(func, start_date, end_date, min_days=1, max_workers=8, api_token=None, company_domain='api', **kwargs):
+    """
+    Busca em paralelo, por janelas de data, de funções com start_date/end_date (activities_get_all, notes_get_all).
+
+    O período é dividido em max_workers janelas, e cada janela é sondada com uma única página. Janelas que cabem
+    em uma página já estão completas e custam uma requisição; janelas cheias (períodos densos) são divididas ao
+    meio e sondadas de novo, até min_days, quando são baixadas com paginação completa. As janelas só são
+    estreitadas: janelas esparsas vizinhas não são unidas, já que cada uma já foi resolvida na sondagem.
+    As janelas de cada rodada rodam em paralelo, sob o limitador de taxa do tenant, e o resultado é montado na
+    ordem das datas, sem registros repetidos nas bordas das janelas (pelo id).
+
+    Parâmetros:
+    - func (str ou function): Função de listagem, ex: 'activities_get_all' ou notes_get_all.
+    - start_date (str): Data inicial (YYYY-MM-DD).
+    - end_date (str): Data final (YYYY-MM-DD), inclusiva.
+    - min_days (int, opcional): Tamanho mínimo de uma janela, em dias. Padrão é 1.
+    - max_workers (int, opcional): Janelas buscadas simultaneamente. Padrão é 8.
+    - api_token (str): Token da API necessário para validar as solicitações.
+    - company_domain (str): Domínio da empresa no Pipedrive.
+    - **kwargs: Demais parâmetros da função (ex: user_id=0, done=1).
+
+    Retorna:
+    pd.DataFrame: Os registros do período, como na chamada direta da função.
+
+    Exemplo de uso:
+    fetch_windowed('activities_get_all', '2020-01-01', '2024-12-31', user_id=0, api_token='seu_token_aqui', company_domain='sua_empresa')
+    """
+    api_token = check_api_token(api_token)
+    func = _resolve_function(func) if isinstance(func, str) else func
+    start, end = pd.Timestamp(start_date).date(), pd.Timestamp(end_date).date()
+
+    if end < start:
+        raise ValueError("O parâmetro 'end_date' deve ser igual ou posterior a 'start_date'.")
+
+    def fetch(window, limit):
+        return func(start_date=window[0].isoformat(), end_date=window[1].isoformat(), limit=limit,
+                    api_token=api_token, company_domain=company_domain, **kwargs)
+
+    def probe(window):
+        if (window[1] - window[0]).days + 1 <= min_days:
+            return fetch(window, None), False
+
+        with single_page_():
+            frame = fetch(window, _WINDOW_PROBE_LIMIT)
+        return frame, len(frame) >= _WINDOW_PROBE_LIMIT
+
+    windows = _split_window_((start, end), max_workers)
+    results = {}
+
+    with _tenant_scope_(api_token, company_domain):
+        while windows:
+            probes = _map_concurrent_(probe, windows, max_workers)
+            dense = []
+
+            for window, (frame, full) in zip(windows, probes):
+                if full:
+                    dense.extend(_split_window_(window, 2))
+                else:
+                    results[window] = frame
+
+            windows = dense
+
+    frames = [results[window] for window in sorted(results) if results[window] is not None and not results[window].empty]
+    if not frames:
+        return pd.DataFrame()
+
+    result = _concat_pages_(frames)
+    if 'id' in result.columns:
+        result = result.drop_duplicates('id', keep='first')
+
+    return result.reset_index(drop=True)
+
+
+# FILTROS A PARTIR DE PREDICADOS
+# Entidade -> (tipo do filtro, object das condições).
+_FILTER_TYPES = {
+    'deals': ('deals', 'deal'),
+    'persons': ('people', 'person'),
+    'organizations': ('org', 'organization'),
+    'products': ('products', 'product'),
+    'activities': ('activity', 'activity'),
+}
+
+# Prefixo do nome dos filtros temporários criados por filter_query.
+_TEMPORARY_FILTER_PREFIX = 'pypipedrive:'
+
+_temporary_filters = {}
+_temporary_filters_lock = threading.Lock()
+
+
+class Condition:
+    """
+    Predicado sobre campos, combinável com & (E) e | (OU). Criado a partir de Field.
+    """
+
+    def __init__(self, glue, children=(), key=None, operator=None, value=None):
+        self.glue = glue
+        self.children = tuple(children)
+        self.key = key
+        self.operator = operator
+        self.value = value
+
+    def __and__(self, other):
+        return Condition('and', (self, other))
+
+    def __or__(self, other):
+        return Condition('or', (self, other))
+
+    def __repr__(self):
+        if self.glue is None:
+            return f'Condition({self.key!r} {self.operator} {self.value!r})'
+        return f' {self.glue.upper()} '.join(f'({child!r})' for child in self.children)
+
+
+class Field:
+    """
+    Campo de um predicado de filter_query, pela chave (key) ou pelo nome exibido.
+
+    # Exemplo de uso:
+        (Field('status') == 'open') & (Field('value') >= 1000) & Field('add_time').between('2024-01-01', '2024-03-31')
+        (Field('pipeline_id') == 1) & ((Field('stage_id') == 3) | (Field('stage_id') == 4))
+    """
+
+    def __init__(self, key):
+        self.key = key
+
+    def _condition(self, operator, value=None):
+        return Condition(None, key=self.key, operator=operator, value=value)
+
+    def __eq__(self, value):
+        return self._condition('=', value)
+
+    def __ne__(self, value):
+        return self._condition('!=', value)
+
+    def __lt__(self, value):
+        return self._condition('<', value)
+
+    def __le__(self, value):
+        return self._condition('<=', value)
+
+    def __gt__(self, value):
+        return self._condition('>', value)
+
+    def __ge__(self, value):
+        return self._condition('>=', value)
+
+    __hash__ = object.__hash__
+
+    def between(self, start, end):
+        return (self >= start) & (self <= end)
+
+    def isin(self, values):
+        values = list(values)
+        if not values:
+            raise ValueError("isin requer ao menos um valor.")
+        return functools.reduce(lambda a, b: a | b, (self == value for value in values))
+
+    def isnull(self):
+        return self._condition('IS NULL')
+
+    def notnull(self):
+        return self._condition('IS NOT NULL')
+
+    def contains(self, text):
+        return self._condition("LIKE '%$%'", text)
+
+    def not_contains(self, text):
+        return self._condition("NOT LIKE '%$%'", text)
+
+    def startswith(self, text):
+        return self._condition("LIKE '$%'", text)
+
+    def endswith(self, text):
+        return self._condition("LIKE '%$'", text)
+
+
+def _flatten_condition_(condition, glue):
+    # Folhas e subgrupos de uma cadeia de condições com o mesmo conectivo.
+    if condition.glue != glue:
+        return [condition]
+    return [item for child in condition.children for item in _flatten_condition_(child, glue)]
+
+
+def compile_filter(predicate, entity, fields):
+    """
+    Compila um predicado (Field/Condition) nas condições JSON aceitas por filters_add.
+
+    Os filtros do Pipedrive têm um grupo E e um grupo OU de condições simples, então o predicado precisa ter a
+    forma a & b & ... & (x | y | ...): vários termos E e no máximo um grupo OU. Os campos são procurados pela
+    chave ou pelo nome, e valores de campos de opções (enum, status) podem ser passados pelo rótulo.
+
+    Parâmetros:
+    - predicate (Condition): O predicado.
+    - entity (str): 'deals', 'persons', 'organizations', 'products' ou 'activities'.
+    - fields (pd.DataFrame): Metadados dos campos da entidade (ex: dealfields_get_all).
+
+    Retorna:
+    dict: As condições para filters_add.
+    """
+    if entity not in _FILTER_TYPES:
+        raise ValueError(f"Entidade inválida: {entity}. Opções: {list(_FILTER_TYPES)}")
+
+    if not isinstance(predicate, Condition):
+        raise ValueError("O predicado deve ser uma Condition (ex: Field('status') == 'open').")
+
+    object_name = _FILTER_TYPES[entity][1]
+    records = _records_(fields) if fields is not None and not fields.empty else []
+    by_key = {str(f.get('key')): f for f in records}
+    by_name = {str(f.get('name')).casefold(): f for f in records}
+
+    def leaf(condition):
+        if condition.glue is not None:
+            raise ValueError(f"Predicado não suportado pelos filtros do Pipedrive: {predicate!r}. "
+                             "Use a & b & ... & (x | y | ...), com no máximo um grupo OU de condições simples.")
+
+        field = by_key.get(str(condition.key)) or by_name.get(str(condition.key).casefold())
+        if field is None:
+            raise ValueError(f"Campo não encontrado: {condition.key}")
+
+        value = condition.value
+        options = field.get('options')
+        if isinstance(options, list) and value is not None:
+            labels = {str(o.get('label')).casefold(): o.get('id') for o in options if isinstance(o, dict)}
+            value = labels.get(str(value).casefold(), value)
+        if isinstance(value, (datetime.date, pd.Timestamp)):
+            value = value.strftime('%Y-%m-%d')
+
+        return {'object': object_name, 'field_id': str(field['id']), 'operator': condition.operator,
+                'value': value, 'extra_value': None}
+
+    terms = _flatten_condition_(predicate, 'and')
+    groups = [term for term in terms if term.glue == 'or']
+
+    if len(groups) > 1:
+        raise ValueError(f"Predicado não suportado pelos filtros do Pipedrive: {predicate!r}. "
+                         "Use a & b & ... & (x | y | ...), com no máximo um grupo OU de condições simples.")
+
+    and_group = [leaf(term) for term in terms if term.glue != 'or']
+    or_group = [leaf(term) for group in groups for term in _flatten_condition_(group, 'or')]
+
+    return {'glue': 'and', 'conditions': [
+        {'glue': 'and', 'conditions': and_group},
+        {'glue': 'or', 'conditions': or_group},
+    ]}
+
+
+def filter_query(func, predicate, api_token=None, company_domain='api', **kwargs):
+    """
+    Executa uma listagem (ex: deals_get_all) filtrada no servidor por um predicado, baixando só o que interessa.
+
+    O predicado é compilado em um filtro (filters_add) e a listagem roda com filter_id. O id do filtro fica em
+    cache pelo hash das condições, então o mesmo predicado reaproveita o filtro nas chamadas seguintes. Os
+    filtros temporários têm o nome começando com 'pypipedrive:' e são removidos por collect_temporary_filters.
+
+    Parâmetros:
+    - func (str ou function): Listagem com filter_id: deals_get_all, persons_get_all, organizations_get_all,
+      products_get_all ou activities_get_all.
+    - predicate (Condition): O predicado (ver Field e compile_filter).
+    - api_token (str): Token da API necessário para validar as solicitações.
+    - company_domain (str): Domínio da empresa no Pipedrive.
+    - **kwargs: Demais parâmetros da listagem.
+
+    Retorna:
+    pd.DataFrame: O resultado da listagem filtrada.
+
+    Exemplo de uso:
+    filter_query('deals_get_all', (Field('status') == 'open') & (Field('value') > 10000), api_token='seu_token_aqui', company_domain='sua_empresa')
+    """
+    api_token = check_api_token(api_token)
+    func = _resolve_function(func) if isinstance(func, str) else func
+    entity = _entity_of_(func.__name__)
+
+    if entity not in _FILTER_TYPES or 'filter_id' not in inspect.signature(func).parameters:
+        raise ValueError(f"A função {func.__name__} não aceita filter_id.")
+
+    filter_type = _FILTER_TYPES[entity][0]
+    conditions = compile_filter(predicate, entity, _fields_(entity, api_token, company_domain))
+    digest = hashlib.sha1(json.dumps([filter_type, conditions], sort_keys=True, default=str).encode()).hexdigest()
+    key = (company_domain, api_token, digest)
+
+    with _temporary_filters_lock:
+        filter_id = _temporary_filters.get(key)
+
+        if filter_id is None:
+            data = _response_data_(filters_add(f'{_TEMPORARY_FILTER_PREFIX}{digest[:16]}', conditions, filter_type,
+                                               api_token=api_token, company_domain=company_domain))
+            filter_id = _temporary_filters[key] = int(data['id'])
+
+    return func(filter_id=filter_id, api_token=api_token, company_domain=company_domain, **kwargs)
+
+
+def collect_temporary_filters(api_token=None, company_domain='api'):
+    """
+    Remove (filters_delete_multiple) os filtros temporários criados por filter_query, inclusive os que
+    sobraram de execuções anteriores, e limpa o cache de ids.
+
+    Parâmetros:
+    - api_token (str): Token da API necessário para validar as solicitações.
+    - company_domain (str): Domínio da empresa no Pipedrive.
+
+    Retorna:
+    list: IDs dos filtros removidos.
+    """
+    api_token = check_api_token(api_token)
+    filters = filters_get_all(api_token=api_token, company_domain=company_domain)
+
+    with _temporary_filters_lock:
+        ids = []
+        if not filters.empty and {'id', 'name'} <= set(filters.columns):
+            temporary = filters['name'].astype(str).str.startswith(_TEMPORARY_FILTER_PREFIX)
+            ids = sorted(int(i) for i in filters.loc[temporary, 'id'])
+
+        if ids:
+            _response_data_(filters_delete_multiple(ids, api_token=api_token, company_domain=company_domain))
+
+        for key in [k for k in _temporary_filters if k[0] == company_domain and k[1] == api_token]:
+            del _temporary_filters[key]
+
+    return ids
+
+
+# PERMISSÕES E VISIBILIDADE
+class PermissionModel:
+    """
+    Modelo de permissões e visibilidade pré-calculado, para responder "o usuário U pode ver o item E?" e "quais
+    usuários podem ver estes negócios?" em memória, sem chamar a API a cada renderização.
+
+    O modelo junta usuários (users_get_all), permissões (users_get_permissions), funções e sua hierarquia
+    (roles_get_all, roles_get_roles), atribuições de função (users_get_role_assignments) e conjuntos de
+    permissões (permissionsets_get_all, permissionsets_get_assignments). refresh() recarrega os detalhes apenas
+    dos usuários e conjuntos de permissões que mudaram desde a sincronização anterior.
+
+    A visibilidade de um item segue o visible_to e o dono: administradores veem tudo, o dono vê os seus itens e
+    os usuários em funções superiores à do dono (gestores) veem os itens dos subordinados. O significado de cada
+    valor de visible_to está em VISIBILITY (grupos de visibilidade); contas no modelo antigo (1 = privado,
+    3 = empresa inteira) podem passar visibility={1: 'owner', 3: 'company'}. Para a resposta exata do servidor
+    de um negócio, use permitted_users (deals_get_permittedusers, com cache).
+
+    Parâmetros:
+    - api_token (str): Token da API necessário para validar as solicitações.
+    - company_domain (str): Domínio da empresa no Pipedrive.
+    - visibility (dict, opcional): visible_to -> 'owner', 'group', 'subgroups' ou 'company'.
+    - max_workers (int, opcional): Chamadas simultâneas. Padrão é 8.
+    - cache_ttl (int, opcional): Validade, em segundos, do cache de permitted_users. Padrão é 300.
+
+    # Exemplo de uso:
+        model = PermissionModel(api_token='seu_token_aqui', company_domain='sua_empresa')
+        model.refresh()
+        model.can_see(10, deal)
+        model.visibility_matrix(deals)
+        model.visible_users(deals)
+    """
+
+    VISIBILITY = {1: 'owner', 3: 'group', 5: 'subgroups', 7: 'company'}
+
+    # Coluna do dono de cada tipo de item.
+    OWNER_COLUMNS = {'deal': 'user_id', 'person': 'owner_id', 'organization': 'owner_id', 'product': 'owner_id'}
+
+    def __init__(self, api_token=None, company_domain='api', visibility=None, max_workers=8, cache_ttl=300):
+        self.api_token = api_token
+        self.company_domain = company_domain
+        self.visibility = {int(k): v for k, v in (visibility or self.VISIBILITY).items()}
+        self.max_workers = max_workers
+        self.cache_ttl = cache_ttl
+        self.users = pd.DataFrame(columns=['id', 'name', 'is_admin', 'active_flag', 'role_id'])
+        self.roles = pd.DataFrame(columns=['id', 'parent_role_id', 'name'])
+        self.permissions = pd.DataFrame()
+        self.permission_sets = pd.DataFrame(columns=['permission_set_id', 'user_id', 'name', 'app', 'type'])
+        self._signatures = {'users': {}, 'roles': {}, 'permission_sets': {}}
+        self._assignments = {}
+        self._permitted = {}
+        self._lock = threading.Lock()
+        self._rebuild()
+
+    def refresh(self):
+        """
+        Sincroniza o modelo, recarregando apenas o que mudou.
+
+        Retorna:
+        int: Quantidade de usuários, funções e conjuntos de permissões recarregados.
+        """
+        api_token = check_api_token(self.api_token)
+        domain = self.company_domain
+
+        def data(result):
+            data = _response_data_(result)
+            return pd.DataFrame(_page_records_(data) or [])
+
+        with _tenant_scope_(api_token, domain):
+            users = data(users_get_all(api_token=api_token, company_domain=domain))
+            roles = roles_get_all(api_token=api_token, company_domain=domain)
+            sets = permissionsets_get_all(api_token=api_token, company_domain=domain)
+
+            if not roles.empty and 'parent_role_id' not in roles.columns:
+                children = _map_concurrent_(
+                    lambda role_id: roles_get_roles(role_id, api_token=api_token, company_domain=domain),
+                    roles['id'].tolist(), self.max_workers)
+                parents = {int(c): int(r) for r, frame in zip(roles['id'], children)
+                           if 'id' in frame.columns for c in frame['id']}
+                roles['parent_role_id'] = roles['id'].map(parents)
+
+            changed = {}
+            for name, frame in (('users', users), ('roles', roles), ('permission_sets', sets)):
+                signatures = _signatures_(frame)
+                changed[name] = [i for i, s in signatures.items() if self._signatures[name].get(i) != s]
+                self._signatures[name] = signatures
+
+            user_details = _map_concurrent_(
+                lambda user_id: (data(users_get_permissions(user_id, api_token=api_token, company_domain=domain)),
+                                 data(users_get_role_assignments(user_id, api_token=api_token, company_domain=domain))),
+                changed['users'], self.max_workers)
+            assignments = _map_concurrent_(
+                lambda set_id: permissionsets_get_assignments(set_id, api_token=api_token, company_domain=domain),
+                changed['permission_sets'], self.max_workers)
+
+        permissions = self.permissions[~self.permissions.index.isin(changed['users'])] if not self.permissions.empty else self.permissions
+        rows = [flags.iloc[0].rename(user_id) for user_id, (flags, _) in zip(changed['users'], user_details) if not flags.empty]
+        permissions = pd.concat([permissions, pd.DataFrame(rows)]) if rows else permissions
+        self.permissions = permissions[permissions.index.isin(users['id'])] if 'id' in users.columns else permissions
+
+        for user_id, (_, user_roles) in zip(changed['users'], user_details):
+            active = user_roles[user_roles['active_flag'].fillna(True).astype(bool)] if 'active_flag' in user_roles.columns else user_roles
+            self._assignments[user_id] = int(active['role_id'].iloc[0]) if 'role_id' in active.columns and not active.empty else None
+
+        keep = ~self.permission_sets['permission_set_id'].isin(changed['permission_sets'])
+        frames = [self.permission_sets[keep]]
+        for set_id, frame in zip(changed['permission_sets'], assignments):
+            info = sets.loc[sets['id'] == set_id].iloc[0]
+            if 'user_id' in frame.columns:
+                frames.append(pd.DataFrame({'permission_set_id': set_id, 'user_id': frame['user_id'],
+                                            'name': info.get('name'), 'app': info.get('app'), 'type': info.get('type')}))
+        self.permission_sets = pd.concat(frames, ignore_index=True)
+        if 'id' in sets.columns:
+            self.permission_sets = self.permission_sets[self.permission_sets['permission_set_id'].isin(sets['id'])]
+
+        if 'id' in users.columns:
+            roles_by_user = pd.Series(self._assignments, dtype=object)
+            fallback = users['role_id'] if 'role_id' in users.columns else pd.Series(None, index=users.index)
+            users['role_id'] = pd.to_numeric(users['id'].map(roles_by_user).fillna(fallback), errors='coerce').astype('Int64')
+
+        self.users, self.roles = users, roles
+
+        with self._lock:
+            self._permitted.clear()
+        self._rebuild()
+
+        return sum(len(ids) for ids in changed.values())
+
+    def _rebuild(self):
+        # Matrizes usuário x usuário: quem vê os itens de quem, por nível de visibilidade.
+        users = self.users
+        if 'active_flag' in users.columns:
+            users = users[users['active_flag'].fillna(True).astype(bool)]
+
+        self._user_ids = pd.to_numeric(users['id'], errors='coerce').astype('int64').to_numpy()
+        self._user_index = pd.Series(np.arange(len(self._user_ids)), index=self._user_ids)
+
+        admin = users['is_admin'].fillna(0).astype(bool).to_numpy() if 'is_admin' in users.columns else np.zeros(len(users), bool)
+        sales_admins = self.permission_sets.loc[self.permission_sets['type'].eq('admin') & self.permission_sets['app'].isin(['sales', 'global']), 'user_id']
+        self._admin = admin | np.isin(self._user_ids, pd.to_numeric(sales_admins, errors='coerce'))
+
+        role_ids = pd.to_numeric(self.roles['id'], errors='coerce').dropna().astype('int64').to_numpy() if 'id' in self.roles.columns else np.array([], 'int64')
+        role_index = {r: i for i, r in enumerate(role_ids)}
+        parents = dict(zip(role_ids, pd.to_numeric(self.roles.get('parent_role_id', pd.Series(dtype=float)), errors='coerce')))
+
+        # ancestor[a, b]: a é uma função acima de b na hierarquia.
+        ancestor = np.zeros((len(role_ids), len(role_ids)), bool)
+        for role, i in role_index.items():
+            parent, seen = parents.get(role), set()
+            while pd.notna(parent) and int(parent) in role_index and int(parent) not in seen:
+                seen.add(int(parent))
+                ancestor[role_index[int(parent)], i] = True
+                parent = parents.get(int(parent))
+
+        user_roles = users['role_id'] if 'role_id' in users.columns else pd.Series(pd.NA, index=users.index)
+        roles = np.array([role_index.get(int(r), -1) if pd.notna(r) else -1 for r in user_roles], 'int64')
+        has_role = roles >= 0
+        safe = np.where(has_role, roles, 0)
+        both = has_role[:, None] & has_role[None, :]
+
+        if len(role_ids):
+            manager = ancestor[safe][:, safe] & both
+            below = ancestor[safe][:, safe].T & both
+        else:
+            manager = below = np.zeros((len(roles), len(roles)), bool)
+
+        same = (roles[:, None] == roles[None, :]) & both
+        own = np.eye(len(roles), dtype=bool)
+
+        # sees[level][o, u]: o usuário u vê os itens do dono o.
+        self._sees = {
+            'owner': (own | manager).T,
+            'group': (own | manager | same).T,
+            'subgroups': (own | manager | same | below).T,
+        }
+
+    def is_admin(self, user_id):
+        """
+        Se o usuário é administrador (vê todos os itens).
+        """
+        index = self._user_index.get(int(user_id))
+        return bool(index is not None and self._admin[index])
+
+    def has_permission(self, user_id, permission):
+        """
+        Valor de uma permissão do usuário (ex: 'can_see_company_wide_statistics'), de users_get_permissions.
+        """
+        if int(user_id) not in self.permissions.index or permission not in self.permissions.columns:
+            return False
+        return bool(self.permissions.at[int(user_id), permission])
+
+    def _items(self, frame, entity):
+        owners = _reference_ids_(frame, self.OWNER_COLUMNS[entity]).fillna(-1).astype('int64').to_numpy()
+        owners = self._user_index.reindex(owners).fillna(-1).astype('int64').to_numpy()
+
+        if 'visible_to' in frame.columns:
+            visible_to = pd.to_numeric(frame['visible_to'], errors='coerce').fillna(1).astype('int64').to_numpy()
+        else:
+            visible_to = np.ones(len(frame), 'int64')
+
+        return owners, visible_to
+
+    def visibility_matrix(self, frame, entity='deal'):
+        """
+        Matriz de visibilidade: uma linha por item e uma coluna por usuário ativo, True quando o usuário vê o item.
+
+        Parâmetros:
+        - frame (pd.DataFrame): Itens com id, dono (user_id ou owner_id) e visible_to, ex: deals_get_all.
+        - entity (str, opcional): 'deal', 'person', 'organization' ou 'product'. Padrão é 'deal'.
+
+        Retorna:
+        pd.DataFrame: Matriz booleana (índice = id do item, colunas = id do usuário).
+        """
+        if entity not in self.OWNER_COLUMNS:
+            raise ValueError(f"Entidade inválida: {entity}. Opções: {list(self.OWNER_COLUMNS)}")
+
+        owners, visible_to = self._items(frame, entity)
+        known = owners >= 0
+        safe = np.where(known, owners, 0)
+        matrix = np.zeros((len(frame), len(self._user_ids)), bool)
+
+        for value, level in self.visibility.items():
+            rows = visible_to == value
+            if level == 'company':
+                matrix[rows] = True
+            elif rows.any():
+                matrix[rows] = self._sees[level][safe[rows]] & known[rows, None]
+
+        matrix |= self._admin[None, :]
+        index = pd.to_numeric(frame['id'], errors='coerce') if 'id' in frame.columns else frame.index
+
+        return pd.DataFrame(matrix, index=pd.Index(index, name='id'), columns=pd.Index(self._user_ids, name='user_id'))
+
+    def visible_users(self, frame, entity='deal'):
+        """
+        Usuários que podem ver cada item, em formato longo (colunas id e user_id).
+        """
+        matrix = self.visibility_matrix(frame, entity)
+        items, users = np.nonzero(matrix.to_numpy())
+
+        return pd.DataFrame({'id': matrix.index.to_numpy()[items], 'user_id': matrix.columns.to_numpy()[users]})
+
+    def can_see(self, user_id, item, entity='deal'):
+        """
+        Se o usuário pode ver o item (dict ou linha de DataFrame com dono e visible_to).
+        """
+        user_id = int(user_id)
+        if user_id not in self._user_index.index:
+            return False
+
+        frame = pd.DataFrame([dict(item)])
+        return bool(self.visibility_matrix(frame, entity).iat[0, int(self._user_index[user_id])])
+
+    def permitted_users(self, deal_ids, access_level=None):
+        """
+        Usuários com acesso a cada negócio segundo o servidor (deals_get_permittedusers), buscados em paralelo e
+        guardados em cache por cache_ttl segundos.
+
+        Retorna:
+        dict: id do negócio -> lista de ids de usuários.
+        """
+        api_token = check_api_token(self.api_token)
+        deal_ids = [int(i) for i in deal_ids]
+        now = time.monotonic()
+
+        with self._lock:
+            cached = {i: self._permitted[(i, access_level)][1] for i in deal_ids
+                      if (i, access_level) in self._permitted and now - self._permitted[(i, access_level)][0] < self.cache_ttl}
+
+        missing = [i for i in dict.fromkeys(deal_ids) if i not in cached]
+
+        def fetch(deal_id):
+            frame = deals_get_permittedusers(deal_id, access_level=access_level, api_token=api_token,
+                                             company_domain=self.company_domain)
+            column = frame.columns[0] if not frame.empty else None
+            return [int(u) for u in frame[column]] if column is not None else []
+
+        with _tenant_scope_(api_token, self.company_domain):
+            fetched = dict(zip(missing, _map_concurrent_(fetch, missing, self.max_workers)))
+
+        with self._lock:
+            for deal_id, users in fetched.items():
+                self._permitted[(deal_id, access_level)] = (time.monotonic(), users)
+
+        cached.update(fetched)
+        return {i: cached[i] for i in deal_ids}
+
+
+# GRAFO DE ORGANIZAÇÕES
+def _csr_(sources, targets, size):
+    # Listas de adjacência compactas (CSR): vizinhos de i em indices[pointers[i]:pointers[i + 1]].
+    order = np.argsort(sources, kind='stable')
+    pointers = np.zeros(size + 1, 'int64')
+    np.add.at(pointers, sources + 1, 1)
+    return np.cumsum(pointers), targets[order]
+
+
+class OrganizationGraph:
+    """
+    Grafo em memória dos relacionamentos entre organizações (organizationrelationships_get_all).
+
+    Os relacionamentos são baixados em paralelo, sem repetir organizações já visitadas nem relacionamentos já
+    vistos, e guardados em listas de adjacência compactas (arrays numpy): pai -> filhas, filha -> pais e os
+    relacionamentos do tipo 'related'. As consultas (ancestrais, subsidiárias, grupos conectados, matriz do
+    grupo) e as somas por grupo são vetorizadas.
+
+    Parâmetros:
+    - relationships (pd.DataFrame): Relacionamentos, como retornados por organizationrelationships_get_all.
+    - org_ids (list, opcional): Organizações do grafo (inclusive as sem relacionamentos).
+
+    # Exemplo de uso:
+        graph = OrganizationGraph.from_api(api_token='seu_token_aqui', company_domain='sua_empresa')
+        graph.subsidiaries(123)
+        deals = deals_get_all(status='open', api_token='seu_token_aqui', company_domain='sua_empresa')
+        graph.rollup(deals, value='value', by='top_parent')
+    """
+
+    def __init__(self, relationships, org_ids=None):
+        relationships = relationships if relationships is not None else pd.DataFrame()
+
+        if relationships.empty or not {'rel_owner_org_id', 'rel_linked_org_id'} <= set(relationships.columns):
+            owners = linked = pd.Series([], dtype='Int64')
+            types = pd.Series([], dtype=object)
+        else:
+            if 'id' in relationships.columns:
+                relationships = relationships.drop_duplicates('id')
+            owners = _reference_ids_(relationships, 'rel_owner_org_id')
+            linked = _reference_ids_(relationships, 'rel_linked_org_id')
+            types = relationships['type'] if 'type' in relationships.columns else pd.Series('parent', index=relationships.index)
+
+        valid = (owners.notna() & linked.notna()).to_numpy()
+        owners = owners[valid].to_numpy('int64')
+        linked = linked[valid].to_numpy('int64')
+        types = types[valid].astype(str).to_numpy()
+
+        nodes = np.concatenate([owners, linked, np.asarray(list(org_ids or []), 'int64')])
+        self.org_ids = np.unique(nodes)
+        size = len(self.org_ids)
+        owner_index = np.searchsorted(self.org_ids, owners)
+        linked_index = np.searchsorted(self.org_ids, linked)
+
+        parent = types == 'parent'
+        self._children = _csr_(owner_index[parent], linked_index[parent], size)
+        self._parents = _csr_(linked_index[parent], owner_index[parent], size)
+        related = ~parent
+        self._related = _csr_(np.concatenate([owner_index[related], linked_index[related]]),
+                              np.concatenate([linked_index[related], owner_index[related]]), size)
+        self._edges = (owner_index, linked_index, parent)
+        self._cache = {}
+
+    def __len__(self):
+        return len(self.org_ids)
+
+    @classmethod
+    def from_api(cls, org_ids=None, follow=True, max_workers=8, api_token=None, company_domain='api'):
+        """
+        Monta o grafo baixando os relacionamentos em paralelo.
+
+        Parâmetros:
+        - org_ids (list, opcional): Organizações iniciais. Padrão: todas (organizations_get_all).
+        - follow (bool, opcional): Também visita as organizações relacionadas encontradas. Padrão é True.
+        - max_workers (int, opcional): Chamadas simultâneas. Padrão é 8.
+        - api_token (str): Token da API necessário para validar as solicitações.
+        - company_domain (str): Domínio da empresa no Pipedrive.
+
+        Retorna:
+        OrganizationGraph: O grafo.
+        """
+        api_token = check_api_token(api_token)
+
+        with _tenant_scope_(api_token, company_domain):
+            if org_ids is None:
+                orgs = organizations_get_all(api_token=api_token, company_domain=company_domain)
+                org_ids = orgs['id'].tolist() if 'id' in orgs.columns else []
+
+            frontier = list(dict.fromkeys(int(i) for i in org_ids))
+            visited = set(frontier)
+            frames = []
+
+            while frontier:
+                pages = _map_concurrent_(
+                    lambda org_id: organizationrelationships_get_all(org_id, api_token=api_token,
+                                                                     company_domain=company_domain),
+                    frontier, max_workers)
+                pages = [page for page in pages if page is not None and not page.empty]
+                frames.extend(pages)
+                frontier = []
+
+                if follow and pages:
+                    found = pd.concat([pd.concat([_reference_ids_(page, 'rel_owner_org_id'),
+                                                  _reference_ids_(page, 'rel_linked_org_id')]) for page in pages])
+                    frontier = [int(i) for i in found.dropna().unique() if int(i) not in visited]
+                    visited.update(frontier)
+
+        relationships = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        return cls(relationships, visited)
+
+    def _index(self, org_id):
+        index = np.searchsorted(self.org_ids, int(org_id))
+        if index >= len(self.org_ids) or self.org_ids[index] != int(org_id):
+            raise ValueError(f"Organização {org_id} não está no grafo.")
+        return index
+
+    def _walk(self, start, adjacency, depth=None):
+        # Busca em largura sobre um CSR, a partir de um conjunto de índices; devolve os índices alcançados.
+        pointers, indices = adjacency
+        seen = np.zeros(len(self.org_ids), bool)
+        frontier = np.asarray(start, 'int64')
+        seen[frontier] = True
+        level = 0
+
+        while len(frontier) and (depth is None or level < depth):
+            starts = pointers[frontier]
+            counts = pointers[frontier + 1] - starts
+            positions = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+            neighbors = np.unique(indices[positions])
+            frontier = neighbors[~seen[neighbors]]
+            seen[frontier] = True
+            level += 1
+
+        seen[np.asarray(start, 'int64')] = False
+        return np.flatnonzero(seen)
+
+    def parents(self, org_id):
+        """
+        Organizações mãe diretas.
+        """
+        pointers, indices = self._parents
+        index = self._index(org_id)
+        return self.org_ids[indices[pointers[index]:pointers[index + 1]]].tolist()
+
+    def children(self, org_id):
+        """
+        Organizações filhas diretas.
+        """
+        pointers, indices = self._children
+        index = self._index(org_id)
+        return self.org_ids[indices[pointers[index]:pointers[index + 1]]].tolist()
+
+    def ancestors(self, org_id):
+        """
+        Todas as organizações acima (mães, avós...).
+        """
+        return self.org_ids[self._walk([self._index(org_id)], self._parents)].tolist()
+
+    def subsidiaries(self, org_id, depth=None):
+        """
+        Todas as organizações abaixo (filhas, netas...), até depth níveis (padrão: todos).
+        """
+        return self.org_ids[self._walk([self._index(org_id)], self._children, depth)].tolist()
+
+    def _propagate(self, sources, targets, labels):
+        # Menor rótulo alcançável por cada nó seguindo as arestas, até estabilizar.
+        while True:
+            updated = labels.copy()
+            np.minimum.at(updated, targets, labels[sources])
+            if np.array_equal(updated, labels):
+                return labels
+            labels = updated
+
+    def connected_groups(self, include_related=False):
+        """
+        Grupo conectado de cada organização (mãe, filhas e, opcionalmente, relacionadas), identificado pelo
+        menor id do grupo.
+
+        Retorna:
+        pd.Series: id da organização -> id do grupo.
+        """
+        key = ('groups', include_related)
+        if key not in self._cache:
+            owners, linked, parent = self._edges
+            keep = np.ones(len(parent), bool) if include_related else parent
+            sources = np.concatenate([owners[keep], linked[keep]])
+            targets = np.concatenate([linked[keep], owners[keep]])
+            labels = self._propagate(sources, targets, np.arange(len(self.org_ids)))
+            self._cache[key] = pd.Series(self.org_ids[labels], index=pd.Index(self.org_ids, name='org_id'), name='group_id')
+        return self._cache[key]
+
+    def top_parents(self):
+        """
+        Matriz de cada organização: o ancestral mais alto (com várias mães, o de menor id); a própria
+        organização quando não tem mãe.
+
+        Retorna:
+        pd.Series: id da organização -> id da matriz.
+        """
+        if 'top' not in self._cache:
+            pointers, indices = self._parents
+            size = len(self.org_ids)
+            has_parent = pointers[1:] > pointers[:-1]
+            # Com várias mães, segue a de menor id (os índices seguem a ordem dos ids).
+            first = np.full(size, np.iinfo('int64').max)
+            np.minimum.at(first, np.repeat(np.arange(size), pointers[1:] - pointers[:-1]), indices)
+            parent = np.where(has_parent, first, np.arange(size))
+
+            # Salto de ponteiros: cada passo dobra a distância percorrida; ciclos param no limite de passos.
+            for _ in range(max(1, int(np.ceil(np.log2(max(size, 2)))) + 1)):
+                jumped = parent[parent]
+                if np.array_equal(jumped, parent):
+                    break
+                parent = jumped
+
+            self._cache['top'] = pd.Series(self.org_ids[parent], index=pd.Index(self.org_ids, name='org_id'), name='top_parent_id')
+        return self._cache['top']
+
+    def rollup(self, frame, value='value', org_column='org_id', by='top_parent', agg='sum'):
+        """
+        Agrega uma coluna de um DataFrame (ex: valor dos negócios abertos) por matriz ou por grupo conectado.
+
+        Parâmetros:
+        - frame (pd.DataFrame): Itens com a organização (ex: deals_get_all).
+        - value (str, opcional): Coluna agregada. Padrão é 'value'.
+        - org_column (str, opcional): Coluna da organização. Padrão é 'org_id'.
+        - by (str, opcional): 'top_parent' ou 'group'. Padrão é 'top_parent'.
+        - agg (str, opcional): Agregação do pandas ('sum', 'count', 'mean'...). Padrão é 'sum'.
+
+        Retorna:
+        pd.Series: Valor agregado por id da matriz (ou do grupo).
+        """
+        if by not in ('top_parent', 'group'):
+            raise ValueError("O parâmetro 'by' deve ser 'top_parent' ou 'group'.")
+
+        mapping = self.top_parents() if by == 'top_parent' else self.connected_groups()
+        orgs = _reference_ids_(frame, org_column)
+        keys = orgs.map(mapping).fillna(orgs).astype('Int64')
+        values = pd.to_numeric(frame[value], errors='coerce') if agg != 'count' else frame[value]
+
+        return values.groupby(keys.rename(f'{by}_id')).agg(agg)
+
+
+# PRODUTOS DOS NEGÓCIOS
+# Campos de um item (deal-product) comparados na reconciliação, na ordem dos parâmetros de deals_add_product.
+_DEAL_PRODUCT_FIELDS = ['item_price', 'quantity', 'discount_percentage', 'duration', 'product_variation_id',
+                        'comments', 'enabled_flag']
+
+
+def _line_keys_(frame):
+    # Chave de cada item: negócio, produto, variação e a ocorrência do mesmo produto no negócio.
+    keys = pd.DataFrame({
+        'deal_id': pd.to_numeric(frame['deal_id'], errors='coerce').astype('Int64'),
+        'product_id': _reference_ids_(frame, 'product_id'),
+        'variation': pd.to_numeric(frame.get('product_variation_id', pd.Series(pd.NA, index=frame.index)),
+                                   errors='coerce').astype('Int64').fillna(-1),
+    }, index=frame.index)
+    keys['occurrence'] = keys.groupby(['deal_id', 'product_id', 'variation']).cumcount()
+    return keys
+
+
+def _values_differ_(desired, current):
+    # Diferença entre as colunas desejada e atual; valores desejados vazios não contam como alteração.
+    numbers = pd.to_numeric(desired, errors='coerce')
+    current_numbers = pd.to_numeric(current.map(lambda v: float(v) if isinstance(v, bool) else v), errors='coerce')
+    numeric = numbers.notna() & current_numbers.notna()
+
+    differ = pd.Series(~np.isclose(numbers.fillna(0).to_numpy(float), current_numbers.fillna(0).to_numpy(float)),
+                       index=desired.index)
+    text = desired.astype(object).where(desired.notna(), None).map(_json_or_str_) != \
+        current.astype(object).where(current.notna(), None).map(_json_or_str_)
+
+    return desired.notna() & np.where(numeric, differ, text)
+
+
+def diff_deal_products(desired, current):
+    """
+    Calcula o diff mínimo entre os itens (produtos) desejados e os atuais dos negócios.
+
+    Os itens são casados por negócio, produto, variação e ocorrência (o mesmo produto pode aparecer mais de uma
+    vez no negócio). Itens só desejados viram 'add', só atuais viram 'delete' e itens casados viram 'update'
+    apenas quando algum campo informado em desired mudou; os demais não geram chamada.
+
+    Parâmetros:
+    - desired (pd.DataFrame): Itens desejados, com deal_id, product_id e os campos de _DEAL_PRODUCT_FIELDS
+      que se quer controlar (ex: item_price, quantity, discount_percentage).
+    - current (pd.DataFrame): Itens atuais (deals_get_products com a coluna deal_id), com o id do item.
+
+    Retorna:
+    pd.DataFrame: Operações (action, deal_id, deal_product_id, product_id e campos), ordenadas por negócio.
+    """
+    fields = [f for f in _DEAL_PRODUCT_FIELDS if f in desired.columns]
+    columns = ['action', 'deal_id', 'deal_product_id', 'product_id'] + _DEAL_PRODUCT_FIELDS
+    keys = ['deal_id', 'product_id', 'variation', 'occurrence']
+
+    if current is None or current.empty:
+        current = pd.DataFrame(columns=['id', 'deal_id', 'product_id'])
+
+    current = current.sort_values('id', kind='stable') if 'id' in current.columns else current
+    left = pd.concat([_line_keys_(desired), desired[fields]], axis=1)
+    right = pd.concat([_line_keys_(current), current.reindex(columns=_DEAL_PRODUCT_FIELDS)], axis=1)
+    right['deal_product_id'] = pd.to_numeric(current['id'], errors='coerce').astype('Int64')
+
+    merged = left.merge(right, on=keys, how='outer', suffixes=('', '_current'), indicator=True)
+    changed = pd.Series(False, index=merged.index)
+    for field in fields:
+        changed |= _values_differ_(merged[field], merged[f'{field}_current'])
+
+    merged['action'] = np.select([merged['_merge'] == 'left_only', merged['_merge'] == 'right_only', changed],
+                                 ['add', 'delete', 'update'], default='')
+
+    # Campos não informados em desired mantêm o valor atual (deals_update_products exige preço e quantidade).
+    for field in _DEAL_PRODUCT_FIELDS:
+        current_values = merged[f'{field}_current'] if f'{field}_current' in merged.columns else merged.get(field)
+        merged[field] = merged[field].where(merged[field].notna(), current_values) if field in fields else current_values
+
+    plan = merged[merged['action'] != ''].reindex(columns=columns)
+    return plan.sort_values(['deal_id', 'action', 'product_id'], kind='stable').reset_index(drop=True)
+
+
+def sync_deal_products(desired, deal_ids=None, dry_run=False, max_workers=8, api_token=None, company_domain='api'):
+    """
+    Reconcilia os produtos dos negócios com um DataFrame de itens desejados, executando só o diff.
+
+    Os itens atuais são baixados em paralelo (deals_get_products), o diff é calculado por diff_deal_products e as
+    operações (deals_add_product, deals_update_products, deals_delete_product) rodam em paralelo entre negócios e
+    em sequência dentro de cada negócio, sob o limitador de taxa do tenant.
+
+    Parâmetros:
+    - desired (pd.DataFrame): Itens desejados (deal_id, product_id, item_price, quantity...).
+    - deal_ids (list, opcional): Negócios reconciliados. Padrão: os negócios de desired. Negócios sem itens em
+      desired têm todos os produtos removidos.
+    - dry_run (bool, opcional): Só calcula o plano, sem executar. Padrão é False.
+    - max_workers (int, opcional): Chamadas simultâneas. Padrão é 8.
+    - api_token (str): Token da API necessário para validar as solicitações.
+    - company_domain (str): Domínio da empresa no Pipedrive.
+
+    Retorna:
+    pd.DataFrame: O plano, com as colunas success e error quando executado.
+
+    Exemplo de uso:
+    sync_deal_products(itens_erp, api_token='seu_token_aqui', company_domain='sua_empresa')
+    """
+    api_token = check_api_token(api_token)
+    deal_ids = [int(i) for i in (deal_ids if deal_ids is not None else pd.unique(desired['deal_id'].dropna()))]
+    desired = desired[pd.to_numeric(desired['deal_id'], errors='coerce').isin(deal_ids)]
+
+    def fetch(deal_id):
+        return deals_get_products(deal_id, api_token=api_token, company_domain=company_domain).assign(deal_id=deal_id)
+
+    def run(deal_plan):
+        results = []
+        for row in _records_(deal_plan):
+            row = {k: v.item() if isinstance(v, np.generic) else v for k, v in row.items()}
+            fields = {f: row[f] for f in _DEAL_PRODUCT_FIELDS if row[f] is not None}
+            try:
+                if row['action'] == 'add':
+                    result = deals_add_product(row['deal_id'], row['product_id'], api_token=api_token,
+                                               company_domain=company_domain, **fields)
+                elif row['action'] == 'update':
+                    result = deals_update_products(row['deal_id'], row['deal_product_id'], api_token=api_token,
+                                                   company_domain=company_domain, **fields)
+                else:
+                    result = deals_delete_product(row['deal_id'], row['deal_product_id'], api_token=api_token,
+                                                  company_domain=company_domain)
+                _response_data_(result)
+                results.append((True, None))
+            except (ValueError, TypeError, requests.exceptions.RequestException) as e:
+                results.append((False, str(e)))
+        return results
+
+    with _tenant_scope_(api_token, company_domain):
+        current = _map_concurrent_(fetch, deal_ids, max_workers)
+        current = [frame for frame in current if 'id' in frame.columns]
+        plan = diff_deal_products(desired, pd.concat(current, ignore_index=True) if current else None)
+
+        if dry_run or plan.empty:
+            return plan
+
+        # Remoções antes das inclusões, para não passar por estados com itens a mais.
+        order = plan['action'].map({'delete': 0, 'update': 1, 'add': 2})
+        plan = plan.assign(_order=order).sort_values(['deal_id', '_order'], kind='stable').drop(columns='_order')
+        groups = [group for _, group in plan.groupby('deal_id', sort=False)]
+        results = _map_concurrent_(run, groups, max_workers)
+
+    plan = pd.concat(groups, ignore_index=True)
+    outcome = [result for group in results for result in group]
+    plan['success'] = [success for success, _ in outcome]
+    plan['error'] = [error for _, error in outcome]
+
+    return plan
+
+
+# SINCRONIZAÇÃO DO CATÁLOGO DE PRODUTOS
+# Chaves comparadas em cada preço (prices) de um produto.
+_PRICE_KEYS = ('currency', 'price', 'cost', 'overhead_cost')
+
+
+def _canonical_(value):
+    # Representação estável de um valor para o hash: referências pelo id, preços ordenados por moeda.
+    if isinstance(value, dict):
+        value = value.get('value', value.get('id'))
+    if isinstance(value, list):
+        prices = [{k: p.get(k) for k in _PRICE_KEYS if p.get(k) is not None} for p in value if isinstance(p, dict)]
+        prices = [{k: float(v) if k != 'currency' else v for k, v in p.items()} for p in prices]
+        return json.dumps(sorted(prices, key=lambda p: str(p.get('currency'))), sort_keys=True)
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ''
+    if isinstance(value, bool):
+        return str(int(value))
+    return str(value).strip()
+
+
+def _normalized_fields_(frame, fields, numeric):
+    # Campos normalizados como texto, com '' nas células vazias.
+    columns = {}
+    for field in fields:
+        values = frame[field] if field in frame.columns else pd.Series(None, index=frame.index, dtype=object)
+        if field in numeric:
+            numbers = pd.to_numeric(values, errors='coerce').round(6).astype('Float64')
+            columns[field] = numbers.astype(str).where(numbers.notna(), '')
+        else:
+            columns[field] = values.astype(object).map(_canonical_)
+
+    return pd.DataFrame(columns, index=frame.index, columns=fields)
+
+
+def sync_products(catalog, key='code', fields=None, delete_missing=False, dry_run=False, max_workers=8,
+                  progress=None, api_token=None, company_domain='api'):
+    """
+    Sincroniza o catálogo de produtos com um DataFrame, fazendo chamadas só para os produtos alterados.
+
+    Os produtos atuais (products_get_all) e os do catálogo são casados pela chave (padrão: code) e comparados pelo
+    hash dos campos relevantes, calculado em bloco. Produtos novos viram products_add, alterados viram
+    products_update e, com delete_missing, os que não estão no catálogo viram products_delete. As operações
+    rodam em paralelo, sob o limitador de taxa do tenant.
+    Células vazias no catálogo significam "sem alteração": não entram na comparação nem são enviadas.
+
+    Parâmetros:
+    - catalog (pd.DataFrame): Catálogo desejado, com a coluna da chave e os campos (name, unit, tax, prices,
+      campos personalizados...).
+    - key (str, opcional): Coluna que identifica o produto nos dois lados. Padrão é 'code'.
+    - fields (list, opcional): Campos comparados. Padrão: todas as colunas do catálogo.
+    - delete_missing (bool, opcional): Exclui os produtos que não estão no catálogo. Padrão é False.
+    - dry_run (bool, opcional): Só calcula o plano, sem executar. Padrão é False.
+    - max_workers (int, opcional): Chamadas simultâneas. Padrão é 8.
+    - progress (function, opcional): Chamada como progress(concluídas, total) a cada operação executada.
+    - api_token (str): Token da API necessário para validar as solicitações.
+    - company_domain (str): Domínio da empresa no Pipedrive.
+
+    Retorna:
+    pd.DataFrame: O plano (action, id, chave), com as colunas success e error quando executado.
+
+    Exemplo de uso:
+    sync_products(catalogo, key='code', progress=lambda feitas, total: print(f'{feitas}/{total}'), api_token='seu_token_aqui', company_domain='sua_empresa')
+    """
+    api_token = check_api_token(api_token)
+
+    if key not in catalog.columns:
+        raise ValueError(f"O catálogo não tem a coluna da chave '{key}'.")
+
+    fields = [f for f in (fields or catalog.columns) if f not in (key, 'id')]
+    numeric = {f for f in fields if pd.api.types.is_numeric_dtype(catalog[f]) and not pd.api.types.is_bool_dtype(catalog[f])}
+
+    with _tenant_scope_(api_token, company_domain):
+        current = products_get_all(api_token=api_token, company_domain=company_domain)
+
+    catalog = catalog.assign(_key=catalog[key].map(_canonical_))
+    if catalog['_key'].eq('').any() or catalog['_key'].duplicated().any():
+        raise ValueError(f"A chave '{key}' deve ser preenchida e única no catálogo.")
+
+    if current.empty or key not in current.columns:
+        current = pd.DataFrame(columns=['id', key])
+    current = current.assign(_key=current[key].map(_canonical_))
+    current = current[current['_key'] != ''].drop_duplicates('_key')
+
+    # Células vazias do catálogo não são enviadas, então valem como "sem alteração": assumem o valor atual.
+    desired = _normalized_fields_(catalog, fields, numeric).set_axis(catalog['_key'].to_numpy())
+    existing = _normalized_fields_(current, fields, numeric).set_axis(current['_key'].to_numpy())
+    desired = desired.mask(desired.eq(''), existing.reindex(desired.index).fillna(''))
+
+    hash_rows = lambda frame: pd.util.hash_pandas_object(frame, index=False).to_numpy()
+    merged = catalog[['_key']].assign(_hash=hash_rows(desired), _row=np.arange(len(catalog)))
+    merged = merged.merge(current[['_key', 'id']].assign(_current=hash_rows(existing)),
+                          on='_key', how='outer', indicator=True)
+
+    merged['action'] = np.select(
+        [merged['_merge'] == 'left_only', (merged['_merge'] == 'both') & (merged['_hash'] != merged['_current']),
+         (merged['_merge'] == 'right_only') & delete_missing],
+        ['add', 'update', 'delete'], default='')
+
+    plan = merged[merged['action'] != ''].rename(columns={'_key': key})
+    plan = plan.assign(id=pd.to_numeric(plan['id'], errors='coerce').astype('Int64')).reset_index(drop=True)
+
+    if dry_run or plan.empty:
+        return plan[['action', 'id', key]]
+
+    records = catalog.drop(columns='_key')
+    done = [0]
+    lock = threading.Lock()
+
+    def run(row):
+        try:
+            if row['action'] == 'delete':
+                result = products_delete(int(row['id']), api_token=api_token, company_domain=company_domain)
+            else:
+                values = {k: v.item() if isinstance(v, np.generic) else v
+                          for k, v in _records_(records.iloc[[int(row['_row'])]])[0].items() if k in fields or k == key}
+                values = {k: v for k, v in values.items() if v is not None}
+                if row['action'] == 'add':
+                    result = _call_with_fields_(products_add, values, api_token=api_token, company_domain=company_domain)
+                else:
+                    result = _call_with_fields_(products_update, values, id=int(row['id']), api_token=api_token,
+                                                company_domain=company_domain)
+            _response_data_(result)
+            outcome = (True, None)
+        except (ValueError, TypeError, requests.exceptions.RequestException) as e:
+            outcome = (False, str(e))
+
+        if progress is not None:
+            with lock:
+                done[0] += 1
+                progress(done[0], len(plan))
+        return outcome
+
+    with _tenant_scope_(api_token, company_domain):
+        results = _map_concurrent_(run, plan.to_dict('records'), max_workers)
+
+    plan = plan[['action', 'id', key]].copy()
+    plan['success'] = [success for success, _ in results]
+    plan['error'] = [error for _, error in results]
+
+    return plan
+
+
+# QUADRO KANBAN
+class KanbanBoard:
+    """
+    Retrato do quadro (kanban) de um funil: os negócios abertos de cada etapa, indexados por etapa e por
+    responsável.
+
+    load() busca as etapas (stages_get_all) e os negócios de todas elas (stages_get_deals) em paralelo, sob o
+    limitador de taxa do tenant. refresh() usa recents_get para mover entre as colunas apenas os negócios
+    alterados desde a última sincronização, sem recarregar o quadro.
+
+    Parâmetros:
+    - pipeline_id (int): ID do funil.
+    - user_id (int, opcional): Mostra apenas os negócios deste responsável. Se omitido, mostra os de todos.
+    - api_token (str): Token da API necessário para validar as solicitações.
+    - company_domain (str): Domínio da empresa no Pipedrive.
+    - max_workers (int, opcional): Etapas buscadas simultaneamente. Padrão é 8.
+
+    Exemplo de uso:
+    quadro = KanbanBoard.from_api(1, api_token='seu_token_aqui', company_domain='sua_empresa')
+    quadro.refresh()
+    quadro.column(5)
+    """
+
+    def __init__(self, pipeline_id, user_id=None, api_token=None, company_domain='api', max_workers=8):
+        self.pipeline_id = int(pipeline_id)
+        self.user_id = None if user_id is None else int(user_id)
+        self.api_token = api_token
+        self.company_domain = company_domain
+        self.max_workers = max_workers
+        self.stages = pd.DataFrame(columns=['id', 'name', 'order_nr'])
+        self.deals = pd.DataFrame(columns=['id', 'stage_id', 'owner_id'])
+        self.synced_at = None
+        self._lock = threading.RLock()
+        self._rebuild()
+
+    @classmethod
+    def from_api(cls, pipeline_id, user_id=None, api_token=None, company_domain='api', max_workers=8):
+        """
+        Cria o quadro e carrega as etapas e os negócios pela API.
+        """
+        board = cls(pipeline_id, user_id=user_id, api_token=api_token, company_domain=company_domain,
+                    max_workers=max_workers)
+        board.load()
+        return board
+
+    def _load_stages(self, api_token):
+        stages = stages_get_all(self.pipeline_id, api_token=api_token, company_domain=self.company_domain)
+        if stages.empty or 'id' not in stages.columns:
+            return pd.DataFrame(columns=['id', 'name', 'order_nr'])
+        order = 'order_nr' if 'order_nr' in stages.columns else 'id'
+        return stages.sort_values(order, kind='stable').reset_index(drop=True)
+
+    def _prepare(self, deals):
+        # Colunas de índice do quadro: etapa e responsável como inteiros.
+        if deals.empty or 'id' not in deals.columns:
+            return pd.DataFrame(columns=['id', 'stage_id', 'owner_id'])
+        return deals.assign(id=pd.to_numeric(deals['id']).astype('int64'),
+                            stage_id=_reference_ids_(deals, 'stage_id'),
+                            owner_id=_reference_ids_(deals, 'user_id')).reset_index(drop=True)
+
+    def load(self):
+        """
+        Carrega as etapas do funil e os negócios de todas as etapas, em paralelo.
+
+        Retorna:
+        int: Quantidade de negócios no quadro.
+        """
+        api_token = check_api_token(self.api_token)
+        started = _utc_timestamp_()
+        owner = {'user_id': self.user_id} if self.user_id is not None else {'everyone': 1}
+
+        with _tenant_scope_(api_token, self.company_domain):
+            stages = self._load_stages(api_token)
+            pages = _map_concurrent_(
+                lambda stage_id: stages_get_deals(stage_id, **owner, api_token=api_token, company_domain=self.company_domain),
+                [int(i) for i in stages['id']], self.max_workers)
+
+        pages = [page for page in pages if not page.empty]
+        deals = self._prepare(_concat_pages_(pages) if pages else pd.DataFrame())
+
+        with self._lock:
+            self.stages, self.deals, self.synced_at = stages, deals, started
+            self._rebuild()
+
+        return len(deals)
+
+    def _rebuild(self):
+        # Posições dos negócios por etapa e por responsável.
+        self._by_stage = self.deals.groupby('stage_id').indices if not self.deals.empty else {}
+        self._by_owner = self.deals.groupby('owner_id').indices if not self.deals.empty else {}
+
+    def _on_board(self, deals):
+        # Negócios que pertencem ao quadro: abertos, não excluídos, deste funil e do responsável filtrado.
+        keep = pd.Series(True, index=deals.index)
+        if 'status' in deals.columns:
+            keep &= deals['status'].eq('open')
+        if 'deleted' in deals.columns:
+            keep &= ~deals['deleted'].fillna(False).astype(bool)
+        if 'active' in deals.columns:
+            keep &= deals['active'].ne(False)
+        keep &= _reference_ids_(deals, 'pipeline_id').eq(self.pipeline_id).fillna(False).astype(bool)
+        if self.user_id is not None:
+            keep &= deals['owner_id'].eq(self.user_id).fillna(False).astype(bool)
+        return keep
+
+    def refresh(self):
+        """
+        Aplica ao quadro os negócios alterados desde a última sincronização (recents_get): negócios que mudaram de
+        etapa trocam de coluna, os que foram ganhos, perdidos, excluídos ou saíram do funil deixam o quadro.
+
+        Retorna:
+        pd.DataFrame: Uma linha por negócio alterado, com id, from_stage e to_stage (nulo quando entrou ou saiu do
+        quadro).
+        """
+        api_token = check_api_token(self.api_token)
+        started = _utc_timestamp_()
+
+        if self.synced_at is None:
+            raise ValueError("O quadro não foi carregado; use KanbanBoard.from_api ou load().")
+
+        recents = recents_get(self.synced_at, items='deal', api_token=api_token, company_domain=self.company_domain)
+        changes = pd.DataFrame({'id': pd.Series(dtype='int64'), 'from_stage': pd.Series(dtype='Int64'),
+                                'to_stage': pd.Series(dtype='Int64')})
+
+        if not recents.empty and {'item', 'data'} <= set(recents.columns):
+            changed = self._prepare(_dict_frame_(recents.loc[recents['item'] == 'deal', 'data']))
+            changed = changed.drop_duplicates('id', keep='last')
+
+            if not changed.empty:
+                incoming = changed[self._on_board(changed)]
+
+                with self._lock:
+                    if not incoming['stage_id'].dropna().isin(self.stages['id'].astype('int64')).all():
+                        with _tenant_scope_(api_token, self.company_domain):
+                            self.stages = self._load_stages(api_token)
+
+                    previous = self.deals.set_index('id')['stage_id']
+                    changes = pd.DataFrame({'id': changed['id'].to_numpy()})
+                    changes['from_stage'] = changes['id'].map(previous).astype('Int64')
+                    changes['to_stage'] = changes['id'].map(incoming.set_index('id')['stage_id']).astype('Int64')
+
+                    kept = self.deals[~self.deals['id'].isin(changed['id'])]
+                    self.deals = pd.concat([kept, incoming], ignore_index=True) if not incoming.empty else kept.reset_index(drop=True)
+                    self._rebuild()
+
+                changes = changes[changes['from_stage'].notna() | changes['to_stage'].notna()].reset_index(drop=True)
+
+        self.synced_at = started
+        return changes
+
+    def column(self, stage_id):
+        """
+        Retorna os negócios de uma etapa.
+        """
+        with self._lock:
+            return self.deals.iloc[self._by_stage.get(int(stage_id), [])].reset_index(drop=True)
+
+    def owner(self, user_id):
+        """
+        Retorna os negócios de um responsável, em todas as etapas.
+        """
+        with self._lock:
+            return self.deals.iloc[self._by_owner.get(int(user_id), [])].reset_index(drop=True)
+
+    def columns(self):
+        """
+        Retorna o quadro inteiro como {stage_id: DataFrame}, na ordem das etapas.
+        """
+        with self._lock:
+            return {int(stage_id): self.column(stage_id) for stage_id in self.stages['id']}
+
+    def summary(self, by='stage'):
+        """
+        Quantidade e valor total dos negócios por etapa ou por responsável (e moeda).
+
+        Parâmetros:
+        - by (str, opcional): 'stage' ou 'owner'. Padrão é 'stage'.
+
+        Retorna:
+        pd.DataFrame: Colunas stage_id (ou owner_id), currency, count e value.
+        """
+        if by not in ('stage', 'owner'):
+            raise ValueError("O parâmetro 'by' deve ser 'stage' ou 'owner'.")
+
+        key = f'{by}_id'
+        with self._lock:
+            deals = self.deals
+
+        value = pd.to_numeric(deals['value'], errors='coerce') if 'value' in deals.columns else pd.Series(0.0, index=deals.index)
+        currency = deals['currency'] if 'currency' in deals.columns else pd.Series(None, index=deals.index, dtype=object)
+        frame = pd.DataFrame({key: deals[key], 'currency': currency, 'value': value.fillna(0.0)})
+
+        return (frame.groupby([key, 'currency'], dropna=False)
+                     .agg(count=('value', 'size'), value=('value', 'sum'))
+                     .reset_index())
+
+
+# NEGÓCIOS DE VÁRIOS FUNIS
+def pipelines_get_deals_many(ids=None, user_id=None, everyone=1, stage_id=None, by_pipeline=False, max_workers=8,
+                             api_token=None, company_domain='api'):
+    """
+    Busca os negócios de vários funis (pipelines_get_deals) em paralelo, sob o limitador de taxa do tenant.
+
+    O resumo do servidor (get_summary) não é pedido: get_all_ descarta o additional_data das páginas. Os totais
+    são calculados localmente por pipelines_deals_totals.
+
+    Parâmetros:
+    - ids (list, opcional): IDs dos funis. Se omitido, usa todos (pipelines_get_all).
+    - user_id (int, opcional): Apenas os negócios deste usuário.
+    - everyone (int, opcional): Negócios de todos os usuários (0 ou 1). Padrão é 1; ignorado com user_id.
+    - stage_id (int, opcional): Apenas os negócios desta etapa.
+    - by_pipeline (bool, opcional): Retorna {pipeline_id: DataFrame} em vez de um único DataFrame. Padrão é False.
+    - max_workers (int, opcional): Funis buscados simultaneamente. Padrão é 8.
+    - api_token (str): Token da API necessário para validar as solicitações.
+    - company_domain (str): Domínio da empresa no Pipedrive.
+
+    Retorna:
+    pd.DataFrame ou dict: Os negócios de todos os funis, com a coluna pipeline_id, ou um DataFrame por funil.
+
+    Exemplo de uso:
+    negocios = pipelines_get_deals_many(api_token='seu_token_aqui', company_domain='sua_empresa')
+    totais = pipelines_deals_totals(negocios, api_token='seu_token_aqui', company_domain='sua_empresa')
+    """
+    api_token = check_api_token(api_token)
+    owner = {'user_id': user_id} if user_id is not None else {'everyone': everyone}
+
+    with _tenant_scope_(api_token, company_domain):
+        if ids is None:
+            pipelines = pipelines_get_all(api_token=api_token, company_domain=company_domain)
+            ids = list(pipelines['id']) if 'id' in pipelines.columns else []
+        ids = [int(i) for i in ids]
+
+        pages = _map_concurrent_(
+            lambda pipeline_id: pipelines_get_deals(pipeline_id, stage_id=stage_id, **owner, api_token=api_token,
+                                                    company_domain=company_domain),
+            ids, max_workers)
+
+    pages = [page.assign(pipeline_id=pipeline_id) if not page.empty else page
+             for pipeline_id, page in zip(ids, pages)]
+
+    if by_pipeline:
+        return dict(zip(ids, pages))
+
+    pages = [page for page in pages if not page.empty]
+    return _concat_pages_(pages).reset_index(drop=True) if pages else pd.DataFrame(columns=['id', 'pipeline_id'])
+
+
+def pipelines_deals_totals(deals, stages=None, api_token=None, company_domain='api'):
+    """
+    Totais dos negócios por funil e moeda, calculados localmente sobre o DataFrame. Substituem o resumo do
+    servidor (get_summary do pipelines_get_deals), que não é retornado pelas listagens da biblioteca.
+
+    Como no servidor, o valor ponderado usa a probabilidade do negócio e, sem ela, a probabilidade da etapa. As
+    etapas vêm de stages, ou de stages_get_all quando api_token é informado. Quando a probabilidade de algum
+    negócio do grupo não é conhecida, weighted_value do grupo é NaN.
+
+    Parâmetros:
+    - deals (pd.DataFrame): Negócios com as colunas pipeline_id, value e currency (ex: pipelines_get_deals_many).
+    - stages (pd.DataFrame, opcional): Etapas (stages_get_all), para a probabilidade de cada etapa.
+    - api_token (str, opcional): Token da API, para buscar as etapas quando stages não é informado.
+    - company_domain (str): Domínio da empresa no Pipedrive.
+
+    Retorna:
+    pd.DataFrame: Colunas pipeline_id, currency, count, value e weighted_value.
+
+    Exemplo de uso:
+    pipelines_deals_totals(negocios, api_token='seu_token_aqui', company_domain='sua_empresa')
+    """
+    if stages is None and api_token is not None:
+        stages = _cached_call_('stages_get_all', api_token=api_token, company_domain=company_domain)
+
+    value = pd.to_numeric(deals['value'], errors='coerce').fillna(0.0) if 'value' in deals.columns else pd.Series(0.0, index=deals.index)
+    probability = pd.to_numeric(deals['probability'], errors='coerce') if 'probability' in deals.columns else pd.Series(np.nan, index=deals.index)
+
+    if stages is not None and not stages.empty and 'deal_probability' in stages.columns:
+        by_stage = pd.to_numeric(stages.set_index(pd.to_numeric(stages['id']))['deal_probability'], errors='coerce')
+        probability = probability.fillna(_reference_ids_(deals, 'stage_id').map(by_stage).astype(float))
+
+    frame = pd.DataFrame({'pipeline_id': _reference_ids_(deals, 'pipeline_id'),
+                          'currency': deals['currency'] if 'currency' in deals.columns else None,
+                          'value': value,
+                          'weighted_value': value * probability / 100.0,
+                          'unknown': probability.isna()})
+
+    totals = (frame.groupby(['pipeline_id', 'currency'], dropna=False)
+                   .agg(count=('value', 'size'), value=('value', 'sum'), weighted_value=('weighted_value', 'sum'),
+                        unknown=('unknown', 'any'))
+                   .reset_index())
+    totals['weighted_value'] = totals['weighted_value'].mask(totals['unknown'])
+
+    return totals.drop(columns='unknown')
+
+
+# VALIDAÇÃO DE PAYLOADS
+# Tipos de campo validados como número, data ou hora.
+_NUMERIC_FIELD_TYPES = ('int', 'double', 'monetary', 'user', 'org', 'people', 'stage')
+_TIME_PATTERN = r'([01]\d|2[0-3]):[0-5]\d(:[0-5]\d)?'
+
+
+def _option_keys_(series):
+    # Valores como texto comparável com os ids das opções: 3, 3.0 e '3' viram '3'; listas (set) viram '1,2'.
+    numbers = pd.to_numeric(series, errors='coerce')
+    integral = numbers.notna() & (numbers % 1 == 0)
+    keys = series.astype(object).map(lambda v: v.get('value', v.get('id')) if isinstance(v, dict)
+                                     else ','.join(map(str, v)) if isinstance(v, list) else v).astype(str).str.strip()
+    keys[integral] = numbers[integral].astype('int64').astype(str)
+    return keys
+
+
+class PayloadValidator:
+    """
+    Validação local dos registros de deals_add, persons_add, organizations_add e activities_add (ou *_update),
+    compilada a partir dos metadados dos campos (*fields_get_all) e dos tipos de atividade (activitytypes_get_all).
+
+    Um lote inteiro é verificado coluna a coluna, com operações vetorizadas, antes de qualquer requisição: campos
+    obrigatórios vazios, colunas que não existem (nem como parâmetro nem como campo personalizado), ids de opção
+    inválidos em campos enum/set, números, datas e horas mal formatados e tipos de atividade inexistentes.
+
+    Parâmetros:
+    - entity (str): 'deals', 'persons', 'organizations' ou 'activities'.
+    - fields (pd.DataFrame): Resultado do *fields_get_all da entidade.
+    - activity_types (pd.DataFrame, opcional): Resultado de activitytypes_get_all (para entity='activities').
+
+    Exemplo de uso:
+    validador = PayloadValidator.from_api('deals', api_token='seu_token_aqui', company_domain='sua_empresa')
+    erros = validador.validate(lote)
+    lote_valido = lote[validador.valid(lote)]
+    """
+
+    FUNCTIONS = {
+        'deals': ('deals_add', 'deals_update'),
+        'persons': ('persons_add', 'persons_update'),
+        'organizations': ('organizations_add', 'organizations_update'),
+        'activities': ('activities_add', 'activities_update'),
+    }
+
+    def __init__(self, entity, fields, activity_types=None):
+        if entity not in self.FUNCTIONS:
+            raise ValueError(f"Entidade inválida: '{entity}'. Use uma de {list(self.FUNCTIONS)}.")
+
+        self.entity = entity
+        self._compile(fields, activity_types)
+
+    @classmethod
+    def from_api(cls, entity, api_token=None, company_domain='api'):
+        """
+        Cria o validador com os metadados da API (usando o cache do tenant dentro de um PipedriveClient).
+        """
+        api_token = check_api_token(api_token)
+        if entity not in cls.FUNCTIONS:
+            raise ValueError(f"Entidade inválida: '{entity}'. Use uma de {list(cls.FUNCTIONS)}.")
+
+        fields = _fields_(entity, api_token, company_domain)
+        activity_types = None
+        if entity == 'activities':
+            activity_types = _cached_call_('activitytypes_get_all', api_token=api_token, company_domain=company_domain)
+
+        return cls(entity, fields, activity_types)
+
+    def _compile(self, fields, activity_types):
+        if fields is None or fields.empty or 'key' not in fields.columns:
+            fields = pd.DataFrame(columns=['key', 'field_type'])
+
+        self.field_types = dict(zip(fields['key'], fields['field_type'] if 'field_type' in fields.columns else None))
+        self.options = {}
+        if 'options' in fields.columns:
+            for key, options in zip(fields['key'], fields['options']):
+                if isinstance(options, list) and options and self.field_types.get(key) in ('enum', 'set'):
+                    self.options[key] = {str(o.get('id')) for o in options if isinstance(o, dict)}
+
+        self.parameters = {}
+        self.required = {}
+        self.custom = None
+        for action, name in zip(('add', 'update'), self.FUNCTIONS[self.entity]):
+            parameters = inspect.signature(_resolve_function(name)).parameters
+            self.custom = next((p for p in parameters if p.lower().startswith('custom')), self.custom)
+            self.parameters[action] = {p for p in parameters
+                                       if p not in ('id', 'api_token', 'company_domain', 'return_type') and p != self.custom}
+            self.required[action] = {p for p, v in parameters.items()
+                                     if v.default is inspect.Parameter.empty and p != 'id'}
+
+        if 'mandatory_flag' in fields.columns:
+            mandatory = {key for key, flag in zip(fields['key'], fields['mandatory_flag']) if flag is True}
+            self.required['add'] |= mandatory
+
+        self.activity_types = None
+        if activity_types is not None and not activity_types.empty and 'key_string' in activity_types.columns:
+            active = activity_types['active_flag'].ne(False) if 'active_flag' in activity_types.columns else True
+            self.activity_types = set(activity_types.loc[active, 'key_string'].astype(str))
+
+    def _expand(self, frame):
+        # Campos personalizados passados como dict (customList) viram colunas.
+        for column in ('customList', 'custom_list'):
+            if column in frame.columns:
+                nested = _dict_frame_(frame[column]).reindex(frame.index)
+                frame = frame.drop(columns=column).join(nested[[c for c in nested.columns if c not in frame.columns]])
+        return frame
+
+    def validate(self, frame, action='add'):
+        """
+        Verifica um lote de registros.
+
+        Parâmetros:
+        - frame (pd.DataFrame ou dict): Registros, uma coluna por campo (parâmetros e chaves de campos personalizados).
+        - action (str, opcional): 'add' ou 'update' (em 'update' nenhum campo é obrigatório). Padrão é 'add'.
+
+        Retorna:
+        pd.DataFrame: Um erro por linha, com as colunas row (índice do registro), column, value e error. Vazio
+        quando o lote é válido.
+        """
+        if action not in ('add', 'update'):
+            raise ValueError("O parâmetro 'action' deve ser 'add' ou 'update'.")
+        if isinstance(frame, dict):
+            frame = pd.DataFrame([frame])
+
+        frame = self._expand(frame)
+        errors = []
+
+        def report(column, mask, message):
+            if mask.any():
+                errors.append(pd.DataFrame({'row': frame.index[mask.to_numpy()], 'column': column,
+                                            'value': frame.loc[mask, column].to_numpy() if column in frame.columns else None,
+                                            'error': message}))
+
+        if action == 'add':
+            for column in sorted(self.required['add']):
+                missing = frame[column].isna() if column in frame.columns else pd.Series(True, index=frame.index)
+                if column in frame.columns:
+                    missing |= frame[column].astype(object).map(lambda v: isinstance(v, str) and not v.strip())
+                if column not in frame.columns:
+                    errors.append(pd.DataFrame({'row': frame.index, 'column': column, 'value': None,
+                                                'error': 'campo obrigatório ausente'}))
+                else:
+                    report(column, missing, 'campo obrigatório ausente')
+
+        # Sem parâmetro de campos personalizados (activities_add), só os parâmetros da função são aceitos.
+        known = self.parameters[action] | (set(self.field_types) if self.custom else set())
+
+        for column in frame.columns:
+            values = frame[column]
+            present = values.notna()
+
+            if column not in known:
+                report(column, present, 'campo inexistente')
+                continue
+
+            if self.entity == 'activities' and column == 'type':
+                if self.activity_types is not None:
+                    report(column, present & ~values.astype(str).isin(self.activity_types), 'tipo de atividade inexistente')
+                continue
+
+            field_type = self.field_types.get(column)
+
+            if column in self.options:
+                keys = _option_keys_(values)
+                if field_type == 'set':
+                    parts = keys.str.split(',').explode().str.strip()
+                    invalid = (~parts.isin(self.options[column])).groupby(level=0).any().reindex(frame.index, fill_value=False)
+                    report(column, present & invalid, 'opção inválida')
+                else:
+                    report(column, present & ~keys.isin(self.options[column]), 'opção inválida')
+
+            elif field_type in _NUMERIC_FIELD_TYPES:
+                numbers = pd.to_numeric(_option_keys_(values), errors='coerce')
+                report(column, present & numbers.isna(), 'número inválido')
+
+            elif field_type == 'date':
+                # Campos de sistema como add_time são do tipo date, mas recebem data e hora.
+                text = values.astype(str).str.strip()
+                dates = pd.to_datetime(text.str[:10], format='%Y-%m-%d', errors='coerce')
+                invalid = dates.isna() | ~text.str.fullmatch(r'\d{4}-\d{2}-\d{2}( ' + _TIME_PATTERN + ')?')
+                report(column, present & invalid, 'data inválida (formato: YYYY-MM-DD ou YYYY-MM-DD HH:MM:SS)')
+
+            elif field_type == 'time':
+                report(column, present & ~values.astype(str).str.fullmatch(_TIME_PATTERN), 'hora inválida (formato: HH:MM)')
+
+        if not errors:
+            return pd.DataFrame(columns=['row', 'column', 'value', 'error'])
+
+        return pd.concat(errors, ignore_index=True)
+
+    def valid(self, frame, action='add'):
+        """
+        Retorna uma máscara booleana (pd.Series) com True para os registros sem erros.
+        """
+        if isinstance(frame, dict):
+            frame = pd.DataFrame([frame])
+        errors = self.validate(frame, action=action)
+        return pd.Series(~frame.index.isin(errors['row']), index=frame.index)
+
+    def check(self, frame, action='add'):
+        """
+        Valida o lote e gera ValueError listando os primeiros erros, se houver.
+        """
+        errors = self.validate(frame, action=action)
+        if not errors.empty:
+            sample = '; '.join(f"linha {r}: {c} = {v!r} ({e})" for r, c, v, e in errors.head(10).itertuples(index=False))
+            raise ValueError(f"{len(errors)} erro(s) de validação em {self.entity}: {sample}")